@@ -0,0 +1,302 @@
+"""
+📊 /analyze 端到端压测 (进程内，确定性，无需真实 MongoDB / DeepSeek)
+
+- 用 mongomock 作为 Mongo 替身 (--real-mongo 则连 MONGO_URI)，启动时照常跑 seed_data
+- 上游指向本地 OpenAI 兼容替身 (benchmarks/fake_llm_server.py)，首 token / 速率 / reasoning 阶段可配
+- uvicorn 在同一事件循环内真实监听端口，按固定种子生成的阵容语料以目标并发回放
+- 输出延迟 p50/p95/p99、吞吐、事件循环延迟，并附带服务端统计；--json 保存，--compare 对比两次结果
+
+    cd backend && python benchmarks/analyze_load.py --requests 200 --concurrency 40 --json bench/HEAD.json
+    python benchmarks/analyze_load.py --reasoning-tokens 30 --ttft-ms 400 --model reasoner
+    python benchmarks/analyze_load.py --compare bench/base.json bench/HEAD.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import datetime
+import subprocess
+import contextlib
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMServer
+from loop_lag import percentile, PROBE_INTERVAL
+
+ROLES = ["TOP", "JUNGLE", "MID", "ADC", "SUPPORT"]
+MODES = ["personal", "personal", "team", "bp", "role_jungle_farming"]
+RANKS = ["Gold", "Platinum", "Emerald", "Diamond", "Master"]
+DATA_ROLES = {"TOP": "top", "JUNGLE": "jungle", "MID": "mid", "ADC": "bot", "SUPPORT": "support"}
+
+
+def install_mongomock():
+    """pymongo / seed_data / KnowledgeBase 全部指向同一个 mongomock 实例"""
+    import mongomock
+    import pymongo
+    shared = mongomock.MongoClient()
+    factory = lambda *a, **k: shared
+    pymongo.MongoClient = factory
+    import seed_data
+    seed_data.MongoClient = factory
+    import core.database as cdb
+    cdb.MongoClient = factory
+    os.environ["MONGO_ASYNC_DRIVER"] = "threadpool"  # mongomock 只能同步访问
+
+
+def build_corpus(n, seed, model):
+    """固定种子生成阵容语料：每队每个分路各一名英雄，双方不重复"""
+    with open(os.path.join(BACKEND_DIR, "secure_data", "champions.json"), encoding="utf-8") as f:
+        champions = json.load(f)
+    by_role = {role: [c["name"] for c in champions if c.get("role") == DATA_ROLES[role]] for role in ROLES}
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        picks = {role: rng.sample(by_role[role], 2) for role in ROLES}
+        mine = {role: picks[role][0] for role in ROLES}
+        theirs = {role: picks[role][1] for role in ROLES}
+        mode = rng.choice(MODES)
+        role = "JUNGLE" if mode == "role_jungle_farming" else rng.choice(ROLES)
+        corpus.append({
+            "mode": mode,
+            "myHero": "None" if mode == "bp" else mine[role],
+            "enemyHero": theirs[role],
+            "myTeam": [mine[r] for r in ROLES],
+            "enemyTeam": [theirs[r] for r in ROLES],
+            "userRole": role,
+            "rank": rng.choice(RANKS),
+            "mapSide": rng.choice(["blue", "red"]),
+            "myLaneAssignments": mine,
+            "enemyLaneAssignments": theirs,
+            "model_type": model if model != "mixed" else rng.choice(["chat", "reasoner"])
+        })
+    return corpus
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def summarize(values):
+    values = [v for v in values if v is not None]
+    if not values: return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "max": round(max(values), 1)
+    }
+
+
+async def one_request(http, base_url, payload, token):
+    start = time.perf_counter()
+    result = {"status": None, "ttfb": None, "ttft": None, "total": None, "bytes": 0, "queued": False}
+    try:
+        async with http.stream("POST", f"{base_url}/analyze", json=payload, headers={"Authorization": f"Bearer {token}"}) as resp:
+            result["status"] = resp.status_code
+            in_think = False
+            async for chunk in resp.aiter_text():
+                now = (time.perf_counter() - start) * 1000
+                if result["ttfb"] is None: result["ttfb"] = now
+                result["bytes"] += len(chunk.encode("utf-8"))
+                if chunk.startswith("<queue>"):
+                    result["queued"] = True
+                    continue
+                # 首个正文 token (思考阶段之后)
+                if "<think>" in chunk: in_think = True
+                if "</think>" in chunk:
+                    in_think = False
+                    chunk = chunk.split("</think>", 1)[1]
+                if result["ttft"] is None and not in_think and chunk.strip():
+                    result["ttft"] = now
+    except Exception as e:
+        result["status"] = f"error: {type(e).__name__}"
+    result["total"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+async def replay(base_url, corpus, tokens, concurrency):
+    import httpx
+
+    lags = []
+    stop = asyncio.Event()
+
+    async def probe():
+        while not stop.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append((time.perf_counter() - t - PROBE_INTERVAL) * 1000)
+
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(600)) as http:
+        async def one(i):
+            async with sem:
+                return await one_request(http, base_url, corpus[i], tokens[i])
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(len(corpus))))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe_task
+    return results, elapsed, lags
+
+
+async def run(args):
+    if not args.real_mongo:
+        install_mongomock()
+
+    fake = await FakeLLMServer(
+        port=0, handshake_ms=args.handshake_ms, ttft_ms=args.ttft_ms, tokens=args.tokens,
+        token_ms=args.token_ms, reasoning_tokens=args.reasoning_tokens,
+        reasoner_ttft_ms=args.reasoner_ttft_ms
+    ).start()
+    os.environ["DEEPSEEK_API_KEY"] = "bench"
+    os.environ["DEEPSEEK_BASE_URL"] = fake.base_url
+    os.environ.setdefault("LLM_KEEPALIVE_PING_S", "0")
+
+    import uvicorn
+    corpus = build_corpus(args.requests, args.seed, args.model)
+    for payload in corpus:
+        if args.frame_ms is not None: payload["frame_ms"] = args.frame_ms
+        if args.frame_bytes is not None: payload["frame_bytes"] = args.frame_bytes
+    logs = io.StringIO()
+    quiet = contextlib.redirect_stdout(logs) if not args.verbose else contextlib.nullcontext()
+    with quiet:
+        os.chdir(BACKEND_DIR)
+        import server
+
+        port = free_port()
+        uv = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+        serve_task = asyncio.create_task(uv.serve())
+        while not uv.started:
+            await asyncio.sleep(0.05)
+
+        usernames = [f"bench{i}" for i in range(args.requests)]
+        server.db.users_col.delete_many({"username": {"$in": usernames}})
+        server.db.users_col.insert_many([{"username": u, "role": "pro", "email": f"{u}@bench.local"} for u in usernames])
+        tokens = [server.create_access_token({"sub": u}) for u in usernames]
+
+        results, elapsed, lags = await replay(f"http://127.0.0.1:{port}", corpus, tokens, args.concurrency)
+
+        server_side = {
+            "stream_metrics": server.stream_metrics.snapshot(),
+            "governor": server.llm_governor.stats(),
+            "hedge": server.llm_hedge.stats(),
+            "single_flight": server.analyze_flights.stats(),
+            "prompt_cache": server.prompt_cache.stats(),
+            "prompt_budget": server.prompt_budget.stats(),
+            "framing": server.stream_framer.stats.snapshot()
+        }
+        uv.should_exit = True
+        await serve_task
+    await fake.stop()
+
+    statuses = {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+    ok = [r for r in results if r["status"] == 200]
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "args": vars(args)
+        },
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2),
+        "status": statuses,
+        "queued": sum(1 for r in results if r["queued"]),
+        "latency_ms": {
+            "ttfb": summarize([r["ttfb"] for r in ok]),
+            "ttft": summarize([r["ttft"] for r in ok]),
+            "total": summarize([r["total"] for r in ok])
+        },
+        "loop_lag_ms": {
+            "p50": round(percentile(lags, 50), 2),
+            "p99": round(percentile(lags, 99), 2),
+            "max": round(max(lags) if lags else 0.0, 2)
+        },
+        "upstream": {"connections": fake.connections, "requests": fake.requests},
+        "server": server_side
+    }
+
+
+def print_report(report):
+    print(f"\n📊 /analyze x{report['requests']} @ c={report['meta']['args']['concurrency']} "
+          f"(commit {report['meta']['commit']}) —— {report['throughput_rps']} req/s, status {report['status']}")
+    print(f"{'metric':<10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, s in report["latency_ms"].items():
+        if s.get("count"):
+            print(f"{name:<10}{s['p50']:>10}{s['p95']:>10}{s['p99']:>10}{s['max']:>10}")
+    lag = report["loop_lag_ms"]
+    print(f"{'loop lag':<10}{lag['p50']:>10}{'':>10}{lag['p99']:>10}{lag['max']:>10}")
+
+
+def compare(old_path, new_path):
+    with open(old_path, encoding="utf-8") as f: old = json.load(f)
+    with open(new_path, encoding="utf-8") as f: new = json.load(f)
+
+    rows = [("throughput_rps", old["throughput_rps"], new["throughput_rps"])]
+    for name in ("ttfb", "ttft", "total"):
+        for p in ("p50", "p95", "p99"):
+            rows.append((f"{name} {p}", old["latency_ms"][name].get(p), new["latency_ms"][name].get(p)))
+    for p in ("p50", "p99", "max"):
+        rows.append((f"loop lag {p}", old["loop_lag_ms"][p], new["loop_lag_ms"][p]))
+
+    print(f"\n{'metric':<16}{old['meta']['commit'] or 'old':>12}{new['meta']['commit'] or 'new':>12}{'delta':>10}")
+    for name, a, b in rows:
+        delta = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else "-"
+        print(f"{name:<16}{str(a):>12}{str(b):>12}{delta:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/analyze 端到端压测 (本地 Mongo 替身 + LLM 替身)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=42, help="阵容语料的随机种子")
+    parser.add_argument("--model", choices=["chat", "reasoner", "mixed", "instant"], default="chat", help="instant = 纯规则即时分析 (不请求替身上游)")
+    parser.add_argument("--ttft-ms", type=float, default=300, help="替身首 token 延迟")
+    parser.add_argument("--token-ms", type=float, default=10, help="替身每个 token 的间隔 (速率 = 1000/token_ms)")
+    parser.add_argument("--tokens", type=int, default=80, help="正文 token 数")
+    parser.add_argument("--reasoning-tokens", type=int, default=0, help="reasoning_content 阶段的 token 数")
+    parser.add_argument("--reasoner-ttft-ms", type=float, help="deepseek-reasoner 单独的首 token 延迟 (配合 LLM_HEDGE_ENABLED=1 观察对冲)")
+    parser.add_argument("--handshake-ms", type=float, default=0, help="替身每条新连接的建连延迟")
+    parser.add_argument("--frame-ms", type=int, help="每个请求的分帧等待上限 (0 = 逐片直出)")
+    parser.add_argument("--frame-bytes", type=int, help="每个请求的单帧字节上限")
+    parser.add_argument("--real-mongo", action="store_true", help="连接 MONGO_URI 指定的真实 MongoDB")
+    parser.add_argument("--verbose", action="store_true", help="显示服务端日志")
+    parser.add_argument("--json", help="结果另存为 JSON (建议按 commit 命名)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="对比两次压测结果")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,102 @@
+"""
+🔌 上游冷启动基准：默认 AsyncOpenAI 传输 vs LLMTransport (连接池 + 预热 + 心跳)
+
+使用本地 LLM 替身 (benchmarks/fake_llm_server.py)，每条新连接注入 --handshake-ms 延迟：
+    cd backend && python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --burst 8 --handshake-ms 150 --idle-s 3
+
+场景：
+1. cold           默认传输，服务刚启动后的第一波并发请求 (每个请求都要现场建连)
+2. warmed         LLMTransport 启动时预热 burst 条连接
+3. idle/no-ping   预热后空闲超过 keep-alive 过期时间，无心跳 (连接已被回收)
+4. idle/ping      同上，但开启后台心跳 (连接一直是热的)
+指标为首 token 时间 (TTFT)。
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openai import AsyncOpenAI
+from core.llm_transport import LLMTransport
+from fake_llm_server import FakeLLMServer
+
+
+async def ttft(client):
+    start = time.perf_counter()
+    stream = await client.chat.completions.create(
+        model="deepseek-chat",
+        messages=[{"role": "user", "content": "bench"}],
+        stream=True
+    )
+    first = None
+    async for chunk in stream:
+        if first is None and chunk.choices and chunk.choices[0].delta.content:
+            first = (time.perf_counter() - start) * 1000
+    return first
+
+
+async def burst(client, n):
+    values = sorted(await asyncio.gather(*(ttft(client) for _ in range(n))))
+    return {"p50": round(values[len(values) // 2], 1), "max": round(values[-1], 1)}
+
+
+async def main(args):
+    server = await FakeLLMServer(port=0, handshake_ms=args.handshake_ms, ttft_ms=args.ttft_ms, tokens=10, token_ms=1).start()
+    results = []
+
+    def record(name, stats, connections_before):
+        results.append({"scenario": name, "ttft_ms": stats, "new_connections": server.connections - connections_before})
+
+    # 1. 默认传输：冷启动
+    before = server.connections
+    default_client = AsyncOpenAI(api_key="bench", base_url=server.base_url)
+    record("cold (default transport)", await burst(default_client, args.burst), before)
+    await default_client.close()
+
+    base = {"base_url": server.base_url, "warmup_connections": args.burst, "keepalive_expiry": args.idle_s / 2}
+
+    # 2. 预热
+    transport = LLMTransport("bench", dict(base, ping_interval=0))
+    await transport.start()
+    before = server.connections
+    record("warmed (LLMTransport)", await burst(transport.client, args.burst), before)
+
+    # 3. 空闲超过 keep-alive 过期时间，无心跳
+    await asyncio.sleep(args.idle_s)
+    before = server.connections
+    record("idle, no ping", await burst(transport.client, args.burst), before)
+    await transport.stop()
+
+    # 4. 空闲 + 心跳
+    transport = LLMTransport("bench", dict(base, ping_interval=args.idle_s / 3.3))  # 错开心跳与测量波次
+    await transport.start()
+    await asyncio.sleep(args.idle_s)
+    before = server.connections
+    record("idle, keep-alive ping", await burst(transport.client, args.burst), before)
+    await transport.stop()
+
+    await server.stop()
+
+    print(f"\n{'scenario':<28}{'ttft p50':>10}{'ttft max':>10}{'new conns':>11}")
+    for r in results:
+        print(f"{r['scenario']:<28}{r['ttft_ms']['p50']:>10}{r['ttft_ms']['max']:>10}{r['new_connections']:>11}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="上游冷启动基准 (本地 LLM 替身)")
+    parser.add_argument("--burst", type=int, default=8, help="每个场景的并发请求数")
+    parser.add_argument("--handshake-ms", type=float, default=150)
+    parser.add_argument("--ttft-ms", type=float, default=40)
+    parser.add_argument("--idle-s", type=float, default=3.0, help="空闲时长 (keep-alive 过期时间取其一半)")
+    parser.add_argument("--json", help="结果另存为 JSON")
+    asyncio.run(main(parser.parse_args()))
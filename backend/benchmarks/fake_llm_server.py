@@ -0,0 +1,179 @@
+"""
+🧪 本地 OpenAI 兼容 LLM 替身 (压测 / 冷启动基准用，不调用真实 DeepSeek)
+
+    cd backend && python benchmarks/fake_llm_server.py --port 9100 --handshake-ms 120
+    DEEPSEEK_BASE_URL=http://127.0.0.1:9100 python server.py
+
+- GET  /models                 -> 模型列表 (预热/心跳用)
+- POST /chat/completions       -> stream=true 时按 SSE 逐 token 输出，最后一片带 usage
+- 每条 *新* TCP 连接先等待 --handshake-ms 再开始处理 (模拟公网 TCP + TLS 握手的往返)，
+  同一连接上的后续请求 (keep-alive) 不再付出这段延迟 —— 冷启动惩罚因此可以在本地复现
+- 客户端中途关闭连接时立即停止生成，并记录 aborted / tokens_unsent (验证上游取消是否生效)
+"""
+
+import json
+import time
+import asyncio
+import argparse
+
+
+class FakeLLMServer:
+    def __init__(self, host="127.0.0.1", port=9100, handshake_ms=120, ttft_ms=80, tokens=40, token_ms=5,
+                 keepalive_s=300, reasoning_tokens=0, reasoner_ttft_ms=None):
+        self.host = host
+        self.port = port
+        self.handshake = handshake_ms / 1000
+        self.ttft = ttft_ms / 1000
+        # deepseek-reasoner 单独的首 token 延迟 (模拟 R1 长时间不出 token，用于对冲压测)
+        self.reasoner_ttft = reasoner_ttft_ms / 1000 if reasoner_ttft_ms is not None else None
+        self.tokens = tokens
+        self.token_interval = token_ms / 1000
+        self.keepalive = keepalive_s
+        self.reasoning_tokens = reasoning_tokens
+        self.connections = 0
+        self.closed = 0
+        self.requests = 0
+        self.tokens_sent = 0
+        self.aborted = 0          # 生成途中被客户端关闭的流
+        self.tokens_unsent = 0    # 因此没有生成的 token
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            await asyncio.sleep(self.handshake)
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+                self.requests += 1
+                await self._route(method, path.split("?")[0], body, reader, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.closed += 1
+            writer.close()
+
+    async def _route(self, method, path, body, reader, writer):
+        if method == "GET" and path.endswith("/models"):
+            payload = {"object": "list", "data": [{"id": "deepseek-chat", "object": "model"}, {"id": "deepseek-reasoner", "object": "model"}]}
+            return await self._json(writer, payload)
+        if method == "POST" and path.endswith("/chat/completions"):
+            req = json.loads(body or b"{}")
+            if req.get("stream"):
+                return await self._stream(reader, writer, req)
+            await asyncio.sleep(self.ttft + self.tokens * self.token_interval)
+            payload = {
+                "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": req.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok " * self.tokens}, "finish_reason": "stop"}],
+                "usage": self._usage(req)
+            }
+            return await self._json(writer, payload)
+        await self._json(writer, {"error": {"message": "not found"}}, status="404 Not Found")
+
+    def _usage(self, req):
+        prompt = sum(len(m.get("content", "")) for m in req.get("messages", []))
+        return {
+            "prompt_tokens": prompt, "completion_tokens": self.tokens + self.reasoning_tokens,
+            "total_tokens": prompt + self.tokens + self.reasoning_tokens,
+            "prompt_cache_hit_tokens": prompt // 2, "prompt_cache_miss_tokens": prompt - prompt // 2
+        }
+
+    async def _json(self, writer, payload, status="200 OK"):
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: keep-alive\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    async def _stream(self, reader, writer, req):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            b"Transfer-Encoding: chunked\r\nConnection: keep-alive\r\n\r\n"
+        )
+        await writer.drain()
+
+        async def send(obj):
+            data = ("data: " + (obj if isinstance(obj, str) else json.dumps(obj, ensure_ascii=False)) + "\n\n").encode("utf-8")
+            writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+            await writer.drain()
+
+        def chunk(delta, usage=None, finish=None):
+            return {
+                "id": "fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": req.get("model"),
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish}],
+                "usage": usage
+            }
+
+        slow = self.reasoner_ttft is not None and req.get("model") == "deepseek-reasoner"
+        await asyncio.sleep(self.reasoner_ttft if slow else self.ttft)
+        total = self.reasoning_tokens + self.tokens
+        for i in range(total):
+            if reader.at_eof():
+                # 客户端已关闭连接 (真实上游此时会停止生成、停止计费)
+                self.aborted += 1
+                self.tokens_unsent += total - i
+                raise ConnectionError("client closed")
+            await send(chunk({"reasoning_content": "想"} if i < self.reasoning_tokens else {"content": "字"}))
+            self.tokens_sent += 1
+            await asyncio.sleep(self.token_interval)
+        await send(chunk({}, finish="stop"))
+        if (req.get("stream_options") or {}).get("include_usage"):
+            await send(chunk({}, usage=self._usage(req)))
+        await send("[DONE]")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+async def main(args):
+    server = await FakeLLMServer(
+        args.host, args.port, args.handshake_ms, args.ttft_ms, args.tokens, args.token_ms,
+        reasoning_tokens=args.reasoning_tokens, reasoner_ttft_ms=args.reasoner_ttft_ms
+    ).start()
+    print(f"🧪 Fake LLM listening on {server.base_url} (handshake {args.handshake_ms}ms, ttft {args.ttft_ms}ms)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容 LLM 替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--handshake-ms", type=float, default=120, help="每条新连接的建连延迟 (模拟 TCP + TLS)")
+    parser.add_argument("--ttft-ms", type=float, default=80)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--token-ms", type=float, default=5)
+    parser.add_argument("--reasoning-tokens", type=int, default=0, help="先输出的 reasoning_content 数量 (模拟 R1)")
+    parser.add_argument("--reasoner-ttft-ms", type=float, help="deepseek-reasoner 单独的首 token 延迟")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
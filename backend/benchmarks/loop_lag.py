@@ -0,0 +1,154 @@
+"""
+⏱️ 事件循环延迟基准：/analyze 热路径的数据库调用 "直接同步调用" vs "异步数据层"
+
+默认使用 mongomock + 人为注入的单次查询延迟 (模拟慢查询)，无需真实 MongoDB：
+    cd backend && python benchmarks/loop_lag.py
+    python benchmarks/loop_lag.py --requests 300 --concurrency 60 --latency-ms 8
+
+连接真实 MongoDB (走 motor)：
+    MONGO_URI=mongodb://localhost:27017/bench python benchmarks/loop_lag.py --real
+
+探针任务每 5ms 醒来一次，记录实际唤醒时间比预期晚了多少 —— 这就是所有在线流式响应会额外感受到的卡顿。
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import functools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROBE_INTERVAL = 0.005
+DRAFT = ["Lee Sin", "Ahri", "Jinx", "Thresh", "Malphite", "Zed", "Jarvan IV", "Syndra", "Kai'Sa", "Nautilus"]
+
+
+def percentile(values, p):
+    if not values: return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def install_mongomock(latency_ms):
+    """把 pymongo 换成 mongomock，并给每次集合操作加上固定延迟"""
+    import mongomock
+    import core.database as cdb
+    from mongomock.collection import Collection
+
+    delay = latency_ms / 1000
+    for name in ("find_one", "find", "update_one", "update_many", "count_documents", "aggregate", "insert_one"):
+        original = getattr(Collection, name)
+
+        @functools.wraps(original)
+        def slow(self, *a, __original=original, **k):
+            time.sleep(delay)
+            return __original(self, *a, **k)
+        setattr(Collection, name, slow)
+
+    shared = mongomock.MongoClient()
+    cdb.MongoClient = lambda *a, **k: shared
+    os.environ["MONGO_ASYNC_DRIVER"] = "threadpool"  # mongomock 只能同步访问，用线程池实现代表 "不阻塞循环"
+
+
+def seed(db):
+    json_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "secure_data", "champions.json")
+    db.reload_champion_index(json_path)
+    for i in range(20):
+        db.users_col.update_one({"username": f"bench{i}"}, {"$set": {"username": f"bench{i}", "role": "pro"}}, upsert=True)
+    db.tips_col.insert_one({"hero": "Ahri", "enemy": "Zed", "content": "bench tip", "author_id": "bench0", "liked_by": []})
+    db.prompt_templates_col.update_one({"mode": "personal_lane"}, {"$set": {"system_template": "x", "user_template": "y"}}, upsert=True)
+
+
+async def hot_path_blocking(db, i):
+    """旧实现：async 端点里直接调用同步驱动"""
+    user = f"bench{i % 20}"
+    db.get_user(user)
+    db.check_and_update_usage(user, f"bench_{i}", "chat")
+    db.get_champion_infos(DRAFT)
+    db.get_top_knowledge_for_ai("Ahri", "Zed")
+    db.get_corrections("Ahri", "Zed", "MID", "default")
+    db.get_prompt_template("personal_lane")
+
+
+async def hot_path_async(adb, i):
+    user = f"bench{i % 20}"
+    await adb.get_user(user)
+    await adb.check_and_update_usage(user, f"bench_{i}", "chat")
+    await adb.get_champion_infos(DRAFT)
+    await adb.get_top_knowledge_for_ai("Ahri", "Zed")
+    await adb.get_corrections("Ahri", "Zed", "MID", "default")
+    await adb.get_prompt_template("personal_lane")
+
+
+async def run_scenario(name, handler, requests, concurrency):
+    lags = []
+    stop = asyncio.Event()
+
+    async def probe():
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            await handler(i)
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+
+    return {
+        "scenario": name,
+        "requests": requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "loop_lag_ms": {
+            "p50": round(percentile(lags, 50), 2),
+            "p99": round(percentile(lags, 99), 2),
+            "max": round(max(lags) if lags else 0.0, 2),
+        }
+    }
+
+
+async def main(args):
+    if not args.real:
+        install_mongomock(args.latency_ms)
+
+    from core.database import KnowledgeBase
+    from core.async_database import create_async_knowledge_base
+    db = KnowledgeBase()
+    seed(db)
+    adb = create_async_knowledge_base(db)
+
+    results = [
+        await run_scenario("blocking (sync driver on loop)", lambda i: hot_path_blocking(db, i), args.requests, args.concurrency),
+        await run_scenario(f"async ({adb.driver})", lambda i: hot_path_async(adb, i), args.requests, args.concurrency),
+    ]
+
+    print(f"\n{'scenario':<34}{'rps':>8}{'lag p50':>10}{'lag p99':>10}{'lag max':>10}")
+    for r in results:
+        lag = r["loop_lag_ms"]
+        print(f"{r['scenario']:<34}{r['throughput_rps']:>8}{lag['p50']:>10}{lag['p99']:>10}{lag['max']:>10}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="事件循环延迟基准 (同步驱动 vs 异步数据层)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="mongomock 模式下每次集合操作注入的延迟")
+    parser.add_argument("--real", action="store_true", help="连接 MONGO_URI 指定的真实 MongoDB")
+    parser.add_argument("--json", help="结果另存为 JSON")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+"""
+🧮 推荐打分微基准：旧版逐条打分 (recommend_heroes_legacy) vs 列式引擎 (ScoringEngine)
+
+champions 集合用 seed_data 的写法从 secure_data/champions.json 生成，固定种子随机阵容：
+    cd backend && python benchmarks/scoring_engine.py
+    python benchmarks/scoring_engine.py --drafts 2000 --pool-scale 4 --mongomock
+
+- 默认用纯内存集合 (只算 Python 打分本身，不含驱动 / 网络开销，是加速比的下限)
+- --mongomock 换成 mongomock 集合 (含查询解析 / 文档拷贝，更接近真实驱动的逐条开销)
+- --pool-scale N 把英雄池复制 N 份 (模拟更大的候选池)
+每个阵容先比对两边输出完全一致，再分别计时。
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from core.scoring_engine import ScoringEngine, recommend_heroes_legacy
+
+ROLES = ["TOP", "JUNGLE", "MID", "SUPPORT", "BOT"]
+
+
+class MemoryCollection:
+    """纯内存集合：find / find_one 按插入顺序等值匹配"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query):
+        return (d for d in self.docs if all(d.get(k) == v for k, v in query.items()))
+
+    def find_one(self, query):
+        return next(self.find(query), None)
+
+
+class BenchDB:
+    def __init__(self, collection):
+        self.champions_col = collection
+
+
+def build_docs(scale):
+    """与 seed_data 相同的字段形态 (小数胜率 / 数字 tier / 首字母大写 tags)，另混入字符串胜率与 "T1" tier"""
+    with open(os.path.join(BACKEND_DIR, "secure_data", "champions.json"), encoding="utf-8") as f:
+        items = json.load(f)
+    docs = []
+    for copy_idx in range(scale):
+        for i, item in enumerate(items):
+            name = item["name"] if copy_idx == 0 else f"{item['name']}#{copy_idx}"
+            doc = {"_id": f"{name}/{i}", "name": name, "alias": (item.get("alias") or []) + [name], "role": item.get("role"),
+                   "tags": [t.capitalize() for t in item.get("tags", [])]}
+            if i % 2:
+                doc.update(win_rate=item.get("win_rate"), tier=item.get("tier"))
+            else:
+                doc.update(win_rate=float(str(item.get("win_rate", "50%")).replace("%", "")) / 100, tier=3)
+            docs.append(doc)
+    return docs
+
+
+def time_per_call(fn, drafts):
+    start = time.perf_counter()
+    for role, team in drafts:
+        fn(role, team)
+    return (time.perf_counter() - start) / len(drafts) * 1e6
+
+
+def main(args):
+    docs = build_docs(args.pool_scale)
+    if args.mongomock:
+        import mongomock
+        collection = mongomock.MongoClient().db.champions
+        collection.insert_many([dict(d) for d in docs])
+    else:
+        collection = MemoryCollection(docs)
+    db = BenchDB(collection)
+
+    engine = ScoringEngine()
+    engine.build_from_collection(collection)
+
+    rng = random.Random(args.seed)
+    names = [d["name"] for d in docs]
+    drafts = [(rng.choice(ROLES), rng.sample(names, 5)) for _ in range(args.drafts)]
+
+    for role, team in drafts:
+        if engine.recommend(role, team) != recommend_heroes_legacy(db, role, team):
+            raise SystemExit(f"❌ 输出不一致: {role} {team}")
+    print(f"✅ {len(drafts)} 个阵容输出完全一致 (候选池 {len(docs)} 个英雄)")
+
+    legacy_us = time_per_call(lambda role, team: recommend_heroes_legacy(db, role, team), drafts)
+    engine_us = time_per_call(engine.recommend, drafts)
+    print(f"{'legacy':<10}{legacy_us:>10.1f} µs/次")
+    print(f"{'engine':<10}{engine_us:>10.1f} µs/次")
+    print(f"🚀 加速 {legacy_us / engine_us:.1f}x ({'mongomock' if args.mongomock else '内存集合'})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="推荐打分微基准 (旧版逐条 vs 列式引擎)")
+    parser.add_argument("--drafts", type=int, default=1000, help="随机阵容数")
+    parser.add_argument("--pool-scale", type=int, default=1, help="英雄池复制倍数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongomock", action="store_true", help="使用 mongomock 集合")
+    main(parser.parse_args())
@@ -0,0 +1,28 @@
+# build_matchup_matrix.py
+"""
+⚔️ 离线构建对位克制矩阵 (seed_data 之后运行；服务启动 / 热更新时也会按数据源摘要自动重建)
+    cd backend && python build_matchup_matrix.py [--out data/matchup_matrix.npy]
+"""
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.database import KnowledgeBase
+
+DEFAULT_OUT = os.getenv("MATCHUP_MATRIX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "matchup_matrix.npy"))
+
+
+def main(args):
+    db = KnowledgeBase()
+    matrix = db.reload_matchup_matrix(args.out)
+    if matrix is None:
+        raise SystemExit("❌ 对位矩阵构建失败 (数据库不可用或未安装 numpy)")
+    for key, value in matrix.stats().items():
+        print(f"   {key}: {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线构建对位克制矩阵")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="输出 .npy 路径 (元数据写同名 .json)")
+    main(parser.parse_args())
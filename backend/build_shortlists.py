@@ -0,0 +1,40 @@
+# build_shortlists.py
+"""
+📋 离线预计算推荐入围表 (seed_data 之后运行；服务启动 / 热更新时也会按 fingerprint 自动重建)
+    cd backend && python build_shortlists.py [--workers 8] [--out data/shortlists.npy]
+
+按 (分路, 阵容成分, 段位档, 对线敌人) 枚举全部 Top-12 入围结果，用进程池并行计算，
+写成 mmap 只读的 .npy + .json；/analyze 命中时直接查表。完成后打印构建耗时与表大小。
+"""
+import os
+import sys
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BACKEND_DIR)
+from core.database import KnowledgeBase
+from core.shortlist_table import meta_path
+
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
+
+
+def main(args):
+    db = KnowledgeBase()
+    db.reload_champion_index(os.path.join(BACKEND_DIR, "secure_data", "champions.json"))
+    db.reload_matchup_matrix(args.matrix)
+    # 离线任务总是重建 (不复用旧文件)，保证打印的是本次构建的耗时
+    for path in (args.out, meta_path(args.out)):
+        if os.path.exists(path): os.remove(path)
+    table = db.reload_shortlist_table(args.out, args.workers or None)
+    if table is None:
+        raise SystemExit("❌ 入围表构建失败 (数据库不可用或未安装 numpy)")
+    for key, value in table.stats().items():
+        print(f"   {key}: {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线预计算推荐入围表")
+    parser.add_argument("--out", default=os.getenv("SHORTLIST_TABLE_PATH", os.path.join(DATA_DIR, "shortlists.npy")), help="输出 .npy 路径 (元数据写同名 .json)")
+    parser.add_argument("--matrix", default=os.getenv("MATCHUP_MATRIX_PATH", os.path.join(DATA_DIR, "matchup_matrix.npy")), help="对位矩阵路径")
+    parser.add_argument("--workers", type=int, default=0, help="进程数 (0 = CPU 核数，1 = 不起进程池)")
+    main(parser.parse_args())
@@ -0,0 +1,182 @@
+# backend/core/async_database.py
+
+import os
+import asyncio
+
+from starlette.concurrency import run_in_threadpool
+
+from core.mongo_config import resolve_mongo_uri, mongo_client_options, select_database
+from core.usage_policy import resolve_membership, summarize_usage, evaluate_usage
+
+# motor 为可选依赖：未安装时退化为线程池包装 (同样不阻塞事件循环)
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:
+    AsyncIOMotorClient = None
+
+
+class AsyncKnowledgeBase:
+    """
+    ⚡ 热路径异步数据层 (motor)
+
+    覆盖 用户/额度、英雄、Tips、修正、Prompt 模板、私信 —— 即 /analyze、/users/me、私信接口用到的全部查询。
+    查询条件 / 计费规则全部复用同步 KnowledgeBase 的静态方法与 core/usage_policy.py，两边行为保持一致；
+    内存态 (英雄索引、机制库快照) 直接共享同步实例上的对象。
+    """
+
+    driver = "motor"
+
+    def __init__(self, sync_db):
+        self.sync = sync_db
+        self.client = AsyncIOMotorClient(resolve_mongo_uri(), **mongo_client_options())
+        self.db, _ = select_database(self.client)
+
+        self.users_col = self.db['users']
+        self.champions_col = self.db['champions']
+        self.tips_col = self.db['tips']
+        self.corrections_col = self.db['corrections']
+        self.prompt_templates_col = self.db['prompt_templates']
+        self.messages_col = self.db['messages']
+
+    # ==========================
+    # 👤 用户 & 额度
+    # ==========================
+    async def get_user(self, username):
+        return await self.users_col.find_one({"username": username})
+
+    async def get_user_by_id(self, user_id):
+        return await self.users_col.find_one({"_id": user_id})
+
+    async def get_users_by_names(self, usernames):
+        docs = await self.users_col.find({"username": {"$in": list(usernames)}}).to_list(length=None)
+        return {u['username']: u for u in docs}
+
+    async def _membership_of(self, user):
+        role, expired = resolve_membership(user)
+        if expired:
+            await self.users_col.update_one({"username": user["username"]}, {"$set": {"role": "user"}})
+        return role
+
+    async def check_membership_status(self, username):
+        return await self._membership_of(await self.get_user(username))
+
+    async def get_user_usage_status(self, username):
+        user = await self.get_user(username)
+        return summarize_usage(user, await self._membership_of(user))
+
+    async def check_and_update_usage(self, username, mode, model_type="chat"):
+        user = await self.get_user(username)
+        current_role = await self._membership_of(user)
+        allowed, msg, remaining, update = evaluate_usage(user, current_role, mode, model_type)
+        if update:
+            await self.users_col.update_one({"username": username}, update)
+        return allowed, msg, remaining
+
+    # ==========================
+    # 🗂️ 英雄 (内存索引优先，未命中合并成一次查询)
+    # ==========================
+    async def get_champion_infos(self, names):
+        found, missing = self.sync._resolve_from_index(names)
+        if not missing: return found, 0
+        try:
+            docs = await self.champions_col.find(self.sync._champion_batch_query(missing)).to_list(length=None)
+        except Exception as e:
+            print(f"⚠️ [AsyncDatabase] 英雄批量兜底查询失败: {e}")
+            docs = []
+        self.sync._match_fallback_docs(found, missing, docs)
+        return found, 1
+
+    # ==========================
+    # 📚 Tips / 修正 / 模板 (Prompt 组装)
+    # ==========================
+    async def get_top_knowledge_for_ai(self, hero, enemy, limit=6):
+        """
+        与同步版返回结构一致；AI 只需要正文，因此不再逐个查询作者会员状态
+        对位 Tips 与通用 Tips 两个查询并发执行
+        """
+        sort = self.sync.TIPS_SORT
+        matchup, general = await asyncio.gather(
+            self.tips_col.find({"hero": hero, "enemy": enemy}, {"content": 1}).sort(sort).limit(limit).to_list(length=limit),
+            self.tips_col.find({"hero": hero, "enemy": "general"}, {"content": 1}).sort(sort).limit(limit).to_list(length=limit)
+        )
+        # 与 get_mixed_tips 相同：对位不足 limit 条时才用通用 Tips 补齐
+        general = general[:max(0, limit - len(matchup))]
+        return {
+            "general": [t['content'] for t in general],
+            "matchup": [t['content'] for t in matchup]
+        }
+
+    async def get_corrections(self, my_hero, enemy_hero, my_role=None, mode=None):
+        try:
+            query = self.sync._corrections_query(my_hero, enemy_hero, my_role, mode)
+            return await self.corrections_col.find(query).sort("priority", -1).to_list(length=None)
+        except Exception as e:
+            print("get_corrections error:", e)
+            return []
+
+    async def get_prompt_template(self, mode):
+        return await self.prompt_templates_col.find_one({"mode": mode})
+
+    # ==========================
+    # 💬 私信
+    # ==========================
+    async def get_unread_count_total(self, username):
+        return await self.messages_col.count_documents({"receiver": username, "read": False})
+
+    async def send_message(self, sender, receiver, content, msg_type="user"):
+        receiver_user = await self.get_user(receiver)
+        if not receiver_user: return False, "用户不存在"
+        if sender in receiver_user.get("blocked_users", []): return False, "消息被拒收"
+        await self.messages_col.insert_one(self.sync._message_doc(sender, receiver, content, msg_type))
+        return True, "发送成功"
+
+    async def get_my_conversations(self, username):
+        try:
+            return await self.messages_col.aggregate(self.sync._conversations_pipeline(username)).to_list(length=None)
+        except: return []
+
+    async def get_chat_history(self, user1, user2, limit=50, before_time=None):
+        await self.messages_col.update_many(*self.sync._mark_read_update(user1, user2))
+        query = self.sync._chat_history_query(user1, user2, before_time)
+        docs = await self.messages_col.find(query).sort("created_at", -1).limit(limit).to_list(length=limit)
+        return self.sync._format_chat_history(docs)
+
+    async def delete_conversation(self, operator, target_user):
+        try:
+            await self.messages_col.update_many(*self.sync._delete_conversation_update(operator, target_user))
+            return True
+        except: return False
+
+
+class ThreadedKnowledgeBase:
+    """
+    🧵 兜底实现：把同步 KnowledgeBase 的同名方法丢进线程池执行
+    (未安装 motor、或 MONGO_ASYNC_DRIVER=threadpool 时使用，接口与 AsyncKnowledgeBase 完全一致)
+    """
+
+    driver = "threadpool"
+
+    def __init__(self, sync_db):
+        self.sync = sync_db
+
+    def __getattr__(self, name):
+        method = getattr(self.sync, name)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            return await run_in_threadpool(method, *args, **kwargs)
+        return call
+
+
+def create_async_knowledge_base(sync_db):
+    """按环境选择异步数据层实现 (MONGO_ASYNC_DRIVER: motor | threadpool)"""
+    preferred = os.getenv("MONGO_ASYNC_DRIVER", "motor").lower()
+    if preferred == "motor" and AsyncIOMotorClient is not None:
+        adb = AsyncKnowledgeBase(sync_db)
+    else:
+        if preferred == "motor":
+            print("⚠️ [AsyncDatabase] 未安装 motor，热路径查询改为线程池执行")
+        adb = ThreadedKnowledgeBase(sync_db)
+    print(f"✅ [AsyncDatabase] 异步数据层已就绪 (driver={adb.driver})")
+    return adb
@@ -0,0 +1,170 @@
+# backend/core/champion_index.py
+
+import re
+import json
+import time
+import datetime
+
+
+def split_camel_case(s):
+    """LeeSin -> Lee Sin (与旧版 get_champion_info 的拆分规则保持一致)"""
+    return re.sub(r'(?<!^)(?=[A-Z])', ' ', s)
+
+
+def _norm(value):
+    return str(value).strip().lower()
+
+
+class ChampionResolver:
+    """
+    🗂️ 英雄解析索引 (内存 O(1) 查找)
+
+    启动时由 champions.json + 已 seed 的 champions 集合构建，
+    把 id / name / alias / 驼峰拆分 的归一化形式全部映射到同一条标准记录。
+    热更新时先在局部变量里完整构建新索引，再一次性替换引用 (原子切换，读请求无锁)。
+    """
+
+    def __init__(self):
+        self._index = {}
+        self.version = 0
+        self.record_count = 0
+        self.built_at = None
+        self.build_ms = 0.0
+
+        # 命中统计
+        self.hits = 0
+        self.misses = 0
+        self.fallback_hits = 0
+
+    # ==========================
+    # 🔑 Key 生成
+    # ==========================
+    @staticmethod
+    def value_keys(value):
+        """索引侧：一个字段值 -> 归一化 key (原样小写 + 去空格小写)"""
+        if not value or not isinstance(value, str): return []
+        low = _norm(value)
+        keys = [low]
+        compact = low.replace(" ", "")
+        if compact != low: keys.append(compact)
+        return keys
+
+    @staticmethod
+    def lookup_keys(name_or_id):
+        """查询侧：复刻旧版 $or 的三种检索词 (原值 / 驼峰拆分 / 去空格)"""
+        raw = str(name_or_id).strip()
+        terms = [raw, split_camel_case(raw), raw.replace(" ", "")]
+        keys = []
+        for term in terms:
+            k = _norm(term)
+            if k and k not in keys: keys.append(k)
+        return keys
+
+    # ==========================
+    # 🏗️ 构建 / 重建
+    # ==========================
+    def build(self, db_docs=None, json_items=None):
+        """
+        :param db_docs: champions 集合中的文档 (标准记录，优先)
+        :param json_items: champions.json 原始条目 (补充别名，DB 缺失时合成兜底记录)
+        """
+        start = time.perf_counter()
+        index = {}
+        records = 0
+
+        def add(record, values):
+            for v in values:
+                for k in ChampionResolver.value_keys(v):
+                    # 先到先得：与 find_one 的自然顺序一致，避免重名英雄互相覆盖
+                    index.setdefault(k, record)
+
+        # 1. DB 标准记录 (先登记所有 id，保证英文 id 的优先级最高)
+        docs = list(db_docs or [])
+        for doc in docs:
+            add(doc, [doc.get("id"), doc.get("key")])
+        for doc in docs:
+            alias = doc.get("alias") or []
+            if isinstance(alias, str): alias = [alias]
+            add(doc, [doc.get("name"), doc.get("title")] + list(alias))
+            records += 1
+
+        # 2. champions.json：别名补充 + DB 未收录英雄的兜底记录
+        for item in json_items or []:
+            name = item.get("name")
+            if not name: continue
+            alias = [a for a in item.get("alias", []) if isinstance(a, str)]
+
+            record = None
+            for k in ChampionResolver.value_keys(name):
+                if k in index:
+                    record = index[k]
+                    break
+            if record is None:
+                record = {
+                    "id": name, "name": name, "alias": alias + [name],
+                    "role": str(item.get("role", "mid")).lower(),
+                    "tier": item.get("tier", "unknown"),
+                    "tags": [t.capitalize() for t in item.get("tags", [])],
+                    "_source": "json"
+                }
+                records += 1
+            add(record, [name] + alias)
+
+        # 3. 原子替换
+        self._index = index
+        self.record_count = records
+        self.version += 1
+        self.built_at = datetime.datetime.now(datetime.timezone.utc)
+        self.build_ms = (time.perf_counter() - start) * 1000
+        return len(index)
+
+    def build_from_sources(self, collection=None, json_path=None):
+        """从 Mongo 集合 + JSON 文件构建 (任一来源失败都不影响另一个)"""
+        db_docs = []
+        if collection is not None:
+            try:
+                db_docs = list(collection.find({}))
+            except Exception as e:
+                print(f"⚠️ [ChampionIndex] 读取 champions 集合失败: {e}")
+
+        json_items = []
+        if json_path:
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    json_items = json.load(f)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"⚠️ [ChampionIndex] 读取 {json_path} 失败: {e}")
+
+        size = self.build(db_docs, json_items)
+        print(f"✅ [ChampionIndex] v{self.version} 已构建: {self.record_count} 个英雄 / {size} 条索引 ({self.build_ms:.1f}ms)")
+        return size
+
+    # ==========================
+    # 🔍 查询
+    # ==========================
+    def resolve(self, name_or_id):
+        if not name_or_id: return None
+        index = self._index  # 取一次引用，重建期间读到的要么是旧索引要么是新索引
+        for k in self.lookup_keys(name_or_id):
+            record = index.get(k)
+            if record is not None:
+                self.hits += 1
+                return record
+        self.misses += 1
+        return None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "records": self.record_count,
+            "keys": len(self._index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fallback_hits": self.fallback_hits,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "built_at": self.built_at.isoformat() if self.built_at else None,
+            "build_ms": round(self.build_ms, 2)
+        }
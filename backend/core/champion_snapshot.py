@@ -0,0 +1,149 @@
+# backend/core/champion_snapshot.py
+
+import json
+import time
+import hashlib
+import datetime
+from types import MappingProxyType
+
+from core.champion_index import ChampionResolver
+
+# 己方阵容成分 (analyze_composition_tags)：any = 命中任一 tag 计数，none = 一个都不命中才计数
+COMPOSITION_RULES = {
+    "ap_count": {"any": ("mage", "support", "ap")},
+    "ad_count": {"none": ("mage", "support", "ap")},
+    "tank_count": {"any": ("tank", "fighter")},
+    "engagers": {"any": ("engage",)}  # 开团点
+}
+
+# 占位英雄名 (与 analyze_composition_tags 的跳过规则一致)
+PLACEHOLDER_NAMES = ("", "None")
+
+# 每次 seed 都会变、与内容无关的字段 (不计入摘要)
+VOLATILE_FIELDS = ("_id", "updated_at")
+
+
+def _doc_roles(doc):
+    """{"role": x} 查询也会命中数组字段中的元素"""
+    role = doc.get('role')
+    if isinstance(role, str): return [role]
+    if isinstance(role, list): return list(dict.fromkeys(r for r in role if isinstance(r, str)))
+    return []
+
+
+class ChampionSnapshot:
+    """
+    🗃️ champions 集合只读快照 (推荐阶段零数据库 IO)
+
+    启动 / 热更新 (seed_data 之后) 一次性读取 champions 集合，预先整理：
+    - pools：按 role 分组的候选文档 (集合自然顺序，与 find({"role": x}) 结果一致)
+    - flags：英雄 -> 阵容成分位 (AP / AD / 前排 / 开团，口径见 COMPOSITION_RULES)
+    查找先按原 name 精确匹配 (find_one 语义)，再按 id / 别名 / 驼峰拆分的归一化形式 (与英雄索引相同)，
+    因此前端传来的英文 id 也能命中中文 name 的文档。
+    重载时整体替换引用 (db.champion_snapshot)，读到的要么是旧快照要么是新快照。
+    """
+
+    __slots__ = ("seq", "version", "digest", "rules", "docs", "built_at", "build_ms", "_bits", "_pools", "_exact", "_keys", "_flags")
+
+    def __init__(self, docs=(), rules=None, seq=0):
+        start = time.perf_counter()
+        self.rules = rules or COMPOSITION_RULES
+        self.docs = tuple(docs)
+
+        # 摘要覆盖整条文档 (胜率 / tier 变化也会让依赖快照的入围表失效)
+        raw = json.dumps([{k: v for k, v in d.items() if k not in VOLATILE_FIELDS} for d in self.docs],
+                         sort_keys=True, ensure_ascii=False, default=str)
+        self.digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:8]
+        self.seq = seq
+        self.version = f"{seq}#{self.digest}"  # 重建序号 + 内容摘要
+
+        self._bits = {key: 1 << i for i, key in enumerate(self.rules)}
+        pools, exact, keys, flags = {}, {}, {}, {}
+        for pos, doc in enumerate(self.docs):
+            flags[pos] = self._flags_for(doc)
+            exact.setdefault(doc.get('name'), pos)  # 同名取第一条
+            for r in _doc_roles(doc):
+                pools.setdefault(r, []).append(doc)
+        # 归一化 key：先登记 id，再登记 name / 别名 (与 ChampionResolver 的优先级一致)
+        for pos, doc in enumerate(self.docs):
+            for value in (doc.get("id"), doc.get("key")):
+                for k in ChampionResolver.value_keys(value): keys.setdefault(k, pos)
+        for pos, doc in enumerate(self.docs):
+            alias = doc.get("alias") or []
+            if isinstance(alias, str): alias = [alias]
+            for value in [doc.get("name"), doc.get("title")] + list(alias):
+                for k in ChampionResolver.value_keys(value): keys.setdefault(k, pos)
+
+        self._pools = MappingProxyType({r: tuple(p) for r, p in pools.items()})
+        self._exact = MappingProxyType(exact)
+        self._keys = MappingProxyType(keys)
+        self._flags = MappingProxyType(flags)
+        self.built_at = datetime.datetime.now(datetime.timezone.utc)
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    @classmethod
+    def from_collection(cls, collection, rules=None, seq=0):
+        return cls(collection.find({}), rules, seq)
+
+    @property
+    def ready(self):
+        return bool(self.docs)
+
+    def _flags_for(self, doc):
+        tags = {t.lower() for t in doc.get('tags', [])}
+        flags = 0
+        for key, spec in self.rules.items():
+            if "any" in spec:
+                hit = bool(tags & set(spec["any"]))
+            else:
+                hit = not tags & set(spec.get("none", ()))
+            if hit: flags |= self._bits[key]
+        return flags
+
+    def _position(self, name):
+        if not name or name in PLACEHOLDER_NAMES or not isinstance(name, str): return None
+        pos = self._exact.get(name)
+        if pos is not None: return pos
+        for k in ChampionResolver.lookup_keys(name):
+            pos = self._keys.get(k)
+            if pos is not None: return pos
+        return None
+
+    # ==========================
+    # 🔍 查询 (纯内存)
+    # ==========================
+    def get(self, name):
+        """英雄文档 (未收录返回 None)"""
+        pos = self._position(name)
+        return None if pos is None else self.docs[pos]
+
+    def roles(self):
+        return list(self._pools)
+
+    def candidates(self, role):
+        """某个 role 的全部候选 (role 小写，与 champions 集合一致)"""
+        return self._pools.get(role, ())
+
+    def flags_of(self, name):
+        pos = self._position(name)
+        return None if pos is None else self._flags[pos]
+
+    def composition(self, team_list):
+        """己方阵容成分 (未收录英雄不计入)"""
+        stats = {key: 0 for key in self.rules}
+        for hero_name in team_list or []:
+            flags = self.flags_of(hero_name)
+            if flags is None: continue
+            for key, bit in self._bits.items():
+                if flags & bit: stats[key] += 1
+        return stats
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "champions": len(self.docs),
+            "roles": {role: len(pool) for role, pool in self._pools.items()},
+            "keys": len(self._keys),
+            "built_at": self.built_at.isoformat(),
+            "build_ms": round(self.build_ms, 2)
+        }
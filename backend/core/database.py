@@ -6,29 +6,53 @@ import time
 import re
 import json
 from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError, ConfigurationError 
+from pymongo.errors import ServerSelectionTimeoutError
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
+from core.champion_index import ChampionResolver, split_camel_case
+from core.mechanics_snapshot import MechanicsSnapshot
+from core.scoring_engine import ScoringEngine
+from core.champion_snapshot import ChampionSnapshot
+from core.role_inference import RoleInference
+from core.matchup_matrix import MatchupMatrix, build_matchup_matrix, source_digest
+from core.shortlist_table import ShortlistTable, build_shortlist_table, meta_path as shortlist_meta_path
+from core.mongo_config import resolve_mongo_uri, mongo_client_options, select_database
+from core.usage_policy import resolve_membership, summarize_usage, evaluate_usage
 
 class KnowledgeBase:
     def __init__(self):
         # 🟢 1. 获取 URI
-        self.uri = os.getenv("MONGO_URI") or os.getenv("MONGO_URL") or "mongodb://localhost:27017"
+        self.uri = resolve_mongo_uri()
         
         self._log_connection_attempt()
 
+        # 🗂️ 英雄内存索引 (启动/热更新时由 reload_champion_index 构建)
+        self.champion_resolver = ChampionResolver()
+        # 🗃️ champions 集合只读快照：分路候选池 + 阵容成分标志位 (与英雄索引同时重建)
+        self.champion_snapshot = ChampionSnapshot()
+        # 🧮 推荐打分列 (由英雄快照构建)
+        self.scoring_engine = ScoringEngine()
+        # 🧭 阵容分路推断 (由英雄快照的 positions 构建)
+        self.role_inference = RoleInference()
+        # ⚔️ 对位克制矩阵 (mmap 只读；启动/热更新时由 reload_matchup_matrix 替换)
+        self.matchup_matrix = None
+        # 📋 离线入围表 (mmap 只读；英雄快照 / 对位矩阵变化后由 reload_shortlist_table 重建)
+        self.shortlist_table = None
+        # 📚 S16 机制库只读快照 (启动/热更新时由 reload_mechanics_snapshot 替换)
+        self.mechanics_snapshot = MechanicsSnapshot()
+
         try:
-            self.client = MongoClient(self.uri, serverSelectionTimeoutMS=5000)
+            # 连接池配置与异步客户端 (core/async_database.py) 共用
+            self.client = MongoClient(self.uri, **mongo_client_options())
             
             # 🟢 2. 强制连通性检查
             self.client.admin.command('ping')
             
             # 🟢 3. 智能数据库选择
-            try:
-                self.db = self.client.get_default_database()
+            self.db, from_uri = select_database(self.client)
+            if from_uri:
                 print(f"✅ [Database] 使用 URI 指定的数据库: {self.db.name}")
-            except (ConfigurationError, ValueError):
-                self.db = self.client['lol_community']
+            else:
                 print(f"✅ [Database] URI 未指定库名，使用默认数据库: {self.db.name}")
             
             # === 集合定义 ===
@@ -134,12 +158,109 @@ class KnowledgeBase:
     # ==========================
     # 🔍 核心查询与数据获取
     # ==========================
-    def get_champion_info(self, name_or_id):
-        if not name_or_id: return None
-        
-        def split_camel_case(s):
-            return re.sub(r'(?<!^)(?=[A-Z])', ' ', s)
+    def reload_champion_index(self, json_path=None):
+        """重建英雄内存索引 (champions 集合 + champions.json)、英雄快照与推荐打分列，构建完成后原子替换"""
+        collection = getattr(self, "champions_col", None)
+        size = self.champion_resolver.build_from_sources(collection, json_path)
+        self.reload_champion_snapshot()
+        return size
+
+    def reload_champion_snapshot(self):
+        """读一次 champions 集合，整体替换英雄快照并重建打分列；读取失败时保留旧快照"""
+        collection = getattr(self, "champions_col", None)
+        if collection is None: return self.champion_snapshot
+        try:
+            snapshot = ChampionSnapshot.from_collection(collection, seq=self.champion_snapshot.seq + 1)
+        except Exception as e:
+            print(f"⚠️ [ChampionSnapshot] 读取 champions 集合失败，继续使用 v{self.champion_snapshot.version}: {e}")
+            return self.champion_snapshot
+        self.champion_snapshot = snapshot
+        print(f"✅ [ChampionSnapshot] v{snapshot.version} 已加载: {len(snapshot.docs)} 个英雄 / {len(snapshot.roles())} 个分路 ({snapshot.build_ms:.1f}ms)")
+        self.role_inference.build(snapshot)
+        if self.scoring_engine.build(snapshot):
+            print(f"✅ [ScoringEngine] v{self.scoring_engine.version} 已构建: {self.scoring_engine.champions} 条候选 ({self.scoring_engine.build_ms:.1f}ms)")
+        return snapshot
+
+    def reload_matchup_matrix(self, path):
+        """
+        读取 champions / corrections / tips 重建对位矩阵并挂到推荐打分引擎。
+        数据源摘要与磁盘上的矩阵一致时直接 mmap 旧文件；任何一步失败都保留旧矩阵。
+        """
+        if getattr(self, "champions_col", None) is None: return self.matchup_matrix
+        try:
+            champions = list(self.champions_col.find({}, {"_id": 0}))
+            corrections = list(self.corrections_col.find({}, {"_id": 0, "hero": 1, "enemy": 1, "type": 1, "_is_auto_mirror": 1}))
+            tips = list(self.tips_col.find({"enemy": {"$ne": "general"}, "is_fake": {"$ne": True}}, {"_id": 0, "hero": 1, "enemy": 1, "liked_by": 1}))
+            digest = source_digest(champions, corrections, tips)
+
+            matrix = None
+            if os.path.exists(path) and os.path.exists(MatchupMatrix.meta_path(path)):
+                cached = MatchupMatrix.load(path)
+                if cached.version == digest: matrix = cached
+            if matrix is None:
+                built = build_matchup_matrix(champions, corrections, tips)
+                built.save(path)
+                matrix = MatchupMatrix.load(path)
+                print(f"✅ [Matchup] 对位矩阵 {matrix.version} 已重建: {len(matrix.heroes)} 英雄 / {matrix.scores.nbytes // 1024}KB ({built.meta['build_ms']:.1f}ms)")
+            else:
+                print(f"✅ [Matchup] 对位矩阵 {matrix.version} 未变化，直接映射 {path}")
+        except Exception as e:
+            print(f"⚠️ [Matchup] 对位矩阵构建失败，继续使用旧矩阵: {e}")
+            return self.matchup_matrix
+        self.matchup_matrix = matrix
+        self.scoring_engine.attach_matchups(matrix)
+        return matrix
 
+    def reload_shortlist_table(self, path, workers=None):
+        """
+        按打分引擎当前状态 (英雄快照 + 对位矩阵 + 规则) 加载或重建入围表并挂到引擎上。
+        磁盘上的表 fingerprint 一致时直接 mmap；任何一步失败都保留旧表 (引擎自动改回实时打分)。
+        """
+        engine = self.scoring_engine
+        if not engine.ready: return self.shortlist_table
+        try:
+            table = None
+            if os.path.exists(path) and os.path.exists(shortlist_meta_path(path)):
+                cached = ShortlistTable.load(path)
+                if cached.fingerprint == engine.fingerprint(): table = cached
+            if table is None:
+                built = build_shortlist_table(engine, workers)
+                size = built.save(path)
+                table = ShortlistTable.load(path)
+                print(f"✅ [Shortlist] 入围表已重建: {table.meta['shape']} / {size // 1024}KB / "
+                      f"{table.meta['signatures']} 种阵容成分 -> {len(table.meta['states'])} 种加分状态 "
+                      f"({table.meta['build_ms']:.0f}ms, {table.meta['workers']} 进程)")
+            else:
+                print(f"✅ [Shortlist] 入围表未变化，直接映射 {path}")
+        except Exception as e:
+            print(f"⚠️ [Shortlist] 入围表构建失败，继续使用旧表: {e}")
+            return self.shortlist_table
+        self.shortlist_table = table
+        engine.attach_shortlists(table)
+        return table
+
+    def reload_mechanics_snapshot(self):
+        """从 s16_rules 文档重建机制库快照；读取失败时保留旧快照"""
+        try:
+            snapshot = MechanicsSnapshot(self.get_game_constants())
+        except Exception as e:
+            print(f"⚠️ [Mechanics] 机制库快照构建失败，继续使用 v{self.mechanics_snapshot.version}: {e}")
+            return self.mechanics_snapshot
+        self.mechanics_snapshot = snapshot
+        print(f"✅ [Mechanics] 快照 v{snapshot.version} 已加载 ({snapshot.build_ms:.1f}ms)")
+        return snapshot
+
+    @staticmethod
+    def fallback_champion_info(name_or_id):
+        """未收录英雄的临时兜底记录"""
+        return {
+            "id": name_or_id, "name": name_or_id, "alias": [name_or_id], 
+            "role": "unknown", "tier": "unknown",
+            "mechanic_type": "通用英雄", "power_spike": "全期"
+        }
+
+    @staticmethod
+    def _champion_or_conditions(name_or_id):
         search_terms = set()
         search_terms.add(name_or_id)
         split_name = split_camel_case(name_or_id)
@@ -157,19 +278,75 @@ class KnowledgeBase:
             or_conditions.append({"id": {"$regex": pattern, "$options": "i"}})
             or_conditions.append({"name": {"$regex": pattern, "$options": "i"}})
             or_conditions.append({"alias": {"$regex": pattern, "$options": "i"}})
+        return or_conditions
+
+    def get_champion_info(self, name_or_id):
+        if not name_or_id: return None
+
+        # 1. 内存索引 O(1) 命中
+        result = self.champion_resolver.resolve(name_or_id)
+        if result: return result
 
-        result = self.champions_col.find_one({"$or": or_conditions})
+        # 2. 索引未命中 -> Mongo 兜底 (保留旧版 $or 检索)
+        try:
+            result = self.champions_col.find_one({"$or": self._champion_or_conditions(name_or_id)})
+        except Exception as e:
+            print(f"⚠️ [Database] 英雄兜底查询失败: {e}")
+            result = None
+        if result: self.champion_resolver.fallback_hits += 1
         
         # 智能兜底
         if not result:
             print(f"⚠️ [Database] 未找到英雄 '{name_or_id}' (DB Miss)，启用临时兜底模式。")
-            return {
-                "id": name_or_id, "name": name_or_id, "alias": [name_or_id], 
-                "role": "unknown", "tier": "unknown",
-                "mechanic_type": "通用英雄", "power_spike": "全期"
-            }
+            return self.fallback_champion_info(name_or_id)
         return result
 
+    def get_champion_infos(self, names):
+        """
+        批量解析英雄 (整局阵容一次搞定)
+        :return: ({name: record}, Mongo 往返次数 0/1)
+        """
+        found, missing = self._resolve_from_index(names)
+        if not missing: return found, 0
+
+        # 所有未命中合并成一次 $or 查询，再用临时索引把结果对回各个名字
+        try:
+            docs = list(self.champions_col.find(self._champion_batch_query(missing)))
+        except Exception as e:
+            print(f"⚠️ [Database] 英雄批量兜底查询失败: {e}")
+            docs = []
+
+        self._match_fallback_docs(found, missing, docs)
+        return found, 1
+
+    # 以下三个辅助方法同时供 AsyncKnowledgeBase 复用
+    def _resolve_from_index(self, names):
+        found, missing = {}, []
+        for name in dict.fromkeys(n for n in names if n):
+            record = self.champion_resolver.resolve(name)
+            if record: found[name] = record
+            else: missing.append(name)
+        return found, missing
+
+    @classmethod
+    def _champion_batch_query(cls, missing):
+        or_conditions = []
+        for name in missing:
+            or_conditions.extend(cls._champion_or_conditions(name))
+        return {"$or": or_conditions}
+
+    def _match_fallback_docs(self, found, missing, docs):
+        local = ChampionResolver()
+        local.build(docs)
+        for name in missing:
+            record = local.resolve(name)
+            if record:
+                self.champion_resolver.fallback_hits += 1
+                found[name] = record
+            else:
+                print(f"⚠️ [Database] 未找到英雄 '{name}' (DB Miss)，启用临时兜底模式。")
+                found[name] = self.fallback_champion_info(name)
+
     # ==========================
     # 💬 私信系统
     # ==========================
@@ -182,16 +359,24 @@ class KnowledgeBase:
         if not receiver_user: return False, "用户不存在"
         if sender in receiver_user.get("blocked_users", []): return False, "消息被拒收"
 
-        msg = {
+        self.messages_col.insert_one(self._message_doc(sender, receiver, content, msg_type))
+        return True, "发送成功"
+
+    @staticmethod
+    def _message_doc(sender, receiver, content, msg_type="user"):
+        return {
             "sender": sender, "receiver": receiver, "content": content,
             "type": msg_type, "read": False, "deleted_by": [],
             "created_at": datetime.datetime.now(datetime.timezone.utc)
         }
-        self.messages_col.insert_one(msg)
-        return True, "发送成功"
 
     def get_my_conversations(self, username):
-        pipeline = [
+        try: return list(self.messages_col.aggregate(self._conversations_pipeline(username)))
+        except: return []
+
+    @staticmethod
+    def _conversations_pipeline(username):
+        return [
             {"$match": {
                 "$or": [{"sender": username}, {"receiver": username}],
                 "deleted_by": {"$ne": username}
@@ -206,14 +391,21 @@ class KnowledgeBase:
             }},
             {"$sort": {"last_message.created_at": -1}}
         ]
-        try: return list(self.messages_col.aggregate(pipeline))
-        except: return []
 
     def get_chat_history(self, user1, user2, limit=50, before_time=None):
-        self.messages_col.update_many(
+        self.messages_col.update_many(*self._mark_read_update(user1, user2))
+        cursor = self.messages_col.find(self._chat_history_query(user1, user2, before_time)).sort("created_at", -1).limit(limit)
+        return self._format_chat_history(cursor)
+
+    @staticmethod
+    def _mark_read_update(user1, user2):
+        return (
             {"sender": user2, "receiver": user1, "read": False, "deleted_by": {"$ne": user1}},
             {"$set": {"read": True}}
         )
+
+    @staticmethod
+    def _chat_history_query(user1, user2, before_time=None):
         query = {
             "$or": [{"sender": user1, "receiver": user2}, {"sender": user2, "receiver": user1}],
             "deleted_by": {"$ne": user1}
@@ -224,10 +416,12 @@ class KnowledgeBase:
                 else: b_time = before_time
                 query["created_at"] = {"$lt": b_time}
             except: pass
+        return query
 
-        cursor = self.messages_col.find(query).sort("created_at", -1).limit(limit)
+    @staticmethod
+    def _format_chat_history(docs):
         msgs = []
-        for m in cursor:
+        for m in docs:
             msgs.append({
                 "id": str(m["_id"]), "sender": m["sender"], "content": m["content"],
                 "type": m.get("type", "user"), "time": m["created_at"].strftime("%m-%d %H:%M"),
@@ -282,13 +476,17 @@ class KnowledgeBase:
     def delete_conversation(self, operator, target_user):
         if self.messages_col is None: return False
         try:
-            self.messages_col.update_many(
-                {"$or": [{"sender": operator, "receiver": target_user}, {"sender": target_user, "receiver": operator}]},
-                {"$addToSet": {"deleted_by": operator}}
-            )
+            self.messages_col.update_many(*self._delete_conversation_update(operator, target_user))
             return True
         except: return False
 
+    @staticmethod
+    def _delete_conversation_update(operator, target_user):
+        return (
+            {"$or": [{"sender": operator, "receiver": target_user}, {"sender": target_user, "receiver": operator}]},
+            {"$addToSet": {"deleted_by": operator}}
+        )
+
     # ==========================
     # ✨ 验证码管理
     # ==========================
@@ -419,154 +617,28 @@ class KnowledgeBase:
 
     def check_membership_status(self, username):
         user = self.users_col.find_one({"username": username})
-        if not user: return "user"
-        role = user.get("role", "user")
-        if role in ["pro", "vip", "svip"]:
-            expire_at = user.get("membership_expire")
-            if not expire_at: return role
-            now = datetime.datetime.now(datetime.timezone.utc)
-            if expire_at.tzinfo is None: expire_at = expire_at.replace(tzinfo=datetime.timezone.utc)
-            if expire_at < now:
-                self.users_col.update_one({"username": username}, {"$set": {"role": "user"}})
-                return "user"
-            return role
+        return self._membership_of(user)
+
+    def _membership_of(self, user):
+        """判定会员角色，过期则顺手降级写库"""
+        role, expired = resolve_membership(user)
+        if expired:
+            self.users_col.update_one({"username": user["username"]}, {"$set": {"role": "user"}})
         return role
 
     def get_user_usage_status(self, username):
-        current_role = self.check_membership_status(username)
         user = self.users_col.find_one({"username": username})
-        if not user: return {}
-        is_pro = current_role in ["vip", "svip", "admin", "pro"]
-        
-        # --- R1 (核心) 统计 ---
-        today_str = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
-        usage_data = user.get("usage_stats", {})
-        base_limit = 3
-        bonus = usage_data.get("bonus_r1", 0)
-        total_limit = base_limit + bonus
-        r1_used = sum(usage_data.get("counts_reasoner", {}).values()) if usage_data.get("last_reset_date") == today_str else 0
-        
-        # --- Chat (快速) 统计 [新增逻辑] ---
-        bonus_chat = usage_data.get("bonus_chat", 0)
-        base_hourly = 30 if is_pro else 10
-        chat_limit = base_hourly + bonus_chat
-        
-        # 计算当前小时已用 (逻辑同 check_and_update_usage)
-        chat_used = 0
-        hourly_start_str = usage_data.get("hourly_start")
-        if hourly_start_str:
-            try:
-                now = datetime.datetime.now(datetime.timezone.utc)
-                hourly_start = datetime.datetime.fromisoformat(hourly_start_str)
-                if hourly_start.tzinfo is None: hourly_start = hourly_start.replace(tzinfo=datetime.timezone.utc)
-                # 如果距离上次记录起始时间超过1小时，则当前已用视为0
-                if (now - hourly_start).total_seconds() <= 3600:
-                    chat_used = usage_data.get("hourly_count", 0)
-            except:
-                chat_used = 0
-
-        return {
-            "is_pro": is_pro, 
-            "role": current_role, 
-            "r1_limit": total_limit, 
-            "r1_used": r1_used, 
-            "r1_remaining": max(0, total_limit - r1_used) if not is_pro else -1,
-            # 🔥 新增返回字段
-            "chat_hourly_limit": chat_limit,
-            "chat_used": chat_used
-        }
+        current_role = self._membership_of(user)
+        return summarize_usage(user, current_role)
 
     def check_and_update_usage(self, username, mode, model_type="chat"):
-        # 1. 获取用户
-        current_role = self.check_membership_status(username)
+        # 判定规则见 core/usage_policy.py (与异步版共用)
         user = self.users_col.find_one({"username": username})
-        if not user: return False, "用户不存在", 0
-        
-        is_pro = current_role in ["vip", "svip", "admin", "pro"]
-        
-        # 余额检查
-        if model_type == "reasoner":
-            explicit_balance = user.get("r1_remaining")
-            if explicit_balance is not None and explicit_balance <= 0:
-                return False, "深度思考次数不足 (余额已耗尽)", -1
-        
-        now = datetime.datetime.now(datetime.timezone.utc)
-        today_str = now.strftime("%Y-%m-%d")
-        
-        # 2. 每日重置逻辑 (保留 Bonus)
-        usage_data = user.get("usage_stats", {})
-        if usage_data.get("last_reset_date") != today_str:
-            current_bonus_r1 = usage_data.get("bonus_r1", 0)
-            current_bonus_chat = usage_data.get("bonus_chat", 0)
-            usage_data = {
-                "last_reset_date": today_str, 
-                "counts_chat": {}, 
-                "counts_reasoner": {}, 
-                "last_access": {}, 
-                "hourly_start": now.isoformat(), 
-                "hourly_count": 0,
-                "bonus_r1": current_bonus_r1,
-                "bonus_chat": current_bonus_chat
-            }
-        
-        # 3. 频控 (Hour Limit)
-        bonus_chat = usage_data.get("bonus_chat", 0)
-        base_hourly = 30 if is_pro else 10
-        HOURLY_LIMIT = base_hourly + bonus_chat
-        
-        hourly_start_str = usage_data.get("hourly_start")
-        hourly_start = datetime.datetime.fromisoformat(hourly_start_str) if hourly_start_str else now
-        if hourly_start.tzinfo is None: hourly_start = hourly_start.replace(tzinfo=datetime.timezone.utc)
-        
-        if (now - hourly_start).total_seconds() > 3600: 
-            hourly_start, usage_data["hourly_count"] = now, 0
-            
-        if usage_data.get("hourly_count", 0) >= HOURLY_LIMIT:
-            return False, f"操作过于频繁 ({60 - int((now - hourly_start).total_seconds() / 60)}m)", 0
-
-        # 4. 冷却 (Cooldown)
-        COOLDOWN = 5 if is_pro else 15
-        last_time_str = usage_data.get("last_access", {}).get(mode)
-        if last_time_str:
-            try:
-                last_time = datetime.datetime.fromisoformat(last_time_str)
-                if last_time.tzinfo is None: last_time = last_time.replace(tzinfo=datetime.timezone.utc)
-                if (now - last_time).total_seconds() < COOLDOWN: 
-                    return False, "AI思考中", int(COOLDOWN - (now - last_time).total_seconds())
-            except: pass
-
-        # 5. R1 次数检查
-        if not is_pro and model_type == "reasoner":
-            bonus = usage_data.get("bonus_r1", 0)
-            daily_r1_limit = 3 + bonus 
-            used_today = sum(usage_data.get("counts_reasoner", {}).values())
-            if used_today >= daily_r1_limit: 
-                return False, f"深度思考限额已满 ({used_today}/{daily_r1_limit})", -1
-        
-        # 6. 更新统计
-        if model_type == "reasoner": 
-            usage_data["counts_reasoner"][mode] = usage_data["counts_reasoner"].get(mode, 0) + 1
-        else: 
-            usage_data["counts_chat"][mode] = usage_data["counts_chat"].get(mode, 0) + 1
-            
-        usage_data["last_access"][mode] = now.isoformat()
-        usage_data["hourly_count"] = usage_data.get("hourly_count", 0) + 1
-        usage_data["hourly_start"] = hourly_start.isoformat()
-        
-        # 🔥🔥🔥 核心修改：写入 last_active 和 total_usage (永久累加)
-        self.users_col.update_one(
-            {"username": username}, 
-            {
-                "$set": {
-                    "usage_stats": usage_data,
-                    "last_active": now  # 🟢 记录最后活跃时间戳 (方便排序)
-                },
-                "$inc": {
-                    "total_usage": 1    # 🟢 永久累加器 (不再每日清零)
-                }
-            }
-        )
-        return True, "OK", 0
+        current_role = self._membership_of(user)
+        allowed, msg, remaining, update = evaluate_usage(user, current_role, mode, model_type)
+        if update:
+            self.users_col.update_one({"username": username}, update)
+        return allowed, msg, remaining
     # ==========================
     # 🔥 管理员 & 统计功能
     # ==========================
@@ -589,6 +661,8 @@ class KnowledgeBase:
         return True
 
     def get_user(self, username): return self.users_col.find_one({"username": username})
+    def get_user_by_id(self, user_id): return self.users_col.find_one({"_id": user_id})
+    def get_users_by_names(self, usernames): return {u['username']: u for u in self.users_col.find({"username": {"$in": list(usernames)}})}
     # 找到 get_all_users 方法
     def get_all_users(self, limit=20, search="", skip=0):
         """
@@ -846,12 +920,15 @@ class KnowledgeBase:
             return True
         except: return False
 
+    # 社区 Tips 排序：真人优先，点赞多的优先
+    TIPS_SORT = [("is_fake", 1), ("liked_by", -1)]
+
     def get_mixed_tips(self, hero, enemy, limit=10):
-        matchup_tips = list(self.tips_col.find({"hero": hero, "enemy": enemy}).sort([("is_fake", 1), ("liked_by", -1)]).limit(limit))
+        matchup_tips = list(self.tips_col.find({"hero": hero, "enemy": enemy}).sort(self.TIPS_SORT).limit(limit))
         for t in matchup_tips: t['tag_label'] = "🔥 对位绝活"
         if len(matchup_tips) < limit:
             needed = limit - len(matchup_tips)
-            general_tips = list(self.tips_col.find({"hero": hero, "enemy": "general"}).sort([("is_fake", 1), ("liked_by", -1)]).limit(needed))
+            general_tips = list(self.tips_col.find({"hero": hero, "enemy": "general"}).sort(self.TIPS_SORT).limit(needed))
             for t in general_tips: t['tag_label'] = "📚 英雄必修"
             matchup_tips.extend(general_tips)
         
@@ -877,52 +954,54 @@ class KnowledgeBase:
             return []
 
         try:
-            # 1) 我方 Keys
-            hero_keys = [my_hero, "general"]
-            if my_hero and " " in my_hero:
-                hero_keys.append(my_hero.replace(" ", ""))
-
-            # 2) 注入位置 Keys & 模式处理
-            if my_role:
-                role_lower = my_role.lower()
-                hero_keys.append(f"role_{role_lower}")
-
-                if role_lower == "jungle":
-                    if mode == "role_jungle_farming":
-                        hero_keys.append("role_jungle_farming")
-                    elif mode == "role_jungle_ganking": 
-                        # ✅ server.py 传过来的新默认值
-                        hero_keys.append("role_jungle_ganking")
-                    else:
-                        # 兜底
-                        hero_keys.append("role_jungle_ganking")
-
-            # 3) 敌方 Keys
-            enemy_keys = [enemy_hero]
-            if enemy_hero and " " in enemy_hero:
-                enemy_keys.append(enemy_hero.replace(" ", ""))
-
-            query = {
-                "$or": [
-                    {
-                        "hero": {"$in": hero_keys},
-                        "enemy": {"$in": enemy_keys + ["general"]}
-                    },
-                    {
-                        "hero": {"$in": enemy_keys},
-                        "enemy": "general"
-                    }
-                ]
-            }
-
             # 按优先级排序 (priority 越高越前)
-            res = list(self.corrections_col.find(query).sort("priority", -1))
+            res = list(self.corrections_col.find(self._corrections_query(my_hero, enemy_hero, my_role, mode)).sort("priority", -1))
             return res
 
         except Exception as e:
             print("get_corrections error:", e)
             return []
 
+    @staticmethod
+    def _corrections_query(my_hero, enemy_hero, my_role=None, mode=None):
+        # 1) 我方 Keys
+        hero_keys = [my_hero, "general"]
+        if my_hero and " " in my_hero:
+            hero_keys.append(my_hero.replace(" ", ""))
+
+        # 2) 注入位置 Keys & 模式处理
+        if my_role:
+            role_lower = my_role.lower()
+            hero_keys.append(f"role_{role_lower}")
+
+            if role_lower == "jungle":
+                if mode == "role_jungle_farming":
+                    hero_keys.append("role_jungle_farming")
+                elif mode == "role_jungle_ganking": 
+                    # ✅ server.py 传过来的新默认值
+                    hero_keys.append("role_jungle_ganking")
+                else:
+                    # 兜底
+                    hero_keys.append("role_jungle_ganking")
+
+        # 3) 敌方 Keys
+        enemy_keys = [enemy_hero]
+        if enemy_hero and " " in enemy_hero:
+            enemy_keys.append(enemy_hero.replace(" ", ""))
+
+        return {
+            "$or": [
+                {
+                    "hero": {"$in": hero_keys},
+                    "enemy": {"$in": enemy_keys + ["general"]}
+                },
+                {
+                    "hero": {"$in": enemy_keys},
+                    "enemy": "general"
+                }
+            ]
+        }
+
 
     def get_all_feedbacks(self, status="pending", limit=50):
         query = {}
@@ -0,0 +1,85 @@
+# backend/core/draft_context.py
+
+# 占位英雄名：永远不会是真实英雄，直接走兜底记录，不触发数据层查询
+PLACEHOLDER_NAMES = {"Unknown", "None"}
+
+
+class DraftContext:
+    """
+    🧩 请求级阵容上下文 (/analyze 专用)
+
+    一次性收集 myHero / enemyHero / 双方阵容 / 分路指定中出现的全部英雄，
+    通过 db.get_champion_infos 批量解析 (索引命中零 IO，未命中合并成一次 Mongo 查询)。
+    后续分路推断、打野校验、中文翻译、战术标签全部从这里读，不再逐个查库。
+    """
+
+    # 全局累计统计 (证明每个请求最多一次数据层往返)
+    totals = {"requests": 0, "heroes": 0, "round_trips": 0, "max_round_trips": 0}
+
+    def __init__(self, db_instance, names, resolved=None):
+        """:param resolved: 已批量解析好的 (records, round_trips)，异步入口传入，避免构造时再查库"""
+        self._db = db_instance
+        self._records = {}
+        self.round_trips = 0
+        self.lookups = 0
+        if resolved is None:
+            self._resolve_batch(names)
+        else:
+            self._absorb(*resolved)
+
+        DraftContext.totals["requests"] += 1
+        DraftContext.totals["heroes"] += len(self._records)
+
+    @staticmethod
+    def collect_names(data):
+        names = [data.myHero, data.enemyHero] + list(data.myTeam or []) + list(data.enemyTeam or [])
+        for assignments in (data.myLaneAssignments, data.enemyLaneAssignments):
+            if assignments: names.extend(assignments.values())
+        return names
+
+    @classmethod
+    def from_request(cls, db_instance, data):
+        return cls(db_instance, cls.collect_names(data))
+
+    @classmethod
+    async def from_request_async(cls, adb, db_instance, data):
+        """异步入口：批量解析走 adb (不阻塞事件循环)，阵容外的零星查询仍由 db_instance 兜底"""
+        names = cls.collect_names(data)
+        pending = cls._pending(names, {})
+        resolved = await adb.get_champion_infos(pending) if pending else ({}, 0)
+        return cls(db_instance, names, resolved=resolved)
+
+    @staticmethod
+    def _pending(names, known):
+        pending = [n.strip() for n in names if n and isinstance(n, str) and n.strip() and n.strip() not in PLACEHOLDER_NAMES]
+        return [n for n in dict.fromkeys(pending) if n not in known]
+
+    def _resolve_batch(self, names):
+        pending = self._pending(names, self._records)
+        if not pending: return
+        self._absorb(*self._db.get_champion_infos(pending))
+
+    def _absorb(self, records, round_trips):
+        self._records.update(records)
+        self.round_trips += round_trips
+        DraftContext.totals["round_trips"] += round_trips
+        DraftContext.totals["max_round_trips"] = max(DraftContext.totals["max_round_trips"], self.round_trips)
+
+    def get(self, name):
+        """与 db.get_champion_info 语义一致：空值返回 None，未收录英雄返回兜底记录"""
+        if not name: return None
+        key = name.strip()
+        self.lookups += 1
+        if key in PLACEHOLDER_NAMES:
+            return self._db.fallback_champion_info(key)
+        if key not in self._records:
+            # 阵容之外的名字 (如推荐列表)：同样走批量接口，保证统计口径一致
+            self._resolve_batch([key])
+        return self._records.get(key)
+
+    def summary(self):
+        return f"{len(self._records)} heroes / {self.lookups} lookups / {self.round_trips} DB round trips"
+
+    @classmethod
+    def stats(cls):
+        return dict(cls.totals)
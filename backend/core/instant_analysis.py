@@ -0,0 +1,102 @@
+# backend/core/instant_analysis.py
+
+import os
+import json
+import time
+
+from core.stream_metrics import Histogram
+
+ROLE_CN = {"TOP": "上单", "JUNGLE": "打野", "MID": "中单", "ADC": "射手", "SUPPORT": "辅助"}
+
+SUMMARY_CHARS = 60
+
+DEGRADED_NOTES = {
+    "saturated": "AI 排队人数过多，已自动切换为即时要点",
+    "upstream_error": "AI 服务暂时不可用，已自动切换为即时要点"
+}
+
+
+def _brief(text, limit=SUMMARY_CHARS):
+    """一句话总结只取首个非空行，过长截断"""
+    line = next((l.strip() for l in str(text).splitlines() if l.strip()), "")
+    return line if len(line) <= limit else line[:limit] + "…"
+
+
+class InstantAnalyzer:
+    """
+    ⚡ 即时分析 (model_type="instant")：不调用 LLM，用上下文里现成的结构化数据拼出与 AI 输出同形的 JSON
+    {"concise": {"title", "content"}, "detailed_tabs": [{"title", "content"}, ...]}
+    - 数据来源：修正 (corrections) / S16 机制快照 / recommend_heroes_hybrid 推荐 / 社区 Tips
+    - 上游排队已满 (saturated) 或上游未产出就失败 (upstream_error) 时作为自动降级输出 (INSTANT_FALLBACK=0 关闭)
+    """
+
+    def __init__(self, fallback=None, max_items=None):
+        self.fallback = (os.getenv("INSTANT_FALLBACK", "1") == "1") if fallback is None else fallback
+        self.max_items = int(os.getenv("INSTANT_MAX_ITEMS", "6")) if max_items is None else max_items
+
+        self.requests = 0
+        self.degraded = {reason: 0 for reason in DEGRADED_NOTES}
+        self.build_ms = Histogram()
+
+    def build(self, ctx, reason=None):
+        """
+        :param ctx: build_analyze_context 的返回值 (读取 my_hero_cn / enemy_hero_cn / user_role_key / target_mode /
+                    corrections / tips / recommendations / mechanics)
+        :param reason: 降级原因 (saturated / upstream_error)，主动选择即时模式时为 None
+        :return: JSON 字符串
+        """
+        start = time.perf_counter()
+        role = ctx["user_role_key"]
+        role_cn = ROLE_CN.get(role, role)
+        limit = self.max_items
+        corrections = ctx["corrections"][:limit]
+        tips = ctx["tips"][:limit]
+        recs = ctx["recommendations"][:limit]
+        mechanics = ctx["mechanics"].items_for(role)[:limit]
+        is_bp = ctx["target_mode"] == "bp"
+
+        rec_lines = [
+            f"{i + 1}. {r['name_cn']} ({r.get('tier', 'T?')}级) - 适配分: {r.get('score', 0):.1f}" + (f" (对位 {r['counter']:+.1f})" if 'counter' in r else "")
+            for i, r in enumerate(recs)
+        ]
+        tabs = [
+            ("🧮 算法推荐", rec_lines),
+            ("📌 对位修正", [f"- {c}" for c in corrections]),
+            ("📚 社区锦囊", [f"- {t}" for t in tips]),
+            (f"🌍 分路机制 ({role_cn})", [f"- **{m.get('name')}**：{m.get('rule')}" + (f" ({m['note']})" if m.get('note') else "") for m in mechanics])
+        ]
+        if not is_bp:
+            tabs.append(tabs.pop(0))  # 已选英雄：推荐放最后，先看对线要点
+
+        # 一句话总结：每类取第一条
+        summary = ["【⚡ 即时模式】规则生成，未调用 AI" + (f" ({DEGRADED_NOTES[reason]})" if reason else "")]
+        if corrections: summary.append(f"【📌 关键修正】{_brief(corrections[0])}")
+        if tips: summary.append(f"【📚 社区锦囊】{_brief(tips[0])}")
+        if recs: summary.append(f"【🧮 推荐】{' / '.join(r['name_cn'] for r in recs[:3])}")
+
+        if is_bp:
+            title = f"⚡ BP 即时推荐 ({role_cn})"
+        elif ctx["enemy_hero_cn"] and ctx["enemy_hero_cn"] != "未知":
+            title = f"⚡ {ctx['my_hero_cn']} vs {ctx['enemy_hero_cn']} 即时要点"
+        else:
+            title = f"⚡ {ctx['my_hero_cn']} 即时要点"
+
+        doc = {
+            "concise": {"title": title, "content": "\n".join(summary)},
+            "detailed_tabs": [{"title": t, "content": "\n".join(lines)} for t, lines in tabs if lines]
+                             or [{"title": "📭 暂无数据", "content": "当前对局暂无可用的规则数据，请切换 AI 模型获取完整分析。"}]
+        }
+        out = json.dumps(doc, ensure_ascii=False)
+
+        self.requests += 1
+        if reason: self.degraded[reason] += 1
+        self.build_ms.observe((time.perf_counter() - start) * 1000)
+        return out
+
+    def stats(self):
+        return {
+            "fallback_enabled": self.fallback,
+            "requests": self.requests,
+            "degraded": dict(self.degraded),
+            "build_ms": self.build_ms.snapshot()
+        }
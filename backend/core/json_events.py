@@ -0,0 +1,365 @@
+# backend/core/json_events.py
+
+import json
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+QUEUE_OPEN = "<queue>"
+QUEUE_CLOSE = "</queue>"
+_MARKERS = (THINK_OPEN, THINK_CLOSE, QUEUE_OPEN)
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _child_path(path, key):
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return f"{path}.{key}" if path else key
+
+
+class IncrementalJsonParser:
+    """
+    🧩 增量 JSON 解析器 (容错版)
+
+    feed(text) 返回本段文本产生的事件；finish() 收尾并补全被截断的结构。
+    - section.start / section.done: 对象或数组开始 / 结束 (done 附带完整值)
+    - field.delta: 字符串值的增量片段 (已反转义)
+    - field.value: 数字 / 布尔 / null
+    顺手修复模型常见的格式问题，记录在 self.repairs：
+      JSON 前后的说明文字或 ```json 围栏、字符串里的裸换行、尾逗号、漏写的逗号、非法转义、
+      Python 风格字面量 (True/None)、max_tokens 截断导致的未闭合结构
+    """
+
+    def __init__(self):
+        self.stack = []          # [container, path, pending_key]
+        self.value = None
+        self.repairs = []
+        self.done = False
+        self._state = "seek"     # seek / value / after_value / key / colon / string / literal
+        self._string_is_key = False
+        self._buf = []           # 当前字符串 (完整内容)
+        self._pending = []       # 当前字符串尚未发出的片段
+        self._escape = None      # None / "" (刚读到反斜杠) / "uXXXX..." (读取中)
+        self._surrogate = None   # 等待配对的高位代理 (\ud83d 后面应紧跟 \udexx)
+        self._literal = []
+        self._comma_seen = False
+
+    # ---------- 工具 ----------
+    def _repair(self, name):
+        if name not in self.repairs:
+            self.repairs.append(name)
+
+    def _current_path(self):
+        if not self.stack: return ""
+        container, path, key = self.stack[-1]
+        if isinstance(container, list):
+            return _child_path(path, len(container))
+        return _child_path(path, key)
+
+    def _attach(self, value, events):
+        """把完成的值挂到父容器；根结束则整体完成"""
+        if not self.stack:
+            self.value = value
+            self.done = True
+            self._state = "seek"
+            return
+        container, path, key = self.stack[-1]
+        if isinstance(container, list):
+            container.append(value)
+        else:
+            container[key] = value
+            self.stack[-1][2] = None
+        self._state = "after_value"
+        self._comma_seen = False
+
+    def _open(self, container, events):
+        path = self._current_path()
+        self.stack.append([container, path, None])
+        events.append(("section.start", {"path": path}))
+        self._state = "key" if isinstance(container, dict) else "value"
+        self._comma_seen = False
+
+    def _close(self, events):
+        container, path, _ = self.stack.pop()
+        if self._comma_seen:
+            self._repair("trailing_comma")
+        events.append(("section.done", {"path": path, "value": container}))
+        self._attach(container, events)
+
+    def _flush_string(self, events):
+        if self._pending and not self._string_is_key:
+            events.append(("field.delta", {"path": self._current_path(), "text": "".join(self._pending)}))
+        self._pending = []
+
+    def _end_literal(self, events):
+        raw = "".join(self._literal)
+        self._literal = []
+        if raw in _LITERALS:
+            value = _LITERALS[raw]
+            if raw[0].isupper(): self._repair("python_literal")
+        else:
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                value = raw
+                self._repair("bad_literal")
+        events.append(("field.value", {"path": self._current_path(), "value": value}))
+        self._attach(value, events)
+
+    # ---------- 主循环 ----------
+    def feed(self, text):
+        events = []
+        for ch in text:
+            if self.done:
+                if not ch.isspace() and ch != "`":
+                    self._repair("trailing_text")
+                continue
+            self._step(ch, events)
+        if self._state == "string":
+            self._flush_string(events)
+        return events
+
+    def _step(self, ch, events):
+        state = self._state
+
+        if state == "string":
+            if self._escape is not None:
+                self._read_escape(ch)
+            elif ch == "\\":
+                self._escape = ""
+            elif ch == '"':
+                self._drop_surrogate()
+                self._flush_string(events)
+                text = "".join(self._buf)
+                self._buf = []
+                if self._string_is_key:
+                    self.stack[-1][2] = text
+                    self._state = "colon"
+                else:
+                    self._attach(text, events)
+            else:
+                if ch in "\n\r\t":
+                    self._repair("raw_control_char")
+                self._append(ch)
+            return
+
+        if state == "literal":
+            if ch.isalnum() or ch in "+-.eE":
+                self._literal.append(ch)
+                return
+            self._end_literal(events)
+            state = self._state  # 继续处理当前字符 (逗号 / 括号)
+
+        if state == "seek":
+            if ch == "{":
+                self._open({}, events)
+            elif not ch.isspace():
+                self._repair("leading_text")
+            return
+
+        if ch.isspace():
+            return
+
+        if state == "value":
+            if ch == "{":
+                self._open({}, events)
+            elif ch == "[":
+                self._open([], events)
+            elif ch == '"':
+                self._start_string(False)
+            elif ch in "}]":
+                container, _, key = self.stack[-1]
+                if isinstance(container, dict):
+                    # "key": } —— 值缺失
+                    self._repair("missing_value")
+                    container[key] = None
+                if ch != ("]" if isinstance(container, list) else "}"):
+                    self._repair("mismatched_bracket")
+                self._close(events)
+            elif ch == ",":
+                self._repair("extra_comma")
+            else:
+                self._literal = [ch]
+                self._state = "literal"
+            return
+
+        if state == "key":
+            if ch == '"':
+                self._start_string(True)
+            elif ch == "}":
+                self._close(events)
+            elif ch == ",":
+                self._repair("extra_comma")
+            else:
+                self._repair("unquoted_key")
+            return
+
+        if state == "colon":
+            if ch == ":":
+                self._state = "value"
+            else:
+                self._repair("missing_colon")
+                self._state = "value"
+                self._step(ch, events)
+            return
+
+        if state == "after_value":
+            container = self.stack[-1][0]
+            if ch == ",":
+                self._state = "key" if isinstance(container, dict) else "value"
+                self._comma_seen = True
+            elif ch == "}" and isinstance(container, dict):
+                self._close(events)
+            elif ch == "]" and isinstance(container, list):
+                self._close(events)
+            elif ch in "}]":
+                self._repair("mismatched_bracket")
+                self._close(events)
+            else:
+                # 漏写逗号：按新成员继续
+                self._repair("missing_comma")
+                self._state = "key" if isinstance(container, dict) else "value"
+                self._step(ch, events)
+
+    def _start_string(self, is_key):
+        self._state = "string"
+        self._string_is_key = is_key
+        self._buf = []
+        self._pending = []
+        self._surrogate = None
+        self._comma_seen = False
+
+    def _append(self, out):
+        self._drop_surrogate()
+        self._buf.append(out)
+        self._pending.append(out)
+
+    def _drop_surrogate(self):
+        """落单的代理项无法编码成 UTF-8，换成 U+FFFD"""
+        if self._surrogate is not None:
+            self._surrogate = None
+            self._repair("bad_escape")
+            self._buf.append("\ufffd")
+            self._pending.append("\ufffd")
+
+    def _read_escape(self, ch):
+        esc = self._escape + ch
+        if esc.startswith("u"):
+            if len(esc) < 5:
+                self._escape = esc
+                return
+            self._escape = None
+            try:
+                code = int(esc[1:], 16)
+            except ValueError:
+                self._repair("bad_escape")
+                self._append(esc)
+                return
+            if 0xD800 <= code < 0xDC00:
+                # 高位代理：等下一个 \uDC00-\uDFFF 合成一个字符 (emoji 等)
+                self._drop_surrogate()
+                self._surrogate = code
+            elif 0xDC00 <= code < 0xE000:
+                high, self._surrogate = self._surrogate, None
+                if high is None:
+                    self._repair("bad_escape")
+                    self._append("\ufffd")
+                else:
+                    self._append(chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)))
+            else:
+                self._append(chr(code))
+            return
+        elif ch in _ESCAPES:
+            out = _ESCAPES[ch]
+        else:
+            out = ch
+            self._repair("bad_escape")
+        self._escape = None
+        self._append(out)
+
+    def finish(self):
+        """流结束：补全被截断的字符串 / 字面量 / 容器"""
+        events = []
+        if self.done:
+            return events
+        if self._state == "seek" and not self.stack:
+            return events
+        self._repair("truncated")
+        if self._state == "string":
+            self._escape = None
+            self._step('"', events)
+        elif self._state == "literal":
+            self._end_literal(events)
+        while self.stack:
+            container, _, key = self.stack[-1]
+            if isinstance(container, dict) and key is not None:
+                container[key] = None
+            self._comma_seen = False
+            self._close(events)
+        return events
+
+
+async def analyze_events(source):
+    """
+    📡 把 /analyze 的文本流转换为 SSE 事件流
+    think.delta / queue / section.start / field.delta / field.value / section.done / done
+    """
+    parser = IncrementalJsonParser()
+    pending = ""
+    in_think = False
+    content_seen = []
+
+    def emit(events):
+        return "".join(format_sse(name, data) for name, data in events)
+
+    def handle_text(text):
+        if not text: return ""
+        if in_think:
+            return format_sse("think.delta", {"text": text})
+        content_seen.append(text)
+        return emit(parser.feed(text))
+
+    try:
+        async for chunk in source:
+            pending += chunk
+            out = []
+            while pending:
+                idx, marker = min(((pending.find(m), m) for m in _MARKERS if pending.find(m) >= 0), default=(-1, None))
+                if marker is None:
+                    # 结尾可能是被拆开的标记，留到下一片
+                    keep = max((len(pending) - i for i in range(max(0, len(pending) - len(THINK_CLOSE)), len(pending))
+                                if any(m.startswith(pending[i:]) for m in _MARKERS)), default=0)
+                    out.append(handle_text(pending[:len(pending) - keep]))
+                    pending = pending[len(pending) - keep:]
+                    break
+                out.append(handle_text(pending[:idx]))
+                if marker == QUEUE_OPEN:
+                    end = pending.find(QUEUE_CLOSE, idx)
+                    if end < 0:
+                        pending = pending[idx:]
+                        break
+                    try:
+                        out.append(format_sse("queue", json.loads(pending[idx + len(QUEUE_OPEN):end])))
+                    except ValueError:
+                        pass
+                    pending = pending[end + len(QUEUE_CLOSE):]
+                else:
+                    in_think = marker == THINK_OPEN
+                    pending = pending[idx + len(marker):]
+            frame = "".join(out)
+            if frame:
+                yield frame
+    finally:
+        await source.aclose()
+
+    tail = handle_text(pending) + emit(parser.finish())
+    yield tail + format_sse("done", {
+        "value": parser.value,
+        "repairs": parser.repairs,
+        "raw": None if parser.value is not None else "".join(content_seen)
+    })
@@ -0,0 +1,224 @@
+# backend/core/llm_governor.py
+
+import os
+import json
+import math
+import time
+import heapq
+import asyncio
+import itertools
+
+from core.stream_metrics import Histogram
+from core.usage_policy import PRO_ROLES
+
+# 优先级：数值越小越先出队
+PRIORITY_PRO = 0
+PRIORITY_DEFAULT = 1
+
+# 各模型默认并发上限 / 单次生成的初始耗时估计 (秒，之后按实际耗时滑动更新)
+DEFAULT_LIMITS = {"deepseek-chat": 32, "deepseek-reasoner": 16}
+DEFAULT_SERVICE_SECONDS = {"deepseek-chat": 15.0, "deepseek-reasoner": 45.0}
+
+QUEUE_MARKER = "<queue>{}</queue>"
+
+
+def priority_for_role(role):
+    """会员 (pro/vip/svip) 与管理员优先出队"""
+    return PRIORITY_PRO if role in PRO_ROLES else PRIORITY_DEFAULT
+
+
+class GovernorRejected(Exception):
+    """排队已满或预计等待过长：调用方应返回 429 + Retry-After (或降级为即时分析)"""
+
+    def __init__(self, model, retry_after, estimate, reason):
+        super().__init__(f"{model} {reason}")
+        self.model = model
+        self.retry_after = retry_after
+        self.estimate = estimate
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "future", "enqueued")
+
+    def __init__(self, priority, seq):
+        self.priority = priority
+        self.seq = seq
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.perf_counter()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _Lane:
+    """单个模型的准入通道：并发上限 + 优先级等待队列"""
+
+    def __init__(self, model, limit, max_queue, service_seconds):
+        self.model = model
+        self.limit = limit
+        self.max_queue = max_queue
+        self.service_seconds = service_seconds  # EWMA
+        self.active = 0
+        self.waiters = []   # heap[_Waiter]
+        self.wait_ms = Histogram()
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected = 0
+        self.abandoned = 0
+
+    def queued(self):
+        return [w for w in self.waiters if not w.future.done()]
+
+    def ahead_of(self, priority, seq=None):
+        """排在 (priority, seq) 之前的等待者数量；seq 为空表示新来的请求"""
+        if seq is None:
+            return sum(1 for w in self.queued() if w.priority <= priority)
+        return sum(1 for w in self.queued() if (w.priority, w.seq) < (priority, seq))
+
+    def estimate_wait(self, ahead):
+        if self.active < self.limit and ahead == 0:
+            return 0.0
+        # 每空出 limit 个槽位大约需要一个平均生成时长
+        return (ahead // self.limit + 1) * self.service_seconds
+
+    def observe_service(self, seconds, alpha=0.2):
+        self.service_seconds = (1 - alpha) * self.service_seconds + alpha * seconds
+
+    def release(self):
+        # 槽位直接移交给队首 (不先归还再抢，避免插队)
+        while self.waiters:
+            waiter = heapq.heappop(self.waiters)
+            if not waiter.future.done():
+                waiter.future.set_result(True)
+                return
+        self.active -= 1
+
+
+class LLMGovernor:
+    """
+    🚦 上游 DeepSeek 并发治理 (进程内)
+
+    - 每个模型一条独立通道：chat / reasoner 互不挤占
+    - 有界等待队列，会员优先出队；同优先级先来先服务
+    - check(): 请求入口快速判定，排队已满或预计等待超过阈值直接抛 GovernorRejected (429)
+    - guard(): 包裹上游流，排队期间向客户端推送 <queue>{"position":N,"eta":S}</queue> 标记
+    """
+
+    def __init__(self, name="LLMGovernor", limits=None, max_queue=None, max_wait=None, heartbeat=None):
+        self.name = name
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits["deepseek-chat"] = int(os.getenv("LLM_MAX_CONCURRENCY_CHAT", self.limits["deepseek-chat"]))
+        self.limits["deepseek-reasoner"] = int(os.getenv("LLM_MAX_CONCURRENCY_REASONER", self.limits["deepseek-reasoner"]))
+        if limits: self.limits.update(limits)
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("LLM_MAX_QUEUE", "100"))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("LLM_MAX_QUEUE_WAIT_S", "60"))
+        self.heartbeat = heartbeat if heartbeat is not None else float(os.getenv("LLM_QUEUE_HEARTBEAT_S", "2"))
+        self._lanes = {}
+        self._seq = itertools.count()
+
+    def _lane(self, model):
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = _Lane(
+                model,
+                self.limits.get(model, min(self.limits.values())),
+                self.max_queue,
+                DEFAULT_SERVICE_SECONDS.get(model, 30.0)
+            )
+            self._lanes[model] = lane
+        return lane
+
+    def check(self, model, priority=PRIORITY_DEFAULT):
+        """不占位的准入预判：返回预计等待秒数，超限则抛 GovernorRejected"""
+        lane = self._lane(model)
+        queued = len(lane.queued())
+        estimate = lane.estimate_wait(lane.ahead_of(priority))
+        if queued >= lane.max_queue:
+            reason = "排队已满"
+        elif estimate > self.max_wait:
+            reason = "预计等待过长"
+        else:
+            return estimate
+        lane.rejected += 1
+        retry_after = max(1, int(math.ceil(min(estimate, self.max_wait) / 2)))
+        raise GovernorRejected(model, retry_after, estimate, reason)
+
+    async def guard(self, model, priority, stream):
+        """
+        :param stream: 上游 async generator (拿到槽位后才开始迭代)
+        :return: async generator，先输出排队标记，再原样转发上游分片
+        """
+        lane = self._lane(model)
+        admitted = False
+        if lane.active < lane.limit and not lane.queued():
+            lane.active += 1
+            admitted = True
+            lane.wait_ms.observe(0)
+        else:
+            waiter = _Waiter(priority, next(self._seq))
+            heapq.heappush(lane.waiters, waiter)
+            lane.queued_total += 1
+            last = None
+            try:
+                while True:
+                    ahead = lane.ahead_of(priority, waiter.seq)
+                    marker = {"position": ahead + 1, "eta": round(lane.estimate_wait(ahead))}
+                    if marker != last:
+                        last = marker
+                        yield QUEUE_MARKER.format(json.dumps(marker))
+                    try:
+                        await asyncio.wait_for(asyncio.shield(waiter.future), self.heartbeat)
+                        break
+                    except asyncio.TimeoutError:
+                        last = None  # 心跳：位置没变也重发一次，保持连接活跃
+                admitted = True
+                lane.wait_ms.observe((time.perf_counter() - waiter.enqueued) * 1000)
+            finally:
+                if not admitted:
+                    if waiter.future.done() and not waiter.future.cancelled():
+                        lane.release()  # 刚被分配槽位就断开：转交给下一位
+                    else:
+                        waiter.future.cancel()
+                    lane.abandoned += 1
+                    await stream.aclose()
+
+        lane.admitted += 1
+        started = time.perf_counter()
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            lane.observe_service(time.perf_counter() - started)
+            lane.release()
+            await stream.aclose()
+
+    def try_acquire(self, model):
+        """非阻塞占位 (对冲请求用)：有空闲槽位且无人排队时才成功，成功后必须 release(model)"""
+        lane = self._lane(model)
+        if lane.active < lane.limit and not lane.queued():
+            lane.active += 1
+            lane.admitted += 1
+            return True
+        return False
+
+    def release(self, model):
+        self._lane(model).release()
+
+    def stats(self):
+        lanes = {}
+        for model, lane in self._lanes.items():
+            queued = lane.queued()
+            lanes[model] = {
+                "limit": lane.limit,
+                "active": lane.active,
+                "queued": len(queued),
+                "queued_pro": sum(1 for w in queued if w.priority == PRIORITY_PRO),
+                "admitted": lane.admitted,
+                "queued_total": lane.queued_total,
+                "rejected": lane.rejected,
+                "abandoned": lane.abandoned,
+                "service_seconds_ewma": round(lane.service_seconds, 2),
+                "wait_ms": lane.wait_ms.snapshot()
+            }
+        return {"max_queue": self.max_queue, "max_wait_s": self.max_wait, "lanes": lanes}
@@ -0,0 +1,145 @@
+# backend/core/llm_hedge.py
+
+import os
+import time
+import asyncio
+
+from core.stream_metrics import Histogram
+
+DEFAULT_FALLBACK_MODEL = "deepseek-chat"
+
+_DONE = object()
+
+
+class HedgePolicy:
+    """
+    🪂 首 token 超时对冲 (默认关闭，LLM_HEDGE_ENABLED=1 开启)
+
+    主模型 (如 deepseek-reasoner) 在 LLM_HEDGE_TTFT_S 秒内没有任何输出时，用同一 Prompt 并行发起
+    LLM_HEDGE_FALLBACK_MODEL 请求；谁先产出内容谁胜出，另一路立即关闭 (上游连接随之断开)。
+    - 对冲请求不排队：备用通道没有空闲槽位就不发起，继续等主模型
+    - 只在上游层面对冲，额度扣减 (check_and_update_usage) 仍然只发生一次
+    """
+
+    def __init__(self, enabled=None, deadline_s=None, fallback_model=None, governor=None):
+        self.enabled = (os.getenv("LLM_HEDGE_ENABLED", "0") == "1") if enabled is None else enabled
+        self.deadline = float(os.getenv("LLM_HEDGE_TTFT_S", "8")) if deadline_s is None else deadline_s
+        self.fallback_model = fallback_model or os.getenv("LLM_HEDGE_FALLBACK_MODEL", DEFAULT_FALLBACK_MODEL)
+        self.governor = governor
+
+        self.requests = 0         # 适用对冲的请求
+        self.fired = 0            # 超时并发起了备用请求
+        self.skipped = 0          # 超时但备用通道已满
+        self.wins = {"primary": 0, "fallback": 0}
+        self.first_token_ms = Histogram()  # 对冲请求中胜出方的首 token 时间 (从主请求开始计)
+
+    def applies(self, model):
+        return self.enabled and model != self.fallback_model
+
+    async def stream(self, primary, primary_probe, fallback_factory, outcome=None):
+        """
+        :param primary: 主模型的上游分片流 (core.llm_transport.stream_chat)
+        :param fallback_factory: 无参函数，返回 (备用分片流, 备用 probe)；只在对冲触发时调用
+        :param outcome: 可选 dict，结束后写入 {"winner": "primary" / "fallback", "hedged": bool}
+        """
+        self.requests += 1
+        outcome = {} if outcome is None else outcome
+        outcome.update(winner=None, hedged=False)
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        deadline = loop.time() + self.deadline
+        queue = asyncio.Queue()
+        streams, probes, tasks = {"primary": primary}, {"primary": primary_probe}, {}
+        acquired = False
+        winner = None
+        completed = False
+
+        async def pump(tag, source):
+            try:
+                async for piece in source:
+                    await queue.put((tag, piece))
+            except Exception as e:
+                await queue.put((tag, e))
+            finally:
+                await queue.put((tag, _DONE))
+
+        async def drop(tag):
+            """关闭落败 / 失败的一路：先停读取任务，再关闭分片流 (stream_chat 的 finally 关闭上游响应)"""
+            task = tasks.pop(tag, None)
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+            await streams[tag].aclose()
+            probes[tag].finish(cancelled=True)
+
+        tasks["primary"] = asyncio.create_task(pump("primary", primary))
+        try:
+            while True:
+                timeout = None
+                if winner is None and not outcome["hedged"] and deadline is not None:
+                    timeout = max(0.0, deadline - loop.time())
+                try:
+                    tag, item = await (asyncio.wait_for(queue.get(), timeout) if timeout is not None else queue.get())
+                except asyncio.TimeoutError:
+                    deadline = None
+                    if self.governor is not None and not self.governor.try_acquire(self.fallback_model):
+                        self.skipped += 1
+                        print(f"⏳ [Hedge] 首 token 超过 {self.deadline}s，但 {self.fallback_model} 通道已满，继续等待主模型")
+                        continue
+                    acquired = self.governor is not None
+                    streams["fallback"], probes["fallback"] = fallback_factory()
+                    tasks["fallback"] = asyncio.create_task(pump("fallback", streams["fallback"]))
+                    outcome["hedged"] = True
+                    self.fired += 1
+                    print(f"🪂 [Hedge] 首 token 超过 {self.deadline}s，并行发起 {self.fallback_model}")
+                    continue
+
+                if tag not in tasks or (winner is not None and tag != winner):
+                    continue  # 已关闭的一路残留在队列里的分片
+                if item is _DONE or isinstance(item, Exception):
+                    tasks.pop(tag, None)
+                    if isinstance(item, Exception): probes[tag].fail()
+                    if winner is None and tasks:
+                        # 一路没产出就结束 / 出错：交给另一路
+                        print(f"⚠️ [Hedge] {tag} 未产出内容即结束，等待另一路")
+                        continue
+                    if isinstance(item, Exception):
+                        raise item
+                    completed = True
+                    break
+
+                if winner is None:
+                    winner = tag
+                    outcome["winner"] = tag
+                    if outcome["hedged"]:
+                        self.wins[tag] += 1
+                        self.first_token_ms.observe((time.perf_counter() - started) * 1000)
+                        print(f"🏁 [Hedge] {tag} 先出首 token，关闭另一路")
+                        for other in [t for t in tasks if t != tag]:
+                            await drop(other)
+                yield item
+        finally:
+            for tag in list(tasks):
+                await drop(tag)
+            if "fallback" in probes:
+                probes["fallback"].finish(cancelled=not (completed and winner == "fallback"))
+            if acquired:
+                self.governor.release(self.fallback_model)
+
+    def stats(self):
+        decided = self.wins["primary"] + self.wins["fallback"]
+        return {
+            "enabled": self.enabled,
+            "deadline_s": self.deadline,
+            "fallback_model": self.fallback_model,
+            "requests": self.requests,
+            "fired": self.fired,
+            "skipped_no_capacity": self.skipped,
+            "fire_rate": round(self.fired / self.requests, 4) if self.requests else None,
+            "wins": dict(self.wins),
+            "fallback_win_rate": round(self.wins["fallback"] / decided, 4) if decided else None,
+            "hedged_first_token_ms": self.first_token_ms.snapshot()
+        }
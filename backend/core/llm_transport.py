@@ -0,0 +1,205 @@
+# backend/core/llm_transport.py
+
+import os
+import time
+import asyncio
+
+import httpx
+from openai import AsyncOpenAI
+
+try:
+    import h2  # noqa: F401  (httpx 的 HTTP/2 支持依赖 h2)
+except ImportError:
+    h2 = None
+
+DEFAULT_BASE_URL = "https://api.deepseek.com"
+
+
+def transport_options():
+    """上游 HTTP 连接池配置 (环境变量覆盖)"""
+    return {
+        "base_url": os.getenv("DEEPSEEK_BASE_URL", DEFAULT_BASE_URL),
+        "max_connections": int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100")),
+        "max_keepalive": int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "40")),
+        "keepalive_expiry": float(os.getenv("LLM_KEEPALIVE_EXPIRY_S", "90")),
+        "http2": os.getenv("LLM_HTTP2", "0") == "1",
+        "connect_timeout": float(os.getenv("LLM_CONNECT_TIMEOUT_S", "10")),
+        "read_timeout": float(os.getenv("LLM_READ_TIMEOUT_S", "300")),
+        "warmup_connections": int(os.getenv("LLM_WARMUP_CONNECTIONS", "2")),
+        "warmup_timeout": float(os.getenv("LLM_WARMUP_TIMEOUT_S", "5")),
+        # 心跳间隔需小于 keepalive_expiry，否则连接会在两次心跳之间过期
+        "ping_interval": float(os.getenv("LLM_KEEPALIVE_PING_S", "45")),
+    }
+
+
+class LLMTransport:
+    """
+    🔌 上游 (DeepSeek / OpenAI 兼容) HTTP 传输层
+
+    - 显式连接池上限与 keep-alive 过期时间，可选 HTTP/2 (需安装 h2)
+    - start(): 启动时预热 N 条连接 (TCP + TLS 握手提前完成)，并开启后台心跳
+    - 心跳定期复用这 N 条连接，避免空闲过期后首个分析请求重新握手
+    """
+
+    def __init__(self, api_key, options=None):
+        self.options = dict(transport_options())
+        if options: self.options.update(options)
+        opts = self.options
+
+        self.http2 = opts["http2"] and h2 is not None
+        if opts["http2"] and h2 is None:
+            print("⚠️ [LLMTransport] 未安装 h2，HTTP/2 已回退为 HTTP/1.1 (pip install h2)")
+
+        self.base_url = opts["base_url"].rstrip("/")
+        self.api_key = api_key
+        self.http = httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=opts["max_connections"],
+                max_keepalive_connections=opts["max_keepalive"],
+                keepalive_expiry=opts["keepalive_expiry"]
+            ),
+            timeout=httpx.Timeout(opts["read_timeout"], connect=opts["connect_timeout"]),
+            follow_redirects=True
+        )
+        self.client = AsyncOpenAI(api_key=api_key, base_url=self.base_url, http_client=self.http)
+
+        self._ping_task = None
+        self.warmups = 0
+        self.last_warmup_ms = None
+        self.pings = 0
+        self.ping_failures = 0
+
+    async def _touch(self, n):
+        """
+        同时占住 n 条连接各发一个轻量请求 (空闲连接不够时新建)
+        所有请求都拿到响应头之后才一起释放，否则快速返回的连接会被下一个请求复用，只刷新到其中几条
+        """
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        arrived = {"count": 0}
+        all_arrived = asyncio.Event()
+
+        def arrive():
+            arrived["count"] += 1
+            if arrived["count"] >= n: all_arrived.set()
+
+        async def one():
+            counted = False
+            try:
+                async with self.http.stream("GET", f"{self.base_url}/models", headers=headers) as resp:
+                    # 拿到响应头即说明握手已完成 (任何状态码，包括 401)；先占住连接等其余请求
+                    counted = True
+                    arrive()
+                    await all_arrived.wait()
+                    await resp.aread()  # 读完响应体，连接才能回到池里复用
+                    return resp.status_code
+            except Exception:
+                if not counted: arrive()
+                raise
+
+        results = await asyncio.gather(*(one() for _ in range(n)), return_exceptions=True)
+        return sum(1 for r in results if not isinstance(r, Exception))
+
+    async def warm_up(self, n=None):
+        n = self.options["warmup_connections"] if n is None else n
+        if n <= 0: return 0
+        start = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(self._touch(n), self.options["warmup_timeout"])
+        except asyncio.TimeoutError:
+            ok = 0
+        self.last_warmup_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.warmups += 1
+        if ok:
+            print(f"✅ [LLMTransport] 预热 {ok}/{n} 条上游连接 ({self.last_warmup_ms}ms, {'HTTP/2' if self.http2 else 'HTTP/1.1'})")
+        else:
+            print(f"⚠️ [LLMTransport] 上游连接预热失败 ({self.base_url})，首个请求将现场建连")
+        return ok
+
+    async def _ping_loop(self):
+        interval = self.options["ping_interval"]
+        n = max(1, self.options["warmup_connections"])
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                ok = await asyncio.wait_for(self._touch(n), self.options["warmup_timeout"])
+            except asyncio.TimeoutError:
+                ok = 0
+            self.pings += 1
+            if not ok: self.ping_failures += 1
+
+    async def start(self):
+        await self.warm_up()
+        if self.options["ping_interval"] > 0 and self.options["warmup_connections"] > 0 and self._ping_task is None:
+            self._ping_task = asyncio.create_task(self._ping_loop())
+
+    async def stop(self):
+        if self._ping_task:
+            self._ping_task.cancel()
+            try:
+                await self._ping_task
+            except asyncio.CancelledError:
+                pass
+            self._ping_task = None
+        await self.http.aclose()
+
+    def stats(self):
+        opts = self.options
+        return {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "max_connections": opts["max_connections"],
+            "max_keepalive": opts["max_keepalive"],
+            "keepalive_expiry_s": opts["keepalive_expiry"],
+            "warmup_connections": opts["warmup_connections"],
+            "last_warmup_ms": self.last_warmup_ms,
+            "ping_interval_s": opts["ping_interval"],
+            "pings": self.pings,
+            "ping_failures": self.ping_failures
+        }
+
+
+async def stream_chat(client, probe, **params):
+    """
+    🌊 上游流式补全 -> 文本分片 (reasoning_content 用 <think> / </think> 包裹)
+
+    无论正常结束、上游异常还是下游提前关闭 (客户端断开 -> aclose)，finally 都会显式关闭上游响应：
+    HTTP 连接立即断开 / 归还连接池，上游随之停止生成，不必等到 max_tokens 耗尽
+    """
+    stream = None
+    try:
+        probe.mark_request()
+        stream = await client.chat.completions.create(stream=True, **params)
+        probe.mark_connected()
+
+        is_thinking = False
+        async for chunk in stream:
+            if getattr(chunk, "usage", None):
+                probe.on_usage(chunk.usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+
+            # 1. 思考过程 (DeepSeek R1 特有)
+            reasoning = getattr(delta, "reasoning_content", None)
+            if reasoning:
+                probe.on_reasoning()
+                if not is_thinking:
+                    yield "<think>"
+                    is_thinking = True
+                yield reasoning
+
+            # 2. 正式回复
+            elif delta.content:
+                probe.on_content()
+                if is_thinking:
+                    yield "</think>"
+                    is_thinking = False
+                yield delta.content
+
+        # 🛡️ 兜底：防止流结束时思考标签没闭合
+        if is_thinking:
+            yield "</think>"
+    finally:
+        if stream is not None:
+            await stream.close()
@@ -0,0 +1,103 @@
+# backend/core/lru_cache.py
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class BoundedLRUCache:
+    """
+    📦 有界 LRU 缓存 (条目数 + 字节数双上限，可选 TTL)
+
+    - tag: 写入时打标签 (如英雄名)，可按标签精确失效
+    - generation: 每次失效都会递增；未命中时先取 generation，回填时若已变化则丢弃，
+      防止 "构建过程中恰好热更新" 把旧数据写回缓存
+    """
+
+    def __init__(self, name, max_entries=512, max_bytes=32 * 1024 * 1024, ttl=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._entries = OrderedDict()  # key -> (value, size, tag, expire_at)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, tag, expire_at = entry
+            if expire_at is not None and expire_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size, tag=None, generation=None):
+        """:return: 是否写入 (超过单条上限或 generation 过期时放弃)"""
+        if size > self.max_bytes: return False
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            expire_at = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = (value, size, tag, expire_at)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, tag=None, reason=""):
+        """tag 为空时整体清空，否则只清理该标签下的条目"""
+        with self._lock:
+            self.generation += 1
+            if tag is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self.bytes = 0
+            else:
+                keys = [k for k, e in self._entries.items() if e[2] == tag]
+                for k in keys: self._remove(k)
+                removed = len(keys)
+            self.invalidations += 1
+        if removed:
+            print(f"🧹 [{self.name}] 已失效 {removed} 条缓存 ({reason or 'manual'})")
+        return removed
+
+    def _remove(self, key):
+        _, size, _, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "avg_entry_bytes": int(self.bytes / len(self._entries)) if self._entries else 0,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "generation": self.generation
+        }
@@ -0,0 +1,230 @@
+# backend/core/matchup_matrix.py
+
+import os
+import re
+import json
+import time
+import hashlib
+import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ==========================================
+# 📐 对位打分规则 (声明式配置)
+# ==========================================
+MATCHUP_RULES = {
+    # 段位档权重：与 build_strategy_instruction 一致，低分段最看重对线克制，高分段让位于阵容
+    "rank_buckets": {"low": 1.0, "mid": 0.6, "high": 0.35},
+    # 同一分路的胜率差 (seed_data 存小数：0.5328)：1 个百分点 = 2 分，与基础分口径一致
+    "win_rate": {"weight": 200},
+    # tier 每差一档 (seed_data 存 1~5，越小越强)
+    "tier": {"weight": 2},
+    # 修正数据里的方向性结论 (hero 对 enemy)；RULE / FACT 是机制说明，不计分
+    "corrections": {"GUIDE": 8, "BAD": -8, "WARN": -8},
+    # 社区对位 Tips：有高赞打法可参考 -> 小幅加分 (点赞数封顶后线性折算)
+    "tips": {"weight": 3, "like_cap": 20},
+    # 单格上限 (避免个别异常数据压过基础分)
+    "clip": 30
+}
+
+DEFAULT_BUCKET = "low"  # 与 get_rank_bucket 的兜底一致
+ROLE_ALIASES = {"ADC": "BOT"}  # /analyze 的分路 key -> positions 的 key
+
+
+def matchup_key(name):
+    """Jarvan IV / JarvanIV / jarvan-iv -> jarvaniv (中文别名原样保留)"""
+    return re.sub(r"[\s'\.\-_]+", "", str(name)).lower()
+
+
+def source_digest(champions, corrections, tips):
+    """数据源摘要：没变化就直接 mmap 旧文件，不重建"""
+    raw = json.dumps([
+        [[d.get("id"), d.get("name"), d.get("role"), d.get("win_rate"), d.get("tier"), d.get("positions")] for d in champions],
+        [[c.get("hero"), c.get("enemy"), c.get("type"), bool(c.get("_is_auto_mirror"))] for c in corrections],
+        [[t.get("hero"), t.get("enemy"), len(t.get("liked_by") or [])] for t in tips]
+    ], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+class MatchupMatrix:
+    """
+    ⚔️ 对位克制矩阵 [段位档, 分路, 敌方英雄, 我方候选] (float16)
+
+    由 champions.positions (各分路胜率 / tier) + 修正 / 社区 Tips 的对位信号离线构建，
+    存成 .npy + .json 元数据，加载时 mmap 只读映射 (多 worker 共享同一份页缓存)。
+    vector() 取的是某个敌方英雄对全部候选的一整行，查询 O(1)。
+    """
+
+    def __init__(self, scores, heroes, roles, buckets, index, meta=None):
+        self.scores = scores      # ndarray / memmap，形状 (len(buckets), len(roles), H, H)
+        self.heroes = heroes      # 矩阵行列对应的英雄 (champions.id)
+        self.roles = roles        # ["TOP", "JUNGLE", ...] (positions 的 key)
+        self.buckets = buckets    # ["low", "mid", "high"]
+        self.index = index        # matchup_key(名称 / 别名) -> 行号
+        self.meta = meta or {}
+        self.path = None          # load() 时记录来源文件 (离线任务的子进程按路径重新映射)
+        self._role_pos = {r: i for i, r in enumerate(roles)}
+        self._bucket_pos = {b: i for i, b in enumerate(buckets)}
+
+    @property
+    def version(self):
+        return self.meta.get("digest")
+
+    def index_of(self, name):
+        if not name or name in ("None", "Unknown"): return None
+        return self.index.get(matchup_key(name))
+
+    def role_of(self, role):
+        role = str(role).upper()
+        return self._role_pos.get(ROLE_ALIASES.get(role, role))
+
+    def bucket_of(self, bucket):
+        return self._bucket_pos.get(bucket, self._bucket_pos.get(DEFAULT_BUCKET, 0))
+
+    def vector(self, enemy, role, bucket=None):
+        """:return: 全部候选对 enemy 的克制分 (按 heroes 顺序)；英雄 / 分路未知时 None"""
+        j, r = self.index_of(enemy), self.role_of(role)
+        if j is None or r is None: return None
+        return self.scores[self.bucket_of(bucket), r, j]
+
+    def score(self, hero, enemy, role, bucket=None):
+        i = self.index_of(hero)
+        row = self.vector(enemy, role, bucket)
+        return 0.0 if i is None or row is None else float(row[i])
+
+    # ==========================
+    # 💾 存取
+    # ==========================
+    @staticmethod
+    def meta_path(path):
+        return os.path.splitext(str(path))[0] + ".json"
+
+    def save(self, path):
+        """先写临时文件再 rename：读到的要么是旧矩阵要么是新矩阵"""
+        path = str(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npy"
+        np.save(tmp, np.ascontiguousarray(self.scores, dtype=np.float16))
+        meta = dict(self.meta, heroes=self.heroes, roles=self.roles, buckets=self.buckets, index=self.index)
+        with open(self.meta_path(path) + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        os.replace(self.meta_path(path) + ".tmp", self.meta_path(path))
+        return os.path.getsize(path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        if np is None:
+            raise RuntimeError("未安装 numpy，对位矩阵不可用")
+        with open(cls.meta_path(path), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        scores = np.load(str(path), mmap_mode="r" if mmap else None)
+        shape = (len(meta["buckets"]), len(meta["roles"]), len(meta["heroes"]), len(meta["heroes"]))
+        if scores.shape != shape:
+            raise ValueError(f"矩阵形状 {scores.shape} 与元数据 {shape} 不一致")
+        heroes, roles, buckets, index = meta.pop("heroes"), meta.pop("roles"), meta.pop("buckets"), meta.pop("index")
+        matrix = cls(scores, heroes, roles, buckets, index, meta)
+        matrix.path = str(path)
+        return matrix
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "heroes": len(self.heroes),
+            "roles": self.roles,
+            "buckets": self.buckets,
+            "bytes": int(self.scores.nbytes),
+            "mmap": isinstance(self.scores, np.memmap),
+            "built_at": self.meta.get("built_at"),
+            "build_ms": self.meta.get("build_ms"),
+            "signals": self.meta.get("signals")
+        }
+
+
+def build_matchup_matrix(champions, corrections=(), tips=(), rules=None):
+    """
+    :param champions: champions 集合文档 (positions: {"TOP": {"win_rate": 0.51, "tier": 2, ...}})
+    :param corrections: corrections 集合文档 (只用 hero / enemy / type，自动镜像的条目不计方向性信号)
+    :param tips: 对位 Tips (hero / enemy / liked_by / is_fake)
+    """
+    if np is None:
+        raise RuntimeError("未安装 numpy，对位矩阵不可用")
+    start = time.perf_counter()
+    rules = rules or MATCHUP_RULES
+    champions = list(champions)
+    corrections = list(corrections)
+    tips = list(tips)
+
+    heroes, index = [], {}
+    for doc in champions:
+        hero = doc.get("id") or doc.get("name")
+        if not hero or matchup_key(hero) in index: continue
+        alias = doc.get("alias") or []
+        if isinstance(alias, str): alias = [alias]
+        idx = len(heroes)
+        heroes.append(hero)
+        for name in [hero, doc.get("name"), doc.get("key"), doc.get("title")] + list(alias):
+            if name: index.setdefault(matchup_key(name), idx)
+
+    # 1. 分路强度：positions 缺失时退回主位置的顶层字段
+    roles = []
+    stats = {}
+    for doc in champions:
+        i = index.get(matchup_key(doc.get("id") or doc.get("name") or ""))
+        if i is None: continue
+        positions = doc.get("positions") or {str(doc.get("role", "")).upper(): doc}
+        for role, block in positions.items():
+            if not role or not isinstance(block, dict): continue
+            if role not in roles: roles.append(role)
+            try:
+                stats[(role, i)] = (float(block.get("win_rate")), float(block.get("tier")))
+            except (TypeError, ValueError):
+                continue
+
+    H, R = len(heroes), len(roles)
+    wr = np.zeros((R, H))
+    tier = np.zeros((R, H))
+    has = np.zeros((R, H), dtype=bool)
+    for (role, i), (w, t) in stats.items():
+        r = roles.index(role)
+        wr[r, i], tier[r, i], has[r, i] = w, t, True
+
+    # lane[r, j, i]：候选 i 在分路 r 对位敌方 j (双方都打这个位置才有强度差)
+    lane = rules["win_rate"]["weight"] * (wr[:, None, :] - wr[:, :, None]) + rules["tier"]["weight"] * (tier[:, :, None] - tier[:, None, :])
+    lane *= has[:, None, :] & has[:, :, None]
+
+    # 2. 对位信号 (与分路无关)：signal[j, i]
+    signal = np.zeros((H, H))
+    counted = {"corrections": 0, "tips": 0}
+    for c in corrections:
+        weight = rules["corrections"].get(c.get("type"))
+        if not weight or c.get("_is_auto_mirror"): continue
+        i, j = index.get(matchup_key(c.get("hero", ""))), index.get(matchup_key(c.get("enemy", "")))
+        if i is None or j is None or i == j: continue
+        signal[j, i] += weight
+        counted["corrections"] += 1
+
+    tip_rules = rules["tips"]
+    for t in tips:
+        if t.get("is_fake") or t.get("enemy") in (None, "general"): continue
+        i, j = index.get(matchup_key(t.get("hero", ""))), index.get(matchup_key(t.get("enemy", "")))
+        if i is None or j is None or i == j: continue
+        likes = min(len(t.get("liked_by") or []), tip_rules["like_cap"])
+        signal[j, i] += tip_rules["weight"] * likes / tip_rules["like_cap"]
+        counted["tips"] += 1
+
+    clip = rules["clip"]
+    base = np.clip(lane + signal[None, :, :], -clip, clip)
+    buckets = list(rules["rank_buckets"])
+    scores = np.stack([base * rules["rank_buckets"][b] for b in buckets]).astype(np.float16)
+
+    meta = {
+        "digest": source_digest(champions, corrections, tips),
+        "built_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "build_ms": round((time.perf_counter() - start) * 1000, 2),
+        "signals": counted
+    }
+    return MatchupMatrix(scores, heroes, roles, buckets, index, meta)
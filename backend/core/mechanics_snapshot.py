@@ -0,0 +1,95 @@
+# backend/core/mechanics_snapshot.py
+
+import copy
+import json
+import time
+import hashlib
+import datetime
+from types import MappingProxyType
+
+# /analyze 中 user_role_key 的全部取值
+ROLE_KEYS = ("TOP", "JUNGLE", "MID", "ADC", "SUPPORT")
+
+# 仅打野可见的模块
+JUNGLE_ONLY_MODULES = ("jungle_data", "jungle_pro_logic")
+
+
+def mechanics_items_for(modules, user_role_key):
+    """🔥 机制库分路过滤：data_modules -> 单个分路可见的机制条目 (保持原顺序)"""
+    items = []
+
+    for cat_key, cat_val in (modules or {}).items():
+        if isinstance(cat_val, dict) and 'items' in cat_val:
+
+            # 1. 屏蔽打野专属数据 / 打野高阶博弈 (如果是线上玩家)
+            if cat_key in JUNGLE_ONLY_MODULES and user_role_key != 'JUNGLE':
+                continue
+
+            for item in cat_val['items']:
+                # 2. 分路任务精确过滤：item 定义了 role_key (例如 "TOP") 且与当前分路不一致则跳过
+                target_role = item.get('role_key')
+                if target_role and target_role != user_role_key:
+                    continue
+
+                items.append(item)
+
+    return items
+
+
+def build_mechanics_context(modules, user_role_key):
+    """机制条目 -> 单个分路的 s16_context 字符串"""
+    mechanics_list = [f"{item.get('name')}: {item.get('rule')} ({item.get('note')})" for item in mechanics_items_for(modules, user_role_key)]
+    s16_details = "; ".join(mechanics_list)
+    return f"【S16/分路与机制库】: {s16_details if s16_details else '暂无特殊机制数据'}"
+
+
+class MechanicsSnapshot:
+    """
+    📚 S16 机制库只读快照
+
+    启动 / 热更新时从 s16_rules 文档一次性构建，五个分路的 s16_context 预先拼好；
+    请求只读不写，重载时整体替换引用 (db.mechanics_snapshot)，读到的要么是旧快照要么是新快照。
+    version 形如 "4.3#1a2b3c4d" (文件 _meta.version + 内容摘要)，随每次分析打印，便于排查。
+    """
+
+    __slots__ = ("version", "meta_version", "digest", "loaded_at", "build_ms", "_contexts", "_modules")
+
+    def __init__(self, game_constants=None):
+        start = time.perf_counter()
+        game_constants = game_constants or {}
+        modules = copy.deepcopy(game_constants.get('data_modules', {}))
+
+        raw = json.dumps(modules, sort_keys=True, ensure_ascii=False, default=str)
+        self.digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:8]
+        self.meta_version = str((game_constants.get('_meta') or {}).get('version', '0'))
+        self.version = f"{self.meta_version}#{self.digest}"
+
+        contexts = {role: build_mechanics_context(modules, role) for role in ROLE_KEYS}
+        self._modules = modules
+        self.loaded_at = datetime.datetime.now(datetime.timezone.utc)
+        self.build_ms = (time.perf_counter() - start) * 1000
+        self._contexts = MappingProxyType(contexts)  # 最后赋值：此后实例只读
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "_contexts"):
+            raise AttributeError("MechanicsSnapshot 是只读的，请重新构建并替换")
+        object.__setattr__(self, name, value)
+
+    def context_for(self, user_role_key):
+        context = self._contexts.get(user_role_key)
+        if context is None:
+            # 非标准分路 (理论上不会出现)：按同一规则现算，不写回快照
+            context = build_mechanics_context(self._modules, user_role_key)
+        return context
+
+    def items_for(self, user_role_key):
+        """分路可见的机制条目 (即时模式直接取结构化数据，不解析 context 字符串)"""
+        return mechanics_items_for(self._modules, user_role_key)
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "roles": {role: len(ctx) for role, ctx in self._contexts.items()},
+            "loaded_at": self.loaded_at.isoformat(),
+            "build_ms": round(self.build_ms, 2)
+        }
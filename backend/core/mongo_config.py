@@ -0,0 +1,39 @@
+# backend/core/mongo_config.py
+
+import os
+from pymongo.errors import ConfigurationError
+
+# URI 未指定库名时使用的默认库
+DEFAULT_DB_NAME = "lol_community"
+
+
+def resolve_mongo_uri():
+    return os.getenv("MONGO_URI") or os.getenv("MONGO_URL") or "mongodb://localhost:27017"
+
+
+def mongo_client_options():
+    """
+    同步 (pymongo) 与异步 (motor) 客户端共用的连接池配置
+    未设置的可选项不传，沿用驱动默认值
+    """
+    options = {
+        "serverSelectionTimeoutMS": 5000,
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+    }
+    optional = {
+        "maxIdleTimeMS": "MONGO_MAX_IDLE_MS",
+        "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    }
+    for key, env_name in optional.items():
+        value = os.getenv(env_name)
+        if value: options[key] = int(value)
+    return options
+
+
+def select_database(client):
+    """优先使用 URI 中的库名，否则回退到默认库；返回 (database, 是否来自 URI)"""
+    try:
+        return client.get_default_database(), True
+    except (ConfigurationError, ValueError):
+        return client[DEFAULT_DB_NAME], False
@@ -0,0 +1,135 @@
+# backend/core/prompt_budget.py
+
+import os
+import re
+import json
+import math
+import threading
+from functools import lru_cache
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+# DeepSeek 官方换算：1 个中文字符 ≈ 0.6 token，1 个英文字符 ≈ 0.3 token (无分词器时的离线估算)
+CJK_TOKEN_RATIO = 0.6
+OTHER_TOKEN_RATIO = 0.3
+_CJK_RE = re.compile(r"[\u2e80-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+# 各模板模式的 System Prompt 总预算 (token)，PROMPT_TOKEN_BUDGETS='{"team": 8000}' 覆盖
+DEFAULT_BUDGETS = {
+    "bp": 3500,
+    "personal_lane": 4000,
+    "personal_jungle": 5000,
+    "role_jungle_farming": 5000,
+    "team": 6000,
+}
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def _load_tokenizer():
+    """可选：DEEPSEEK_TOKENIZER_PATH 指向 DeepSeek 的 tokenizer.json 时使用真实分词"""
+    global _tokenizer
+    path = os.getenv("DEEPSEEK_TOKENIZER_PATH")
+    if _tokenizer is not None or not path or Tokenizer is None:
+        return _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            try:
+                _tokenizer = Tokenizer.from_file(path)
+                print(f"✅ [PromptBudget] 已加载分词器: {path}")
+            except Exception as e:
+                print(f"⚠️ [PromptBudget] 分词器加载失败，改用字符估算: {e}")
+                _tokenizer = False
+    return _tokenizer
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text):
+    """单个片段的 token 数 (结果按文本缓存，同一条 Tips/修正只计算一次)"""
+    if not text: return 0
+    tokenizer = _load_tokenizer()
+    if tokenizer:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    cjk = len(_CJK_RE.findall(text))
+    return int(math.ceil(cjk * CJK_TOKEN_RATIO + (len(text) - cjk) * OTHER_TOKEN_RATIO))
+
+
+class PromptBudget:
+    """
+    ✂️ Prompt token 预算 (按模板模式)
+
+    固定部分 (元规则 + 模板 + 机制库 + 策略指令) 先计入，剩余额度按分组顺序、组内按优先级贪心装入；
+    装不下的片段跳过 (后面更短的片段仍可能装下)，不截断单条内容。
+    """
+
+    def __init__(self, budgets=None, default_budget=None):
+        self.budgets = dict(DEFAULT_BUDGETS)
+        try:
+            self.budgets.update(json.loads(os.getenv("PROMPT_TOKEN_BUDGETS", "{}")))
+        except ValueError as e:
+            print(f"⚠️ [PromptBudget] PROMPT_TOKEN_BUDGETS 解析失败，使用默认预算: {e}")
+        if budgets: self.budgets.update(budgets)
+        self.default_budget = default_budget or int(os.getenv("PROMPT_TOKEN_BUDGET", "5000"))
+
+        self.fills = 0
+        self.trimmed_fills = 0
+        self.trimmed_snippets = 0
+        self.trimmed_tokens = 0
+
+    def budget_for(self, mode):
+        return self.budgets.get(mode, self.default_budget)
+
+    def fill(self, mode, fixed_parts, groups):
+        """
+        :param fixed_parts: 必须保留的部分 (只用于计数，分段传入以便复用计数缓存)
+        :param groups: [(name, [snippet, ...]), ...]，分组顺序与组内顺序即优先级
+        :return: (dict name -> 保留的片段列表, report)
+        """
+        budget = self.budget_for(mode)
+        fixed = sum(count_tokens(part) for part in fixed_parts)
+        remaining = budget - fixed
+        kept, dropped = {}, {}
+        used = dropped_tokens = 0
+
+        for name, snippets in groups:
+            kept[name] = []
+            dropped[name] = 0
+            for snippet in snippets:
+                cost = count_tokens(snippet) + 1  # +1：片段之间的换行
+                if cost <= remaining:
+                    kept[name].append(snippet)
+                    remaining -= cost
+                    used += cost
+                else:
+                    dropped[name] += 1
+                    dropped_tokens += cost
+
+        report = {"mode": mode, "budget": budget, "fixed": fixed, "used": used,
+                  "dropped": dropped, "dropped_tokens": dropped_tokens}
+        self.fills += 1
+        if dropped_tokens:
+            self.trimmed_fills += 1
+            self.trimmed_snippets += sum(dropped.values())
+            self.trimmed_tokens += dropped_tokens
+            detail = " / ".join(f"{name} {n} 条" for name, n in dropped.items() if n)
+            print(f"✂️ [PromptBudget] {mode}: 预算 {budget} | 固定 {fixed} + 片段 {used} tokens | 裁掉 {detail} (-{dropped_tokens} tokens)")
+        if fixed > budget:
+            print(f"⚠️ [PromptBudget] {mode}: 固定部分 {fixed} tokens 已超出预算 {budget}")
+        return kept, report
+
+    def stats(self):
+        info = count_tokens.cache_info()
+        return {
+            "tokenizer": "deepseek" if _tokenizer else "estimate",
+            "budgets": dict(self.budgets),
+            "default_budget": self.default_budget,
+            "fills": self.fills,
+            "trimmed_fills": self.trimmed_fills,
+            "trimmed_snippets": self.trimmed_snippets,
+            "trimmed_tokens": self.trimmed_tokens,
+            "token_cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+        }
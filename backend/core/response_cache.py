@@ -0,0 +1,88 @@
+# backend/core/response_cache.py
+
+import os
+import json
+import asyncio
+import hashlib
+
+from core.lru_cache import BoundedLRUCache
+
+
+class AnalyzeResponseCache:
+    """
+    ♻️ /analyze 结果缓存 (默认关闭，ANALYZE_CACHE_ENABLED=1 开启)
+
+    - key: 归一化阵容指纹 (fix_name / infer_team_roles 之后的字段 + System Prompt 摘要)
+    - value: 上游流式输出的原始分片 (含 <think> 标记)，命中时按原分片顺序重放
+    - 只缓存完整结束的流；中途报错 / 客户端断开的结果一律丢弃
+    """
+
+    def __init__(self, enabled=None, ttl=None, max_entries=None, max_mb=None, replay_chars=None, replay_delay_ms=None):
+        env = os.getenv
+        self.enabled = (env("ANALYZE_CACHE_ENABLED", "0") == "1") if enabled is None else enabled
+        ttl = int(env("ANALYZE_CACHE_TTL", "900")) if ttl is None else ttl
+        max_entries = int(env("ANALYZE_CACHE_MAX_ENTRIES", "2000")) if max_entries is None else max_entries
+        max_mb = float(env("ANALYZE_CACHE_MAX_MB", "64")) if max_mb is None else max_mb
+
+        # 重放节奏：每批至少 replay_chars 个字符，批间隔 replay_delay_ms (0 = 一次性推完)
+        self.replay_chars = int(env("ANALYZE_CACHE_REPLAY_CHARS", "64")) if replay_chars is None else replay_chars
+        self.replay_delay = (int(env("ANALYZE_CACHE_REPLAY_DELAY_MS", "15")) if replay_delay_ms is None else replay_delay_ms) / 1000
+
+        self.cache = BoundedLRUCache("AnalyzeCache", max_entries=max_entries, max_bytes=int(max_mb * 1024 * 1024), ttl=ttl or None)
+        self.saved_chars = 0  # 命中节省的上游输出字符数
+
+    @staticmethod
+    def fingerprint(**fields):
+        """字段顺序无关的规范化指纹 (dict 排序 + 紧凑 JSON + sha256)"""
+        raw = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        if not self.enabled: return None
+        chunks = self.cache.get(key)
+        if chunks is not None:
+            self.saved_chars += sum(len(c) for c in chunks)
+        return chunks
+
+    async def record(self, key, stream, succeeded=lambda: True):
+        """
+        透传上游分片；流完整结束且 succeeded() 为真时写入缓存 (客户端中途断开不会走到写入)
+        本生成器被关闭时一并关闭上游 (与链路上其他包装一致，不把清理留给 GC)
+        """
+        try:
+            if not self.enabled:
+                async for chunk in stream:
+                    yield chunk
+                return
+
+            generation = self.cache.generation
+            chunks = []
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+
+            if chunks and succeeded():
+                size = sum(len(c.encode("utf-8")) for c in chunks)
+                self.cache.put(key, tuple(chunks), size, generation=generation)
+        finally:
+            await stream.aclose()
+
+    async def replay(self, chunks):
+        """按原分片边界分批重放 (不会切断 <think> / </think> 标记)"""
+        batch = []
+        batch_len = 0
+        for chunk in chunks:
+            batch.append(chunk)
+            batch_len += len(chunk)
+            if batch_len >= self.replay_chars:
+                yield "".join(batch)
+                batch, batch_len = [], 0
+                if self.replay_delay: await asyncio.sleep(self.replay_delay)
+        if batch:
+            yield "".join(batch)
+
+    def invalidate(self, reason=""):
+        return self.cache.invalidate(reason=reason)
+
+    def stats(self):
+        return {"enabled": self.enabled, "saved_chars": self.saved_chars, **self.cache.stats()}
@@ -0,0 +1,145 @@
+# backend/core/role_inference.py
+
+import math
+import itertools
+
+from core.lru_cache import BoundedLRUCache
+from core.draft_context import PLACEHOLDER_NAMES
+
+# infer_team_roles 的分路 key (顺序即同分时的优先顺序)
+STANDARD_ROLES = ("TOP", "JUNGLE", "MID", "ADC", "SUPPORT")
+# champions.positions / role 字段的写法 -> 分路 key
+ROLE_ALIASES = {"BOT": "ADC", "BOTTOM": "ADC", "UTILITY": "SUPPORT", "MIDDLE": "MID"}
+
+# 没出现过的位置不是 0 概率 (冷门打法 / 数据缺失)，给一个下限避免 log(0)
+PROB_FLOOR = 1e-3
+# 只知道主位置 (无 positions 统计) 时，主位置的概率
+PRIMARY_ONLY_PROB = 0.8
+
+
+def _role_key(role):
+    role = str(role or "").upper()
+    return ROLE_ALIASES.get(role, role)
+
+
+def position_vector(doc):
+    """
+    英雄文档 -> 五个分路的对数概率 (按 STANDARD_ROLES 顺序)
+    P(分路 | 英雄) = 该分路 pick_rate / 各分路 pick_rate 之和；无 positions 统计时退回主位置
+    """
+    weights = dict.fromkeys(STANDARD_ROLES, 0.0)
+    for role, block in (doc.get("positions") or {}).items():
+        key = _role_key(role)
+        if key not in weights or not isinstance(block, dict): continue
+        try:
+            weights[key] += max(float(block.get("pick_rate") or 0), 0.0)
+        except (TypeError, ValueError):
+            continue
+
+    total = sum(weights.values())
+    if total > 0:
+        probs = [weights[r] / total for r in STANDARD_ROLES]
+    else:
+        primary = _role_key(doc.get("role", "MID"))
+        if primary not in weights: primary = "MID"  # 与旧版一致：未知分路按中单
+        rest = (1 - PRIMARY_ONLY_PROB) / (len(STANDARD_ROLES) - 1)
+        probs = [PRIMARY_ONLY_PROB if r == primary else rest for r in STANDARD_ROLES]
+    return tuple(math.log(max(p, PROB_FLOOR)) for p in probs)
+
+
+# 完全未知的英雄：各分路等概率 (只占剩下的空位，不影响其他人的分配)
+UNIFORM_VECTOR = tuple(math.log(1 / len(STANDARD_ROLES)) for _ in STANDARD_ROLES)
+
+
+class RoleInference:
+    """
+    🧭 阵容分路推断 (infer_team_roles 的精确求解版)
+
+    每个英雄预先算好五个分路的对数概率 (来自 positions.pick_rate)，
+    在指定分路 (fixed_assignments) 之外，枚举剩余英雄 × 空闲分路的全部分配 (最多 5! = 120 种)，
+    取联合概率最大的一种；同分时按英雄名排序 + 标准分路顺序取第一个，结果与阵容顺序无关。
+    结果按 (快照版本, 阵容 frozenset, 指定分路) 记忆，英雄快照重建时整体失效。
+    """
+
+    def __init__(self, snapshot=None, max_entries=4096):
+        self._state = (None, {})  # (快照, id(快照内的英雄文档) -> 分路对数概率)
+        self.cache = BoundedLRUCache("role_inference", max_entries=max_entries)
+        self.solves = 0
+        if snapshot is not None:
+            self.build(snapshot)
+
+    @property
+    def version(self):
+        snapshot = self._state[0]
+        return snapshot.version if snapshot is not None else None
+
+    def build(self, snapshot):
+        """:param snapshot: ChampionSnapshot；预先计算全部英雄的分路向量后原子替换"""
+        vectors = {id(doc): position_vector(doc) for doc in snapshot.docs}
+        self._state = (snapshot, vectors)
+        self.cache.invalidate(reason=f"champion snapshot {snapshot.version}")
+        return len(vectors)
+
+    def vector_of(self, hero, resolve=None, state=None):
+        snapshot, vectors = state or self._state
+        doc = snapshot.get(hero) if snapshot is not None else None
+        if doc is not None:
+            return vectors[id(doc)]
+        # 快照未收录：交给调用方的解析函数 (如 DraftContext.get 的 champions.json 兜底记录)
+        info = resolve(hero) if resolve else None
+        return position_vector(info) if info else UNIFORM_VECTOR
+
+    def infer(self, team_list, fixed_assignments=None, resolve=None):
+        """:return: {分路: 英雄}，只包含已分配的分路 (与旧版 infer_team_roles 相同结构)"""
+        state = self._state  # 取一次引用，整个求解使用同一版本
+        clean_team = [h.strip() for h in team_list if h] if team_list else []
+
+        fixed = {}
+        for role, hero_raw in (fixed_assignments or {}).items():
+            if not hero_raw or hero_raw.strip() in PLACEHOLDER_NAMES: continue
+            role_key = _role_key(role)
+            if role_key in STANDARD_ROLES:
+                fixed[role_key] = hero_raw.strip()
+
+        assigned = {h.lower() for h in fixed.values()}
+        # 占位名 (Unknown / None) 不是真实英雄，不占分路
+        remaining = sorted(dict.fromkeys(h for h in clean_team if h.lower() not in assigned and h not in PLACEHOLDER_NAMES))
+
+        key = (state[0].version if state[0] is not None else None, frozenset(remaining), frozenset(fixed.items()))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        free_roles = [r for r in STANDARD_ROLES if r not in fixed]
+        best = self._solve([self.vector_of(h, resolve, state) for h in remaining], free_roles)
+        final_roles = dict(fixed)
+        for hero_idx, role in best:
+            final_roles[role] = remaining[hero_idx]
+        result = {r: final_roles[r] for r in STANDARD_ROLES if r in final_roles}
+
+        self.cache.put(key, tuple(result.items()), 1)
+        return result
+
+    def _solve(self, vectors, free_roles):
+        """:return: [(英雄下标, 分路)]，联合对数概率最大的分配 (英雄多于空位时，多出的英雄不分配)"""
+        self.solves += 1
+        slots = [STANDARD_ROLES.index(r) for r in free_roles]
+        if not vectors or not slots: return []
+
+        best, best_score = None, -math.inf
+        if len(vectors) <= len(slots):
+            # 每个英雄选一个不重复的空位
+            for roles in itertools.permutations(range(len(slots)), len(vectors)):
+                score = sum(vectors[h][slots[r]] for h, r in enumerate(roles))
+                if score > best_score:
+                    best, best_score = [(h, free_roles[r]) for h, r in enumerate(roles)], score
+        else:
+            # 每个空位选一个不重复的英雄
+            for heroes in itertools.permutations(range(len(vectors)), len(slots)):
+                score = sum(vectors[h][slots[r]] for r, h in enumerate(heroes))
+                if score > best_score:
+                    best, best_score = [(h, free_roles[r]) for r, h in enumerate(heroes)], score
+        return best
+
+    def stats(self):
+        return {"version": self.version, "heroes": len(self._state[1]), "solves": self.solves, "cache": self.cache.stats()}
@@ -0,0 +1,398 @@
+# backend/core/scoring_engine.py
+
+import json
+import time
+import hashlib
+import operator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from core.champion_snapshot import ChampionSnapshot, COMPOSITION_RULES
+
+# ==========================================
+# 📐 打分规则 (声明式配置，逐条对应 V6.0 混合推荐原先的 if 链)
+# ==========================================
+SCORING_RULES = {
+    # 版本强度：胜率字符串 "50.52%" -> 50.52，解析失败 (缺失 / 非字符串) 按 default
+    "win_rate": {"weight": 2, "default": 50.0},
+    # 己方阵容成分 (按英雄预先算成标志位，见 core/champion_snapshot.py)
+    "composition": COMPOSITION_RULES,
+    # 阵容修补加分：when 全部满足时，给带任一 tags 的候选加 bonus (按顺序累加)
+    "bonuses": (
+        {"name": "菜刀队缺 AP", "when": {"ad_count": (">=", 3), "ap_count": ("<", 1)}, "tags": ("mage", "ap"), "bonus": 15},
+        {"name": "零前排", "when": {"tank_count": ("==", 0)}, "tags": ("tank", "fighter"), "bonus": 10}
+    ),
+    # Tier 加分 (字段缺省按 default；只认字符串 "T1" / "T2")
+    "tier": {"default": "T3", "bonus": {"T1": 12, "T2": 6}},
+    # 入围人数
+    "top_k": 12
+}
+
+_OPS = {">=": operator.ge, ">": operator.gt, "<=": operator.le, "<": operator.lt, "==": operator.eq, "!=": operator.ne}
+
+
+def parse_win_rate(raw, default=SCORING_RULES["win_rate"]["default"]):
+    try:
+        # 处理 "50.52%" -> 50.52
+        return float(raw.replace('%', ''))
+    except:
+        return default
+
+
+# ==========================================
+# 🐢 旧版逐条打分 (numpy 不可用时的兜底，也是新引擎的对照基准)
+# ==========================================
+
+def analyze_composition_tags(team_list, db_instance):
+    """
+    [V6.0] 快速扫描阵容成分 (基于数据库 Tags)
+    有英雄快照时直接查预先算好的标志位，不访问数据库
+    """
+    snapshot = getattr(db_instance, "champion_snapshot", None)
+    if snapshot is not None and snapshot.ready:
+        return snapshot.composition(team_list)
+
+    stats = {
+        "ap_count": 0,
+        "ad_count": 0,
+        "tank_count": 0,
+        "engagers": 0  # 开团点
+    }
+
+    for hero_name in team_list:
+        if not hero_name or hero_name == "None": continue
+
+        # 模糊查找英雄数据
+        hero_data = db_instance.champions_col.find_one({"name": hero_name})
+        if not hero_data: continue
+
+        tags = [t.lower() for t in hero_data.get('tags', [])]
+
+        # 1. 伤害类型估算
+        if 'mage' in tags or 'support' in tags or 'ap' in tags:
+            stats['ap_count'] += 1
+        else:
+            stats['ad_count'] += 1
+
+        # 2. 前排估算
+        if 'tank' in tags or 'fighter' in tags:
+            stats['tank_count'] += 1
+
+        # 3. 开团点
+        if 'engage' in tags:
+            stats['engagers'] += 1
+
+    return stats
+
+def recommend_heroes_legacy(db_instance, user_role, my_team):
+    """[V6.0] 逐条打分：拉取该位置全部英雄，Python 循环加分后整体排序"""
+    current_role = user_role.lower() # 数据库通常存小写 role
+
+    # 1. 分析局势
+    comp_stats = analyze_composition_tags(my_team, db_instance)
+
+    # 2. 设定海选池 (优先取英雄快照里该位置的全部英雄，没有快照才查库)
+    # 注意：确保你的数据库 champions_col 里有 role 字段
+    snapshot = getattr(db_instance, "champion_snapshot", None)
+    if snapshot is not None and snapshot.ready:
+        cursor = snapshot.candidates(current_role)
+    else:
+        cursor = db_instance.champions_col.find({"role": current_role})
+
+    candidates = []
+
+    for hero in cursor:
+        # --- A. 基础分：版本强度 (Win Rate) ---
+        try:
+            # 处理 "50.52%" -> 50.52
+            win_rate_str = hero.get('win_rate', '50%').replace('%', '')
+            win_rate = float(win_rate_str)
+        except:
+            win_rate = 50.0
+
+        score = win_rate * 2  # 基础分 (约 100 分)
+        tags = [t.lower() for t in hero.get('tags', [])]
+
+        # --- B. 阵容修补加分 (诱导 AI 关注) ---
+
+        # 1. 菜刀队修正 (全队缺 AP)
+        # 如果队友 AD >= 3 且 AP < 1，给法伤英雄加分
+        if comp_stats['ad_count'] >= 3 and comp_stats['ap_count'] < 1:
+            if 'mage' in tags or 'ap' in tags:
+                score += 15
+
+        # 2. 零前排修正
+        # 如果全队无前排，给坦克/战士加分
+        if comp_stats['tank_count'] == 0:
+            if 'tank' in tags or 'fighter' in tags:
+                score += 10
+
+        # 3. Tier 加分 (T1 > T2 > T3)
+        tier = hero.get('tier', 'T3')
+        if tier == 'T1': score += 12
+        elif tier == 'T2': score += 6
+
+        # --- C. 封装数据 ---
+        # 必须把 tags 传给 LLM，让它判断 "是否有位移"、"是否能清线"
+        candidates.append({
+            "name": hero['name'],
+            "alias": hero.get('alias', [hero['name']])[0], # 中文名
+            "win_rate": hero.get('win_rate', '50%'),
+            "tags": tags,
+            "tier": tier,
+            "score": score
+        })
+
+    # 3. 按分数排序，取 Top 12 个 "入围者"
+    candidates.sort(key=lambda x: x['score'], reverse=True)
+    top_candidates = candidates[:12]
+
+    return top_candidates, comp_stats
+
+
+# ==========================================
+# 🧮 列式打分引擎
+# ==========================================
+
+class _Pool:
+    """单个 role 的候选列 (行顺序 = champions 集合的自然顺序)"""
+    __slots__ = ("base", "tier_bonus", "tags", "rows", "keys")
+
+    def __init__(self, base, tier_bonus, tags, rows, keys):
+        self.base = base              # 胜率 * weight (float64)
+        self.tier_bonus = tier_bonus  # tier 加分 (float64)
+        self.tags = tags              # 规则用到的 tag 位掩码 (uint64)
+        self.rows = rows              # 输出字段 (name, alias, win_rate 原值, 小写 tags, tier)
+        self.keys = keys              # 英雄 id (对位矩阵对齐用)
+
+
+class ScoringEngine:
+    """
+    🧮 推荐候选打分引擎 (recommend_heroes_hybrid 的列式实现)
+
+    由英雄快照 (ChampionSnapshot) 按 role 分组存成 NumPy 列：胜率、tier 加分、tag 位掩码；
+    阵容成分直接读快照里预先算好的标志位；
+    阵容修补加分是整列掩码运算，Top-K 用 argpartition 选出后按 (分数降序, 原顺序) 排序，
+    加分顺序与旧版相同，因此分数逐位一致、同分时的先后也与旧版稳定排序一致。
+    随英雄索引在启动 / 热更新时整体重建 (原子替换)；未安装 numpy 时 ready=False，调用方走旧版逐条打分。
+    挂上对位矩阵 (attach_matchups) 后，已知对线敌人时再叠加一列克制分；不传敌人时结果与旧版完全一致。
+    挂上离线预计算的入围表 (attach_shortlists，core/shortlist_table.py) 后，命中的请求直接查表，不再打分。
+    """
+
+    def __init__(self, rules=None):
+        self.rules = rules or SCORING_RULES
+        # 加分规则里出现过的 tag 各占一位
+        vocab = set()
+        for bonus in self.rules["bonuses"]:
+            vocab.update(bonus["tags"])
+        self._bits = {tag: 1 << i for i, tag in enumerate(sorted(vocab))}
+        self._bonuses = [([(key, _OPS[op], value) for key, (op, value) in bonus["when"].items()], self._mask(bonus["tags"]), float(bonus["bonus"]))
+                         for bonus in self.rules["bonuses"]]
+        self._state = None  # (role -> _Pool, 英雄快照, 对位矩阵对齐结果, 入围表)
+        self._matrix = None
+        self._shortlists = None
+        self.rules_digest = hashlib.sha1(json.dumps(self.rules, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()[:8]
+
+        self.version = 0
+        self.champions = 0
+        self.build_ms = 0.0
+        self.requests = 0
+        self.table_hits = 0
+
+    @property
+    def ready(self):
+        return np is not None and self._state is not None
+
+    def _mask(self, tags):
+        mask = 0
+        for t in tags:
+            mask |= self._bits.get(t, 0)
+        return mask
+
+    def build(self, source):
+        """:param source: 英雄快照，或 champions 集合全部文档 (自然顺序)"""
+        if np is None: return 0
+        start = time.perf_counter()
+        snapshot = source if isinstance(source, ChampionSnapshot) else ChampionSnapshot(source, self.rules["composition"])
+        if snapshot.rules != self.rules["composition"]:
+            snapshot = ChampionSnapshot(snapshot.docs, self.rules["composition"])
+        weight = self.rules["win_rate"]["weight"]
+        default = self.rules["win_rate"]["default"]
+        tier_rules = self.rules["tier"]
+
+        pools = {}
+        count = 0
+        for role in snapshot.roles():
+            base, tier_bonus, masks, rows, keys = [], [], [], [], []
+            for doc in snapshot.candidates(role):
+                tags = [t.lower() for t in doc.get('tags', [])]
+                tier = doc.get('tier', tier_rules["default"])
+                base.append(parse_win_rate(doc.get('win_rate'), default) * weight)
+                tier_bonus.append(float(tier_rules["bonus"].get(tier, 0)) if isinstance(tier, str) else 0.0)
+                masks.append(self._mask(tags))
+                rows.append((doc['name'], doc.get('alias', [doc['name']])[0], doc.get('win_rate', '50%'), tags, tier))
+                keys.append(doc.get('id') or doc['name'])
+            pools[role] = _Pool(np.array(base, dtype=np.float64), np.array(tier_bonus, dtype=np.float64), np.array(masks, dtype=np.uint64), rows, keys)
+            count += len(rows)
+
+        self._state = self._with_shortlists((pools, snapshot, self._align(self._matrix, pools), None))
+        self.version += 1
+        self.champions = count
+        self.build_ms = (time.perf_counter() - start) * 1000
+        return count
+
+    def build_from_collection(self, collection):
+        """从 champions 集合构建 (读取失败时保留旧列)"""
+        if np is None or collection is None: return 0
+        try:
+            snapshot = ChampionSnapshot.from_collection(collection, self.rules["composition"])
+        except Exception as e:
+            print(f"⚠️ [ScoringEngine] 读取 champions 集合失败，继续使用 v{self.version}: {e}")
+            return 0
+        count = self.build(snapshot)
+        print(f"✅ [ScoringEngine] v{self.version} 已构建: {count} 条候选 / {len(self._state[0])} 个分路 ({self.build_ms:.1f}ms)")
+        return count
+
+    @staticmethod
+    def _align(matrix, pools):
+        """每个分路的候选行 -> 对位矩阵列号 (矩阵里没有的英雄记 -1)"""
+        if matrix is None: return None
+        aligned = {}
+        for role, pool in pools.items():
+            cols = [matrix.index_of(key) for key in pool.keys]
+            aligned[role] = np.array([-1 if c is None else c for c in cols], dtype=np.int64)
+        return matrix, aligned
+
+    def attach_matchups(self, matrix):
+        """挂上 / 替换对位矩阵 (core/matchup_matrix.py)；与候选列一起原子替换"""
+        if np is None: return
+        self._matrix = matrix
+        if self._state is not None:
+            pools, snapshot, _, _ = self._state
+            self._state = self._with_shortlists((pools, snapshot, self._align(matrix, pools), None))
+
+    def fingerprint(self, state=None):
+        """入围表的适用范围：英雄快照内容 + 对位矩阵版本 + 打分规则"""
+        _, snapshot, matchups, _ = state or self._state
+        return [snapshot.digest, matchups[0].version if matchups is not None else None, self.rules_digest]
+
+    def _with_shortlists(self, state):
+        """入围表只在与当前候选列 / 对位矩阵完全对应时挂上，否则按实时打分"""
+        table = self._shortlists
+        if table is None or table.fingerprint != self.fingerprint(state):
+            return state
+        return state[:3] + (table,)
+
+    def attach_shortlists(self, table):
+        """:return: 是否挂上 (与当前状态不对应的入围表会被拒绝)"""
+        if np is None or self._state is None: return False
+        self._shortlists = table
+        self._state = self._with_shortlists(self._state[:3] + (None,))
+        return self._state[3] is not None
+
+    def layout(self):
+        """(分路列表, 英雄快照, 对位矩阵)：离线入围表按这个布局枚举"""
+        pools, snapshot, matchups, _ = self._state
+        return sorted(pools), snapshot, matchups[0] if matchups is not None else None
+
+    def bonus_state(self, comp_stats):
+        """阵容统计 -> 触发了哪些阵容修补加分 (按规则顺序的位掩码)"""
+        state = 0
+        for i, (conditions, _, _) in enumerate(self._bonuses):
+            if all(op(comp_stats[key], value) for key, op, value in conditions):
+                state |= 1 << i
+        return state
+
+    def composition(self, team_list):
+        """己方阵容成分 (与 analyze_composition_tags 相同口径)"""
+        return self._state[1].composition(team_list)
+
+    def shortlist(self, user_role, bonus_state, enemy_laner=None, rank_bucket=None, top_k=None, state=None):
+        """
+        :param bonus_state: bonus_state() 的结果 (只有触发了哪些加分会影响排序，阵容本身不需要)
+        :return: (候选行号, 分数, 克制分 或 None)，已按 (分数降序, 原顺序) 排好；分路不存在时 None
+        """
+        pools, _, matchups, _ = state or self._state
+        pool = pools.get(user_role.lower())
+        if pool is None: return None
+
+        scores = pool.base.copy()
+        for i, (_, bits, bonus) in enumerate(self._bonuses):
+            if bonus_state >> i & 1:
+                scores += np.where((pool.tags & np.uint64(bits)) != 0, bonus, 0.0)
+        scores += pool.tier_bonus
+
+        counter = None
+        if matchups is not None and enemy_laner:
+            matrix, aligned = matchups
+            row = matrix.vector(enemy_laner, user_role, rank_bucket)
+            if row is not None:
+                cols = aligned[user_role.lower()]
+                counter = np.where(cols >= 0, np.asarray(row, dtype=np.float64)[cols], 0.0)
+                scores += counter
+
+        k = self.rules["top_k"] if top_k is None else top_k
+        n = len(scores)
+        if k < n:
+            # argpartition 不保证边界同分的取舍：严格高于第 k 名分数的全要，同分的按原顺序补齐
+            threshold = scores[np.argpartition(-scores, k - 1)[:k]].min()
+            above = np.flatnonzero(scores > threshold)
+            idx = np.concatenate([above, np.flatnonzero(scores == threshold)[:k - len(above)]])
+        else:
+            idx = np.arange(n)
+        idx = idx[np.lexsort((idx, -scores[idx]))]
+        return idx, scores[idx], None if counter is None else counter[idx]
+
+    @staticmethod
+    def _rows(pool, idx, scores, counters):
+        candidates = [
+            {"name": name, "alias": alias, "win_rate": win_rate, "tags": list(tags), "tier": tier, "score": float(score)}
+            for i, score in zip(idx, scores)
+            for name, alias, win_rate, tags, tier in (pool.rows[i],)
+        ]
+        if counters is not None:
+            for c, counter in zip(candidates, counters):
+                c["counter"] = float(counter)
+        return candidates
+
+    def recommend(self, user_role, my_team, enemy_laner=None, rank_bucket=None, top_k=None):
+        """
+        :param enemy_laner: 对线敌人；矩阵里查得到时每个候选多一个 counter 字段 (已计入 score)
+        :param rank_bucket: get_rank_bucket 的段位档 (low / mid / high)，决定克制分的权重
+        :return: (Top-K 候选, 阵容统计)，结构与 recommend_heroes_legacy 相同
+        """
+        state = self._state  # 取一次引用，重建期间读到的要么是旧列要么是新列
+        pools, snapshot, matchups, table = state
+        self.requests += 1
+        comp_stats = snapshot.composition(my_team)
+        pool = pools.get(user_role.lower())
+        if pool is None:
+            return [], comp_stats
+        bonus_state = self.bonus_state(comp_stats)
+
+        if table is not None and top_k is None:
+            matrix = matchups[0] if matchups is not None else None
+            hit = table.lookup(user_role, bonus_state, matrix, enemy_laner, rank_bucket)
+            if hit is not None:
+                self.table_hits += 1
+                return self._rows(pool, *hit), comp_stats
+
+        return self._rows(pool, *self.shortlist(user_role, bonus_state, enemy_laner, rank_bucket, top_k, state)), comp_stats
+
+    def stats(self):
+        pools = self._state[0] if self._state else {}
+        return {
+            "ready": self.ready,
+            "version": self.version,
+            "champions": self.champions,
+            "snapshot": self._state[1].version if self._state else None,
+            "roles": {role: len(pool.rows) for role, pool in pools.items()},
+            "requests": self.requests,
+            "table_hits": self.table_hits,
+            "build_ms": round(self.build_ms, 2),
+            "matchups": self._matrix.version if self._matrix is not None else None,
+            "shortlists": self._state[3] is not None if self._state else False
+        }
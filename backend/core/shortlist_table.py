@@ -0,0 +1,176 @@
+# backend/core/shortlist_table.py
+
+import os
+import json
+import time
+import datetime
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from core.scoring_engine import ScoringEngine
+from core.matchup_matrix import MatchupMatrix
+
+# 一格 = 一个入围者：候选行号 (对应 ScoringEngine 该分路的候选列) + 分数 + 克制分 (NaN = 没有对位)
+SHORTLIST_DTYPE = np.dtype([("row", "<u2"), ("score", "<f8"), ("counter", "<f8")]) if np is not None else None
+EMPTY_ROW = 0xFFFF  # 候选不足 top_k 时的填充
+MAX_TEAM = 5
+
+
+def meta_path(path):
+    """入围表 .npy 对应的元数据 .json 路径"""
+    return os.path.splitext(str(path))[0] + ".json"
+
+
+def composition_signatures(max_team=MAX_TEAM):
+    """
+    枚举全部可能的阵容成分 (COMPOSITION_RULES 口径)：
+    已识别 n 个队友时 AP + AD = n，前排 / 开团各 0..n
+    """
+    for n in range(max_team + 1):
+        for ap, tank, engage in itertools.product(range(n + 1), repeat=3):
+            yield {"ap_count": ap, "ad_count": n - ap, "tank_count": tank, "engagers": engage}
+
+
+class ShortlistTable:
+    """
+    📋 离线入围表 [分路, 加分状态, 段位档, 对线敌人, Top-K]
+
+    入围结果只取决于 分路 / 阵容成分 / 段位档 / 对线敌人：阵容成分先折算成 "触发了哪些加分" (bonus_state)，
+    同一状态的排序完全相同，所以表里按状态去重存储，成分签名 -> 状态的映射记录在元数据里。
+    对线敌人第 0 格是 "未知 / 无对位"，第 j+1 格对应对位矩阵的第 j 个英雄。
+    存成单个结构化 .npy + .json 元数据，加载时 mmap 只读映射；fingerprint 与打分引擎不一致时不会被挂上。
+    """
+
+    def __init__(self, entries, meta):
+        self.entries = entries
+        self.meta = meta
+        self.fingerprint = meta["fingerprint"]
+        self._roles = {r: i for i, r in enumerate(meta["roles"])}
+        self._states = {s: i for i, s in enumerate(meta["states"])}
+
+    def lookup(self, user_role, bonus_state, matrix=None, enemy_laner=None, rank_bucket=None):
+        """:return: (候选行号, 分数, 克制分 或 None)，与 ScoringEngine.shortlist 相同；表里没有时 None"""
+        r, s = self._roles.get(user_role.lower()), self._states.get(bonus_state)
+        if r is None or s is None: return None
+        b, e = 0, 0
+        if matrix is not None:
+            b = matrix.bucket_of(rank_bucket)
+            j = matrix.index_of(enemy_laner) if enemy_laner else None
+            if j is not None: e = j + 1
+        cell = self.entries[r, s, b, e]
+        cell = cell[cell["row"] != EMPTY_ROW]
+        counters = cell["counter"]
+        return cell["row"].tolist(), cell["score"].tolist(), None if np.isnan(counters).all() else counters.tolist()
+
+    # ==========================
+    # 💾 存取 (与对位矩阵相同：.npy + 同名 .json，先写临时文件再 rename)
+    # ==========================
+    def save(self, path):
+        path = str(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.save(path + ".tmp.npy", self.entries)
+        with open(meta_path(path) + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(path + ".tmp.npy", path)
+        os.replace(meta_path(path) + ".tmp", meta_path(path))
+        return os.path.getsize(path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        if np is None:
+            raise RuntimeError("未安装 numpy，入围表不可用")
+        with open(meta_path(path), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        entries = np.load(str(path), mmap_mode="r" if mmap else None)
+        if entries.dtype != SHORTLIST_DTYPE or list(entries.shape) != meta["shape"]:
+            raise ValueError(f"入围表 {entries.shape}/{entries.dtype} 与元数据 {meta['shape']} 不一致")
+        return cls(entries, meta)
+
+    def stats(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "shape": self.meta["shape"],
+            "bytes": int(self.entries.nbytes),
+            "signatures": self.meta["signatures"],
+            "states": self.meta["states"],
+            "mmap": isinstance(self.entries, np.memmap),
+            "workers": self.meta["workers"],
+            "built_at": self.meta["built_at"],
+            "build_ms": self.meta["build_ms"]
+        }
+
+
+def _fill_chunk(engine, role, bucket, states, enemies, k):
+    """单个 (分路, 段位档) 的全部 (加分状态, 对线敌人) 入围结果"""
+    chunk = np.zeros((len(states), len(enemies), k), dtype=SHORTLIST_DTYPE)
+    chunk["row"] = EMPTY_ROW
+    chunk["counter"] = np.nan
+    for s, bonus_state in enumerate(states):
+        for e, enemy in enumerate(enemies):
+            idx, scores, counters = engine.shortlist(role, bonus_state, enemy, bucket)
+            n = len(idx)
+            chunk["row"][s, e, :n] = idx
+            chunk["score"][s, e, :n] = scores
+            if counters is not None: chunk["counter"][s, e, :n] = counters
+    return chunk
+
+
+def _build_chunk(args):
+    """子进程入口：按快照文档 + 矩阵文件重建一份相同的打分引擎 (行顺序一致)，再算自己那一块"""
+    docs, rules, matrix_path, role, bucket, states, enemies, k = args
+    engine = ScoringEngine(rules)
+    engine.build(docs)
+    if matrix_path: engine.attach_matchups(MatchupMatrix.load(matrix_path))
+    return _fill_chunk(engine, role, bucket, states, enemies, k)
+
+
+def build_shortlist_table(engine, workers=None):
+    """
+    :param engine: 已构建 (可挂对位矩阵) 的 ScoringEngine；结果只对它当前的 fingerprint 有效
+    :param workers: 进程数 (<=1 时在当前进程计算)；对位矩阵需已落盘 (子进程按路径 mmap)
+    """
+    if np is None:
+        raise RuntimeError("未安装 numpy，入围表不可用")
+    start = time.perf_counter()
+    fingerprint = engine.fingerprint()
+    roles, snapshot, matrix = engine.layout()
+    k = engine.rules["top_k"]
+
+    signatures = list(composition_signatures())
+    states = sorted({engine.bonus_state(sig) for sig in signatures})
+    buckets = matrix.buckets if matrix is not None else [None]
+    enemies = [None] + (list(matrix.heroes) if matrix is not None else [])
+    tasks = [(role, bucket) for role in roles for bucket in buckets]
+
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers > 1 and (matrix is None or matrix.path):
+        args = [(list(snapshot.docs), engine.rules, matrix.path if matrix is not None else None, role, bucket, states, enemies, k) for role, bucket in tasks]
+        # spawn：服务进程里有线程 (连接池 / 事件循环)，fork 出来的子进程可能卡在继承的锁上
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=multiprocessing.get_context("spawn")) as pool:
+            chunks = list(pool.map(_build_chunk, args))
+    else:
+        workers = 1
+        chunks = [_fill_chunk(engine, role, bucket, states, enemies, k) for role, bucket in tasks]
+
+    entries = np.stack(chunks).reshape(len(roles), len(buckets), len(states), len(enemies), k).transpose(0, 2, 1, 3, 4)
+    entries = np.ascontiguousarray(entries)
+    meta = {
+        "fingerprint": fingerprint,
+        "shape": list(entries.shape),
+        "roles": roles,
+        "states": states,
+        "buckets": buckets,
+        "top_k": k,
+        "signatures": len(signatures),
+        "signature_states": {",".join(str(v) for v in sig.values()): engine.bonus_state(sig) for sig in signatures},
+        "workers": workers,
+        "built_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "build_ms": round((time.perf_counter() - start) * 1000, 2)
+    }
+    return ShortlistTable(entries, meta)
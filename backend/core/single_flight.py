@@ -0,0 +1,110 @@
+# backend/core/single_flight.py
+
+import asyncio
+import hashlib
+
+
+class _Flight:
+    """一次上游生成：分片缓冲 + 订阅者计数 + 驱动任务"""
+
+    def __init__(self, key):
+        self.key = key
+        self.chunks = []
+        self.done = False
+        self.subscribers = 0
+        self.task = None
+        self.changed = asyncio.Condition()
+
+
+class SingleFlight:
+    """
+    🛫 同 Prompt 并发合流 (进程内 single-flight)
+
+    第一个请求创建 flight，上游流在独立 Task 中驱动，产出的分片写入共享缓冲；
+    之后相同 key 的请求作为订阅者加入：先补发已产出的分片，再跟随实时分片。
+    - 任一订阅者断开只影响它自己；最后一个订阅者离开且上游未结束时取消上游 (停止计费)
+    - 上游结束后 flight 立即出列，之后的相同请求重新发起 (或由结果缓存接管)
+    """
+
+    def __init__(self, name="SingleFlight"):
+        self.name = name
+        self._flights = {}
+
+        self.started = 0     # 实际发起的上游生成
+        self.coalesced = 0   # 合流到已有 flight 的请求
+        self.cancelled = 0   # 因无人订阅被取消的上游
+
+    @staticmethod
+    def make_key(*parts):
+        h = hashlib.sha256()
+        for part in parts:
+            h.update(str(part).encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def subscribe(self, key, producer_factory):
+        """
+        :param producer_factory: 无参函数，返回上游 async generator (仅在需要新建 flight 时调用)
+        :return: 供 StreamingResponse 使用的 async generator
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(key)
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._drive(flight, producer_factory()))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            print(f"🛫 [{self.name}] 合流 {key[:12]} (已缓冲 {len(flight.chunks)} 个分片)")
+        # 同步登记订阅者：生成器尚未开始迭代前也算在内，避免上游被误取消
+        flight.subscribers += 1
+        return self._follow(flight)
+
+    async def _drive(self, flight, upstream):
+        try:
+            async for chunk in upstream:
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"❌ [{self.name}] 上游异常 {flight.key[:12]}: {e}")
+        finally:
+            await upstream.aclose()
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    async def _follow(self, flight):
+        idx = 0
+        try:
+            while True:
+                while idx < len(flight.chunks):
+                    chunk = flight.chunks[idx]
+                    idx += 1
+                    yield chunk
+                if flight.done:
+                    break
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: flight.done or len(flight.chunks) > idx)
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers <= 0 and not flight.done:
+                # 所有客户端都走了：取消上游，并让后续相同请求重新发起
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+                flight.task.cancel()
+                self.cancelled += 1
+                print(f"🛑 [{self.name}] 无订阅者，已取消上游 {flight.key[:12]}")
+
+    def stats(self):
+        return {
+            "active": len(self._flights),
+            "subscribers": sum(f.subscribers for f in self._flights.values()),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled
+        }
@@ -0,0 +1,132 @@
+# backend/core/speculative_context.py
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "task", "created")
+
+    def __init__(self, fingerprint, task):
+        self.fingerprint = fingerprint
+        self.task = task
+        self.created = time.monotonic()
+
+
+class SpeculativeContexts:
+    """
+    🔮 选人阶段预计算 /analyze 上下文 (每个用户只保留当前这一手阵容)
+
+    客户端经 /ws/bridge 推送选人快照 -> submit() 防抖后在后台跑完整的上下文构建
+    (名称修正 / 分路推断 / 推荐 / RAG Tips / 修正 / Prompt 组装)；之后指纹相同的 /analyze 直接 take() 结果。
+    - 阵容变化：旧任务取消、旧结果作废；进入游戏 (evict) 或超过 SPECULATIVE_TTL_S 同样作废
+    - 配置热更新 (clear)：Prompt / 英雄 / 修正数据都可能变了，全部作废
+    - 预计算不扣额度、不请求上游；take() 遇到仍在计算的任务会直接等待它 (不重复计算)
+    """
+
+    def __init__(self, ttl=None, debounce_ms=None, max_users=None):
+        self.ttl = float(os.getenv("SPECULATIVE_TTL_S", "180")) if ttl is None else ttl
+        self.debounce = (float(os.getenv("SPECULATIVE_DEBOUNCE_MS", "300")) if debounce_ms is None else debounce_ms) / 1000
+        self.max_users = int(os.getenv("SPECULATIVE_MAX_USERS", "2000")) if max_users is None else max_users
+        self._entries = OrderedDict()  # owner -> _Entry
+
+        self.submitted = 0
+        self.unchanged = 0    # 重复推送了同一阵容
+        self.superseded = 0   # 阵容变化，旧结果作废
+        self.hits = 0
+        self.joined = 0       # 命中时预计算仍在进行，直接等待
+        self.misses = 0
+        self.evicted = 0
+        self.errors = 0
+
+    def submit(self, owner, fingerprint, build):
+        """
+        :param build: 无参协程函数，返回上下文 (只在阵容变化时调用)
+        :return: True = 已安排预计算；False = 与当前阵容相同，无需重算
+        """
+        entry = self._entries.get(owner)
+        if entry is not None and entry.fingerprint == fingerprint and not self._expired(entry):
+            self.unchanged += 1
+            return False
+        if entry is not None:
+            self._drop(owner)
+            self.superseded += 1
+        self._entries[owner] = _Entry(fingerprint, asyncio.create_task(self._run(build)))
+        self.submitted += 1
+        while len(self._entries) > self.max_users:
+            self._drop(next(iter(self._entries)))
+            self.evicted += 1
+        return True
+
+    async def _run(self, build):
+        if self.debounce > 0:
+            await asyncio.sleep(self.debounce)  # 连续切英雄时只算最后一次
+        try:
+            return await build()
+        except Exception as e:
+            print(f"⚠️ [Speculative] 预计算失败，/analyze 将现场构建: {e}")
+            self.errors += 1
+            return None
+
+    async def take(self, owner, fingerprint):
+        """指纹一致则返回预计算结果，否则 None (调用方照常现场构建)"""
+        entry = self._entries.get(owner)
+        if entry is None or entry.fingerprint != fingerprint or self._expired(entry):
+            self.misses += 1
+            return None
+        if not entry.task.done():
+            self.joined += 1
+        try:
+            result = await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            if not entry.task.cancelled():
+                raise
+            result = None  # 等待期间阵容变了
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def evict(self, owner, reason=""):
+        if owner in self._entries:
+            self._drop(owner)
+            self.evicted += 1
+            if reason: print(f"🧹 [Speculative] {owner} 预计算已清除 ({reason})")
+
+    def clear(self, reason=""):
+        """全部作废 (进行中的预计算一并取消)；返回清除的用户数"""
+        owners = list(self._entries)
+        for owner in owners:
+            self._drop(owner)
+        self.evicted += len(owners)
+        if owners:
+            print(f"🧹 [Speculative] 已清除 {len(owners)} 个预计算 ({reason or 'manual'})")
+        return len(owners)
+
+    def _drop(self, owner):
+        entry = self._entries.pop(owner, None)
+        if entry is not None and not entry.task.done():
+            entry.task.cancel()
+
+    def _expired(self, entry):
+        return self.ttl and time.monotonic() - entry.created > self.ttl
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._entries),
+            "computing": sum(1 for e in self._entries.values() if not e.task.done()),
+            "submitted": self.submitted,
+            "unchanged": self.unchanged,
+            "superseded": self.superseded,
+            "hits": self.hits,
+            "joined_inflight": self.joined,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evicted": self.evicted,
+            "errors": self.errors,
+            "ttl_s": self.ttl
+        }
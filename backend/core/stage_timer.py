@@ -0,0 +1,67 @@
+# backend/core/stage_timer.py
+
+import time
+import asyncio
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    ⏱️ 请求级分段计时 (/analyze 上下文收集阶段)
+
+    - span(name): 串行步骤计时
+    - run(name, awaitable, timeout, fallback): 并发步骤，带单步超时与降级 (超时/异常时返回 fallback)
+    - summary(): 单行耗时明细，并标出最慢的步骤
+    """
+
+    def __init__(self, name="Context"):
+        self.name = name
+        self.started = time.perf_counter()
+        self.steps = []  # (name, start_ms, end_ms, status)
+
+    def _now_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def elapsed_ms(self):
+        return self._now_ms()
+
+    @property
+    def degraded(self):
+        return [name for name, _, _, status in self.steps if status != "ok"]
+
+    @contextmanager
+    def span(self, name):
+        start = self._now_ms()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self.steps.append((name, start, self._now_ms(), status))
+
+    async def run(self, name, awaitable, timeout=None, fallback=None):
+        start = self._now_ms()
+        status = "ok"
+        try:
+            result = await asyncio.wait_for(awaitable, timeout) if timeout else await awaitable
+        except asyncio.TimeoutError:
+            status = "timeout"
+            result = fallback
+            print(f"⚠️ [{self.name}] {name} 超时 ({timeout * 1000:.0f}ms)，降级继续")
+        except Exception as e:
+            status = "error"
+            result = fallback
+            print(f"⚠️ [{self.name}] {name} 失败，降级继续: {e}")
+        self.steps.append((name, start, self._now_ms(), status))
+        return result
+
+    def summary(self):
+        total = self._now_ms()
+        parts = []
+        for name, start, end, status in self.steps:
+            flag = "" if status == "ok" else f" ({status})"
+            parts.append(f"{name} {end - start:.0f}ms{flag}")
+        slowest = max(self.steps, key=lambda s: s[2] - s[1])[0] if self.steps else "-"
+        return f"total {total:.0f}ms | " + " · ".join(parts) + f" | slowest: {slowest}"
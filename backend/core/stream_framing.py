@@ -0,0 +1,156 @@
+# backend/core/stream_framing.py
+
+import os
+import time
+import asyncio
+import threading
+
+from core.stream_metrics import Histogram
+
+# 这些标记必须独占帧的开头：前端按标记切分思考过程 / 排队提示
+BOUNDARY_MARKERS = ("<think>", "</think>")
+IMMEDIATE_PREFIX = "<queue>"
+
+MAX_FRAME_MS = 500
+MAX_FRAME_BYTES = 16384
+
+
+class FrameStats:
+    """帧统计：每个帧对应一次 ASGI body 发送 (≈ 一次 write 系统调用)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.frames_per_stream = Histogram()
+        self.bytes_per_frame = Histogram()
+        self.chunks_per_frame = Histogram()
+        self.streams = 0
+        self.chunks = 0
+        self.frames = 0
+        self.bytes = 0
+
+    def record(self, chunks, frames, frame_sizes, frame_chunks):
+        with self._lock:
+            self.streams += 1
+            self.chunks += chunks
+            self.frames += frames
+            self.bytes += sum(frame_sizes)
+            self.frames_per_stream.observe(frames)
+            for size in frame_sizes: self.bytes_per_frame.observe(size)
+            for n in frame_chunks: self.chunks_per_frame.observe(n)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "streams": self.streams,
+                "upstream_chunks": self.chunks,
+                "frames": self.frames,
+                "writes_saved": self.chunks - self.frames,
+                "avg_bytes_per_frame": round(self.bytes / self.frames, 1) if self.frames else None,
+                "frames_per_stream": self.frames_per_stream.snapshot(),
+                "bytes_per_frame": self.bytes_per_frame.snapshot(),
+                "chunks_per_frame": self.chunks_per_frame.snapshot()
+            }
+
+
+class StreamFramer:
+    """
+    📦 /analyze 流分帧：把上游逐 token 的小分片合并成帧再写给客户端
+
+    - 满 max_bytes 或距帧内首个分片超过 max_ms 即刷出 (先到为准)；max_ms=0 表示不合并、逐片直出
+    - <think> / </think> 前强制刷出，保证思考与正文不会落在同一帧的中间
+    - <queue> 排队标记立即单独发出
+    """
+
+    def __init__(self, max_ms=None, max_bytes=None):
+        self.max_ms = int(os.getenv("STREAM_FRAME_MS", "30")) if max_ms is None else max_ms
+        self.max_bytes = int(os.getenv("STREAM_FRAME_BYTES", "512")) if max_bytes is None else max_bytes
+        self.stats = FrameStats()
+
+    def options(self, max_ms=None, max_bytes=None):
+        """单个请求的分帧参数 (越界值夹到合理范围)"""
+        ms = self.max_ms if max_ms is None else max(0, min(MAX_FRAME_MS, int(max_ms)))
+        size = self.max_bytes if max_bytes is None else max(1, min(MAX_FRAME_BYTES, int(max_bytes)))
+        return ms, size
+
+    async def frame(self, source, max_ms=None, max_bytes=None):
+        max_ms, max_bytes = self.options(max_ms, max_bytes)
+        chunks = 0
+        frame_sizes, frame_chunks = [], []
+        buf, buf_bytes, buf_started = [], 0, None
+
+        def take():
+            nonlocal buf, buf_bytes, buf_started
+            out = "".join(buf)
+            frame_sizes.append(buf_bytes)
+            frame_chunks.append(len(buf))
+            buf, buf_bytes, buf_started = [], 0, None
+            return out
+
+        if max_ms <= 0:
+            # 逐片直出 (仅统计)
+            try:
+                async for chunk in source:
+                    chunks += 1
+                    frame_sizes.append(len(chunk.encode("utf-8")))
+                    frame_chunks.append(1)
+                    yield chunk
+            finally:
+                self.stats.record(chunks, len(frame_sizes), frame_sizes, frame_chunks)
+            return
+
+        # 独立的读取任务：上游停顿时也能按时间刷出已缓冲的内容
+        queue = asyncio.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for chunk in source:
+                    await queue.put(chunk)
+            except Exception as e:
+                await queue.put(e)
+            finally:
+                await queue.put(done)
+
+        pump_task = asyncio.create_task(pump())
+        try:
+            while True:
+                timeout = None
+                if buf:
+                    timeout = max(0.0, max_ms / 1000 - (time.perf_counter() - buf_started))
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout) if timeout is not None else await queue.get()
+                except asyncio.TimeoutError:
+                    yield take()
+                    continue
+
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                chunks += 1
+                if item.startswith(IMMEDIATE_PREFIX):
+                    if buf: yield take()
+                    buf, buf_bytes, buf_started = [item], len(item.encode("utf-8")), time.perf_counter()
+                    yield take()
+                    continue
+                if item in BOUNDARY_MARKERS and buf:
+                    yield take()
+
+                if not buf: buf_started = time.perf_counter()
+                buf.append(item)
+                buf_bytes += len(item.encode("utf-8"))
+                if buf_bytes >= max_bytes:
+                    yield take()
+
+            if buf:
+                yield take()
+        finally:
+            if not pump_task.done():
+                pump_task.cancel()
+                try:
+                    await pump_task
+                except asyncio.CancelledError:
+                    pass
+            await source.aclose()
+            self.stats.record(chunks, len(frame_sizes), frame_sizes, frame_chunks)
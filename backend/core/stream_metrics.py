@@ -0,0 +1,234 @@
+# backend/core/stream_metrics.py
+
+import math
+import time
+import threading
+
+# 指数分桶：1, 1.5, 2.25 ... 覆盖 1ms ~ 10min / 1 ~ 数十万 token
+_BUCKET_GROWTH = 1.5
+_BUCKET_COUNT = 40
+_BOUNDS = [_BUCKET_GROWTH ** i for i in range(_BUCKET_COUNT)]
+
+
+class Histogram:
+    """定长指数分桶直方图 (常数内存)，百分位在桶内线性插值"""
+
+    def __init__(self):
+        self.buckets = [0] * (_BUCKET_COUNT + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        if value is None: return
+        value = max(0.0, float(value))
+        idx = 0 if value <= 1 else min(_BUCKET_COUNT, int(math.ceil(math.log(value, _BUCKET_GROWTH))))
+        self.buckets[idx] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, p):
+        if not self.count: return None
+        rank = p / 100 * self.count
+        seen = 0
+        for idx, n in enumerate(self.buckets):
+            if not n: continue
+            if seen + n >= rank:
+                lower = 0.0 if idx == 0 else _BOUNDS[idx - 1]
+                upper = _BOUNDS[idx] if idx < _BUCKET_COUNT else self.max
+                value = lower + (upper - lower) * ((rank - seen) / n)
+                return min(max(value, self.min), self.max)
+            seen += n
+        return self.max
+
+    def snapshot(self):
+        if not self.count: return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 2),
+            "p50": round(self.percentile(50), 2),
+            "p90": round(self.percentile(90), 2),
+            "p99": round(self.percentile(99), 2),
+            "min": round(self.min, 2),
+            "max": round(self.max, 2)
+        }
+
+
+# 每个模型记录的指标 (毫秒 / token / token每秒)
+METRIC_NAMES = (
+    "context_ms",            # 请求进入 -> 上下文收集完成 (鉴权之后)
+    "queue_ms",              # 上下文完成 -> 真正发起上游请求
+    "connect_ms",            # 发起上游请求 -> 拿到流 (响应头)
+    "ttft_reasoning_ms",     # 发起上游请求 -> 首个思考 token (R1)
+    "ttft_content_ms",       # 发起上游请求 -> 首个正文 token
+    "total_ms",              # 发起上游请求 -> 流结束
+    "completion_tokens",
+    "tokens_per_sec",        # 首 token 之后的生成速度
+    "prompt_cache_hit_tokens",
+    "prompt_cache_miss_tokens",
+)
+
+
+class _ModelStats:
+    def __init__(self):
+        self.histograms = {name: Histogram() for name in METRIC_NAMES}
+        self.requests = 0
+        self.status = {"ok": 0, "error": 0, "cancelled": 0}
+        self.cache_hit_tokens = 0
+        self.cache_miss_tokens = 0
+        # 正常结束的流的输出 token 均值，用来估算被取消的流省下了多少 token
+        self.ok_tokens = 0
+        self.ok_streams = 0
+        self.cancelled_tokens_generated = 0
+        self.cancelled_tokens_saved = 0
+
+    def expected_tokens(self, max_tokens):
+        if not self.ok_streams: return max_tokens
+        mean = self.ok_tokens / self.ok_streams
+        return min(mean, max_tokens) if max_tokens else mean
+
+    def snapshot(self):
+        cached = self.cache_hit_tokens + self.cache_miss_tokens
+        return {
+            "requests": self.requests,
+            "status": dict(self.status),
+            "prompt_cache_hit_ratio": round(self.cache_hit_tokens / cached, 4) if cached else None,
+            "cancelled_tokens": {
+                "generated": self.cancelled_tokens_generated,
+                "saved_estimate": int(self.cancelled_tokens_saved)
+            },
+            "metrics": {name: h.snapshot() for name, h in self.histograms.items()}
+        }
+
+
+class StreamProbe:
+    """单次 /analyze 流的计时探针 (由 StreamMetrics.start 创建)"""
+
+    def __init__(self, registry, model, context_ms=None, max_tokens=None):
+        self.registry = registry
+        self.model = model
+        self.context_ms = context_ms
+        self.max_tokens = max_tokens
+        self.created = time.perf_counter()
+        self.requested = None
+        self.connected = None
+        self.first_reasoning = None
+        self.first_content = None
+        self.chunks = 0
+        self.usage = None
+        self.status = "ok"
+        self._finished = False
+
+    def mark_request(self):
+        self.requested = time.perf_counter()
+
+    def mark_connected(self):
+        self.connected = time.perf_counter()
+
+    def on_reasoning(self):
+        self.chunks += 1
+        if self.first_reasoning is None: self.first_reasoning = time.perf_counter()
+
+    def on_content(self):
+        self.chunks += 1
+        if self.first_content is None: self.first_content = time.perf_counter()
+
+    def on_usage(self, usage):
+        """DeepSeek 在最后一个分片里返回 usage (需要 stream_options.include_usage)"""
+        self.usage = usage
+
+    def fail(self):
+        self.status = "error"
+
+    def finish(self, cancelled=False):
+        if self._finished: return
+        self._finished = True
+        if cancelled and self.status == "ok": self.status = "cancelled"
+        self.registry._record(self, time.perf_counter())
+
+
+def _usage_value(usage, name):
+    if usage is None: return None
+    if isinstance(usage, dict): return usage.get(name)
+    value = getattr(usage, name, None)
+    if value is None:
+        # openai SDK 会把未声明的字段放进 model_extra
+        extra = getattr(usage, "model_extra", None) or {}
+        value = extra.get(name)
+    return value
+
+
+class StreamMetrics:
+    """
+    📈 /analyze 流式延迟统计 (按 MODEL_NAME 聚合)
+
+    直方图只保存分桶计数，常驻内存固定；/admin/metrics/analyze 输出各指标百分位。
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def start(self, model, context_ms=None, max_tokens=None):
+        return StreamProbe(self, model, context_ms, max_tokens)
+
+    def _record(self, probe, ended):
+        ms = lambda a, b: (b - a) * 1000 if a is not None and b is not None else None
+
+        completion_tokens = _usage_value(probe.usage, "completion_tokens")
+        if completion_tokens is None and probe.chunks:
+            completion_tokens = probe.chunks  # 上游未返回 usage：按分片数粗略估计 (约 1 token/分片)
+        first_token = min([t for t in (probe.first_reasoning, probe.first_content) if t is not None], default=None)
+        gen_seconds = (ended - first_token) if first_token is not None else 0
+        tokens_per_sec = completion_tokens / gen_seconds if completion_tokens and gen_seconds > 0 else None
+
+        hit = _usage_value(probe.usage, "prompt_cache_hit_tokens")
+        miss = _usage_value(probe.usage, "prompt_cache_miss_tokens")
+
+        values = {
+            "context_ms": probe.context_ms,
+            "queue_ms": ms(probe.created, probe.requested),
+            "connect_ms": ms(probe.requested, probe.connected),
+            "ttft_reasoning_ms": ms(probe.requested, probe.first_reasoning),
+            "ttft_content_ms": ms(probe.requested, probe.first_content),
+            "total_ms": ms(probe.requested, ended),
+            "completion_tokens": completion_tokens,
+            "tokens_per_sec": tokens_per_sec,
+            "prompt_cache_hit_tokens": hit,
+            "prompt_cache_miss_tokens": miss,
+        }
+
+        with self._lock:
+            stats = self._models.setdefault(probe.model, _ModelStats())
+            stats.requests += 1
+            stats.status[probe.status] = stats.status.get(probe.status, 0) + 1
+            for name, value in values.items():
+                stats.histograms[name].observe(value)
+            stats.cache_hit_tokens += hit or 0
+            stats.cache_miss_tokens += miss or 0
+            if probe.status == "ok" and completion_tokens:
+                stats.ok_tokens += completion_tokens
+                stats.ok_streams += 1
+            elif probe.status == "cancelled" and probe.requested is not None:
+                # 客户端断开后提前关闭上游：已生成的照常计费，剩余部分按同模型均值估算为节省
+                generated = completion_tokens or 0
+                stats.cancelled_tokens_generated += generated
+                expected = stats.expected_tokens(probe.max_tokens)
+                if expected: stats.cancelled_tokens_saved += max(0, expected - generated)
+        return values
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+                "models": {model: stats.snapshot() for model, stats in self._models.items()}
+            }
+
+    def reset(self):
+        with self._lock:
+            self._models = {}
+            self.started_at = time.time()
@@ -0,0 +1,208 @@
+# backend/core/stream_resume.py
+
+import os
+import time
+import uuid
+import asyncio
+from collections import deque
+
+
+class ResumeGap(Exception):
+    """请求的续传位置已被环形缓冲淘汰"""
+
+    def __init__(self, offset, base):
+        super().__init__(f"offset {offset} < base {base}")
+        self.offset = offset
+        self.base = base
+
+
+class _Session:
+    """一次 /analyze 输出：分片环形缓冲 (按 UTF-8 字节偏移寻址) + 录制任务"""
+
+    def __init__(self, request_id, owner):
+        self.id = request_id
+        self.owner = owner
+        self.chunks = deque()     # (start_offset, text, size)
+        self.evicted = 0          # 已淘汰的分片数 (分片绝对序号 = evicted + deque 下标)
+        self.base = 0             # 缓冲内最早字节的偏移
+        self.end = 0              # 已产出的总字节数
+        self.size = 0
+        self.done = False
+        self.readers = 0
+        self.resumes = 0
+        self.created = time.monotonic()
+        self.finished_at = None
+        self.task = None
+        self.abandon_handle = None
+        self.changed = asyncio.Condition()
+
+    def index_of(self, offset):
+        """包含 offset 的分片绝对序号 (offset == end 时返回下一个待产出的序号)"""
+        if offset < self.base:
+            raise ResumeGap(offset, self.base)
+        for i, (start, _, size) in enumerate(self.chunks):
+            if offset < start + size:
+                return self.evicted + i
+        return self.evicted + len(self.chunks)
+
+
+class ResumableStreams:
+    """
+    🔁 /analyze 断线续传
+
+    每个流分配 request_id，输出由独立的录制任务写入环形缓冲 (单流上限 ANALYZE_RESUME_BUFFER_KB)；
+    客户端只是缓冲的读者，断开不影响生成。续传按已收到的 UTF-8 字节数 (offset) 接着读：
+    - 生成中：先补发缓冲内容，再跟随实时分片
+    - 已结束：结束后保留 ANALYZE_RESUME_TTL_S 秒
+    续传不经过额度扣减，也不会再次请求上游。
+    生成中所有读者都断开、且 ANALYZE_RESUME_GRACE_S 秒内没有续传时，取消录制任务 (连带关闭上游、释放槽位)；
+    open() 时即开始计时，第一个读者开始读取时取消 —— 响应体还没开始迭代客户端就断开的流同样会被回收。
+    """
+
+    def __init__(self, ttl=None, buffer_kb=None, max_sessions=None, grace=None):
+        self.ttl = float(os.getenv("ANALYZE_RESUME_TTL_S", "300")) if ttl is None else ttl
+        self.grace = float(os.getenv("ANALYZE_RESUME_GRACE_S", "3")) if grace is None else grace
+        self.buffer_bytes = int(float(os.getenv("ANALYZE_RESUME_BUFFER_KB", "256")) * 1024) if buffer_kb is None else int(buffer_kb * 1024)
+        self.max_sessions = int(os.getenv("ANALYZE_RESUME_MAX_SESSIONS", "2000")) if max_sessions is None else max_sessions
+        self._sessions = {}
+
+        self.opened = 0
+        self.resumed = 0
+        self.resumed_bytes = 0
+        self.gaps = 0
+        self.expired = 0
+        self.abandoned = 0
+
+    def open(self, owner, source):
+        """登记新流并开始录制，返回 session (session.id 即 request_id)"""
+        self._sweep()
+        session = _Session(uuid.uuid4().hex, owner)
+        self._sessions[session.id] = session
+        session.task = asyncio.create_task(self._record(session, source))
+        if self.grace > 0:
+            self._arm_abandon(session)
+        self.opened += 1
+        return session
+
+    def get(self, request_id, owner=None):
+        self._sweep()
+        session = self._sessions.get(request_id)
+        if session is None or (owner is not None and session.owner != owner):
+            return None
+        return session
+
+    async def _record(self, session, source):
+        try:
+            async for chunk in source:
+                size = len(chunk.encode("utf-8"))
+                async with session.changed:
+                    session.chunks.append((session.end, chunk, size))
+                    session.end += size
+                    session.size += size
+                    while session.size > self.buffer_bytes and len(session.chunks) > 1:
+                        _, _, dropped = session.chunks.popleft()
+                        session.size -= dropped
+                        session.evicted += 1
+                        session.base += dropped
+                    session.changed.notify_all()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"❌ [Resume] 录制异常 {session.id[:8]}: {e}")
+        finally:
+            if session.abandon_handle is not None:
+                session.abandon_handle.cancel()
+                session.abandon_handle = None
+            await source.aclose()
+            async with session.changed:
+                session.done = True
+                session.finished_at = time.monotonic()
+                session.changed.notify_all()
+
+    async def follow(self, session, offset=0):
+        """
+        从 offset 开始读取 session 的输出 (首个分片可能从中间切开，此时以 bytes 产出)
+        :raises ResumeGap: offset 已被淘汰 (在第一次迭代时抛出)
+        """
+        idx = session.index_of(offset)
+        if offset:
+            session.resumes += 1
+            self.resumed += 1
+            self.resumed_bytes += max(0, session.end - offset)
+        session.readers += 1
+        if session.abandon_handle is not None:
+            session.abandon_handle.cancel()
+            session.abandon_handle = None
+        try:
+            while True:
+                while idx < session.evicted + len(session.chunks):
+                    if idx < session.evicted:
+                        # 读者落后于淘汰：后续内容已不完整，只能结束
+                        self.gaps += 1
+                        print(f"⚠️ [Resume] {session.id[:8]} 读者落后于环形缓冲，输出被截断")
+                        return
+                    start, chunk, size = session.chunks[idx - session.evicted]
+                    idx += 1
+                    if offset > start:
+                        yield chunk.encode("utf-8")[offset - start:]
+                    else:
+                        yield chunk
+                    offset = start + size
+                if session.done:
+                    break
+                async with session.changed:
+                    await session.changed.wait_for(lambda: session.done or idx < session.evicted + len(session.chunks))
+        finally:
+            session.readers -= 1
+            if session.readers <= 0 and not session.done:
+                # 读者中途断开：宽限期内可续传，过期则停止生成
+                if self.grace > 0:
+                    self._arm_abandon(session)
+                else:
+                    self._abandon(session)
+
+    def _arm_abandon(self, session):
+        if session.abandon_handle is not None:
+            session.abandon_handle.cancel()
+        session.abandon_handle = asyncio.get_running_loop().call_later(self.grace, self._abandon, session)
+
+    def _abandon(self, session):
+        session.abandon_handle = None
+        if session.readers > 0 or session.done:
+            return
+        if self._sessions.get(session.id) is session:
+            del self._sessions[session.id]
+        session.task.cancel()
+        self.abandoned += 1
+        print(f"🛑 [Resume] {session.id[:8]} 无人续传，已停止生成 (已输出 {session.end} 字节)")
+
+    def _sweep(self):
+        now = time.monotonic()
+        expired = [sid for sid, s in self._sessions.items()
+                   if s.done and now - s.finished_at > self.ttl]
+        # 超出会话数上限：从最早结束的开始淘汰 (生成中的不淘汰)
+        overflow = len(self._sessions) - len(expired) - self.max_sessions
+        if overflow > 0:
+            finished = sorted((s for s in self._sessions.values() if s.done and s.id not in expired), key=lambda s: s.finished_at)
+            expired += [s.id for s in finished[:overflow]]
+        for sid in expired:
+            del self._sessions[sid]
+        self.expired += len(expired)
+
+    def stats(self):
+        sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "generating": sum(1 for s in sessions if not s.done),
+            "readers": sum(s.readers for s in sessions),
+            "buffered_bytes": sum(s.size for s in sessions),
+            "opened": self.opened,
+            "resumed": self.resumed,
+            "resumed_bytes": self.resumed_bytes,
+            "gaps": self.gaps,
+            "expired": self.expired,
+            "abandoned": self.abandoned,
+            "ttl_s": self.ttl,
+            "grace_s": self.grace,
+            "buffer_kb": self.buffer_bytes // 1024
+        }
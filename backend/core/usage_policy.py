@@ -0,0 +1,195 @@
+# backend/core/usage_policy.py
+"""
+💳 用量 / 会员判定 (纯函数，不做任何 IO)
+
+同步 KnowledgeBase 与异步 AsyncKnowledgeBase 共用这里的规则：
+调用方负责读用户文档、按返回值写库，两边的计费口径因此永远一致。
+"""
+
+import copy
+import datetime
+
+PRO_ROLES = ("vip", "svip", "admin", "pro")
+MEMBER_ROLES = ("pro", "vip", "svip")
+
+BASE_R1_DAILY = 3
+
+# ⚡ 即时模式 (纯规则，不调用 LLM)：独立的小时额度，不占 Chat / R1 次数
+INSTANT_HOURLY = 60
+INSTANT_HOURLY_PRO = 200
+
+
+def _aware(dt):
+    if dt.tzinfo is None: dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt
+
+
+def resolve_membership(user, now=None):
+    """
+    :return: (当前角色, 是否刚过期需要降级写库)
+    """
+    if not user: return "user", False
+    role = user.get("role", "user")
+    if role in MEMBER_ROLES:
+        expire_at = user.get("membership_expire")
+        if not expire_at: return role, False
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        if _aware(expire_at) < now:
+            return "user", True
+    return role, False
+
+
+def summarize_usage(user, current_role, now=None):
+    """/users/me 展示用的额度快照 (对应 get_user_usage_status)"""
+    if not user: return {}
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    is_pro = current_role in PRO_ROLES
+
+    # --- R1 (核心) 统计 ---
+    today_str = now.strftime("%Y-%m-%d")
+    usage_data = user.get("usage_stats", {})
+    bonus = usage_data.get("bonus_r1", 0)
+    total_limit = BASE_R1_DAILY + bonus
+    r1_used = sum(usage_data.get("counts_reasoner", {}).values()) if usage_data.get("last_reset_date") == today_str else 0
+
+    # --- Chat (快速) 统计 ---
+    bonus_chat = usage_data.get("bonus_chat", 0)
+    base_hourly = 30 if is_pro else 10
+    chat_limit = base_hourly + bonus_chat
+
+    # 计算当前小时已用 (逻辑同 evaluate_usage)
+    chat_used = 0
+    hourly_start_str = usage_data.get("hourly_start")
+    if hourly_start_str:
+        try:
+            hourly_start = _aware(datetime.datetime.fromisoformat(hourly_start_str))
+            # 如果距离上次记录起始时间超过1小时，则当前已用视为0
+            if (now - hourly_start).total_seconds() <= 3600:
+                chat_used = usage_data.get("hourly_count", 0)
+        except:
+            chat_used = 0
+
+    instant_used = 0
+    instant_start_str = usage_data.get("instant_start")
+    if instant_start_str and usage_data.get("last_reset_date") == today_str:
+        try:
+            if (now - _aware(datetime.datetime.fromisoformat(instant_start_str))).total_seconds() <= 3600:
+                instant_used = usage_data.get("instant_count", 0)
+        except:
+            instant_used = 0
+
+    return {
+        "is_pro": is_pro,
+        "role": current_role,
+        "r1_limit": total_limit,
+        "r1_used": r1_used,
+        "r1_remaining": max(0, total_limit - r1_used) if not is_pro else -1,
+        "chat_hourly_limit": chat_limit,
+        "chat_used": chat_used,
+        "instant_hourly_limit": INSTANT_HOURLY_PRO if is_pro else INSTANT_HOURLY,
+        "instant_used": instant_used
+    }
+
+
+def evaluate_usage(user, current_role, mode, model_type="chat", now=None):
+    """
+    频控 + 计费判定 (对应 check_and_update_usage)
+    :return: (allowed, msg, remaining, update) —— allowed 时 update 为需要写回 users 集合的 $set/$inc
+    """
+    if not user: return False, "用户不存在", 0, None
+
+    is_pro = current_role in PRO_ROLES
+
+    # 余额检查
+    if model_type == "reasoner":
+        explicit_balance = user.get("r1_remaining")
+        if explicit_balance is not None and explicit_balance <= 0:
+            return False, "深度思考次数不足 (余额已耗尽)", -1, None
+
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    today_str = now.strftime("%Y-%m-%d")
+
+    # 1. 每日重置逻辑 (保留 Bonus)
+    usage_data = copy.deepcopy(user.get("usage_stats", {}))
+    if usage_data.get("last_reset_date") != today_str:
+        usage_data = {
+            "last_reset_date": today_str,
+            "counts_chat": {},
+            "counts_reasoner": {},
+            "last_access": {},
+            "hourly_start": now.isoformat(),
+            "hourly_count": 0,
+            "bonus_r1": usage_data.get("bonus_r1", 0),
+            "bonus_chat": usage_data.get("bonus_chat", 0)
+        }
+
+    # ⚡ 即时模式：只走自己的小时桶，没有冷却，也不计入 Chat 频控
+    if model_type == "instant":
+        return _charge_instant(usage_data, is_pro, now)
+
+    # 2. 频控 (Hour Limit)
+    bonus_chat = usage_data.get("bonus_chat", 0)
+    base_hourly = 30 if is_pro else 10
+    HOURLY_LIMIT = base_hourly + bonus_chat
+
+    hourly_start_str = usage_data.get("hourly_start")
+    hourly_start = _aware(datetime.datetime.fromisoformat(hourly_start_str) if hourly_start_str else now)
+
+    if (now - hourly_start).total_seconds() > 3600:
+        hourly_start, usage_data["hourly_count"] = now, 0
+
+    if usage_data.get("hourly_count", 0) >= HOURLY_LIMIT:
+        return False, f"操作过于频繁 ({60 - int((now - hourly_start).total_seconds() / 60)}m)", 0, None
+
+    # 3. 冷却 (Cooldown)
+    COOLDOWN = 5 if is_pro else 15
+    last_time_str = usage_data.get("last_access", {}).get(mode)
+    if last_time_str:
+        try:
+            last_time = _aware(datetime.datetime.fromisoformat(last_time_str))
+            if (now - last_time).total_seconds() < COOLDOWN:
+                return False, "AI思考中", int(COOLDOWN - (now - last_time).total_seconds()), None
+        except: pass
+
+    # 4. R1 次数检查
+    if not is_pro and model_type == "reasoner":
+        daily_r1_limit = BASE_R1_DAILY + usage_data.get("bonus_r1", 0)
+        used_today = sum(usage_data.get("counts_reasoner", {}).values())
+        if used_today >= daily_r1_limit:
+            return False, f"深度思考限额已满 ({used_today}/{daily_r1_limit})", -1, None
+
+    # 5. 更新统计
+    if model_type == "reasoner":
+        usage_data["counts_reasoner"][mode] = usage_data["counts_reasoner"].get(mode, 0) + 1
+    else:
+        usage_data["counts_chat"][mode] = usage_data["counts_chat"].get(mode, 0) + 1
+
+    usage_data["last_access"][mode] = now.isoformat()
+    usage_data["hourly_count"] = usage_data.get("hourly_count", 0) + 1
+    usage_data["hourly_start"] = hourly_start.isoformat()
+
+    # 写入 last_active 和 total_usage (永久累加)
+    update = {
+        "$set": {"usage_stats": usage_data, "last_active": now},
+        "$inc": {"total_usage": 1}
+    }
+    return True, "OK", 0, update
+
+
+def _charge_instant(usage_data, is_pro, now):
+    limit = INSTANT_HOURLY_PRO if is_pro else INSTANT_HOURLY
+    start_str = usage_data.get("instant_start")
+    start = _aware(datetime.datetime.fromisoformat(start_str)) if start_str else now
+    if (now - start).total_seconds() > 3600:
+        start, usage_data["instant_count"] = now, 0
+
+    if usage_data.get("instant_count", 0) >= limit:
+        return False, f"即时分析过于频繁 ({60 - int((now - start).total_seconds() / 60)}m)", 0, None
+
+    usage_data["instant_count"] = usage_data.get("instant_count", 0) + 1
+    usage_data["instant_start"] = start.isoformat()
+    update = {
+        "$set": {"usage_stats": usage_data, "last_active": now},
+        "$inc": {"total_usage": 1}
+    }
+    return True, "OK", 0, update
@@ -32,7 +32,7 @@ import shutil
 app = FastAPI()
 # ✨ 关键修改：引入异步客户端，解决排队问题
 from bson import ObjectId
-from openai import AsyncOpenAI, APIError
+from openai import APIError
 
 # 🔐 安全库
 from passlib.context import CryptContext
@@ -40,6 +40,24 @@ from jose import JWTError, jwt
 
 # 引入数据库逻辑
 from core.database import KnowledgeBase
+from core.async_database import create_async_knowledge_base
+from core.draft_context import DraftContext
+from core.lru_cache import BoundedLRUCache
+from core.mechanics_snapshot import MechanicsSnapshot
+from core.response_cache import AnalyzeResponseCache
+from core.single_flight import SingleFlight
+from core.stage_timer import StageTimer
+from core.stream_metrics import StreamMetrics
+from core.llm_governor import LLMGovernor, GovernorRejected, priority_for_role
+from core.llm_transport import LLMTransport, stream_chat
+from core.llm_hedge import HedgePolicy
+from core.speculative_context import SpeculativeContexts
+from core.instant_analysis import InstantAnalyzer
+from core.scoring_engine import recommend_heroes_legacy
+from core.prompt_budget import PromptBudget
+from core.stream_framing import StreamFramer
+from core.json_events import analyze_events
+from core.stream_resume import ResumableStreams, ResumeGap
 
 # 引入数据同步脚本 (用于启动时自动更新 Prompt)
 try:
@@ -51,7 +69,6 @@ except ImportError:
 RATE_LIMIT_STORE = {}      # 邮件发送频控
 LOGIN_LIMIT_STORE = {}     # 登录接口频控
 ANALYZE_LIMIT_STORE = {}   # AI分析频控
-CHAMPION_CACHE = {}        # 全局英雄缓存
 # 🟢 全局英雄名称映射表 (用于自动纠错)
 CHAMPION_NAME_MAP = {}
 
@@ -59,6 +76,12 @@ current_dir = Path(__file__).resolve().parent
 root_dir = current_dir.parent
 env_path = root_dir / '.env'
 load_dotenv(dotenv_path=env_path)
+# ⚔️ 对位克制矩阵文件 (.npy + 同名 .json 元数据，运行时生成，多 worker 共享 mmap)
+MATCHUP_MATRIX_PATH = os.getenv("MATCHUP_MATRIX_PATH", str(current_dir / "data" / "matchup_matrix.npy"))
+# 📋 离线入围表 (seed 之后按英雄快照 + 对位矩阵重建)
+# 当前表规模在本进程内算不到 1 秒，默认不起进程池 (子进程启动比计算本身还慢)；0 = 按 CPU 核数
+SHORTLIST_TABLE_PATH = os.getenv("SHORTLIST_TABLE_PATH", str(current_dir / "data" / "shortlists.npy"))
+SHORTLIST_WORKERS = int(os.getenv("SHORTLIST_WORKERS", "1")) or None
 
 # ================= 🛡️ 注册风控配置 (防薅羊毛) =================
 # 定义允许注册的邮箱域名白名单
@@ -102,11 +125,9 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 
-# ✨ 初始化异步 OpenAI 客户端
-client = AsyncOpenAI(
-    api_key=DEEPSEEK_API_KEY, 
-    base_url="https://api.deepseek.com"
-)
+# ✨ 初始化异步 OpenAI 客户端 (显式连接池 + 启动预热 + 后台心跳，配置见 core/llm_transport.py)
+llm_transport = LLMTransport(DEEPSEEK_API_KEY)
+client = llm_transport.client
 
 # 🟢 2. 新增：名称归一化工具函数
 def normalize_simple(name):
@@ -166,15 +187,27 @@ async def lifespan(app: FastAPI):
             print("✅ [Startup] 数据库同步完成！")
         except Exception as e:
             print(f"⚠️ [Startup] 数据库同步失败 (非致命): {e}")
+
+    # 🗂️ 构建英雄内存索引 / 机制库快照 (必须在 seed 之后，确保读到最新数据)
+    # 英雄快照 / 矩阵 / 入围表构建是 CPU + 磁盘重活 (可能起进程池)，放到线程池里，不占事件循环
+    await run_in_threadpool(db.reload_champion_index, current_dir / "secure_data" / "champions.json")
+    await run_in_threadpool(db.reload_matchup_matrix, MATCHUP_MATRIX_PATH)
+    await run_in_threadpool(db.reload_shortlist_table, SHORTLIST_TABLE_PATH, SHORTLIST_WORKERS)
+    db.reload_mechanics_snapshot()
+
+    # 🔌 预热上游连接 (失败不影响启动，首个请求现场建连)
+    await llm_transport.start()
     
     yield  # 服务运行中...
     
-    # --- 关闭逻辑 (如果有) ---
-    pass
+    # --- 关闭逻辑 ---
+    await llm_transport.stop()
 
 # 🔒 生产环境关闭 Swagger UI，并注册 lifespan
 app = FastAPI(docs_url=None, redoc_url=None, lifespan=lifespan) 
 db = KnowledgeBase()
+# ⚡ 热路径 (/analyze、/users/me、私信、鉴权) 使用的异步数据层，与 db 共用连接池配置与内存索引
+adb = create_async_knowledge_base(db)
 assets_path = current_dir / "assets"
 # 确保文件夹存在，防止报错
 if not assets_path.exists():
@@ -226,6 +259,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "DELETE", "OPTIONS"], 
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Analyze-Request-Id", "X-Analyze-Mode", "X-Analyze-Degraded"],
 )
 
 # ================= 模型定义 =================
@@ -352,12 +386,18 @@ class AnalyzeRequest(BaseModel):
     
     myLaneAssignments: Optional[Dict[str, str]] = None 
     enemyLaneAssignments: Optional[Dict[str, str]] = None
-    model_type: str = "chat" # 'chat' or 'reasoner'
+    model_type: str = "chat" # 'chat' or 'reasoner' or 'instant' (纯规则，不调用 AI)
     
     # 🔥🔥🔥 [关键修复] 添加 extraMechanics 字段
     # 允许接收 HexLite 发送的实时技能包 (Dict: 英雄名 -> 技能描述文本)
     extraMechanics: Optional[Dict[str, str]] = {} 
 
+    # 📦 流分帧 (可选)：合并等待上限 (ms，0 = 逐片直出) / 单帧字节上限，缺省用服务端配置
+    frame_ms: Optional[int] = None
+    frame_bytes: Optional[int] = None
+    # 🧩 输出格式："text" (默认，原始文本流) / "events" (服务端增量解析 JSON，输出 SSE 事件)
+    output: str = "text"
+
 class UserProfileSync(BaseModel):
     gameName: str = "Unknown"
     tagLine: str = ""
@@ -417,7 +457,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
-    user = db.get_user(username)
+    user = await adb.get_user(username)
     if user is None:
         raise credentials_exception
     return user
@@ -431,150 +471,32 @@ def get_author_name(user):
 
 # ================= 🧠 智能分路与算法 =================
 
-def infer_team_roles(team_list: List[str], fixed_assignments: Optional[Dict[str, str]] = None):
-    clean_team = [h.strip() for h in team_list if h] if team_list else []
-    standard_roles = ["TOP", "JUNGLE", "MID", "ADC", "SUPPORT"]
-    final_roles = {role: "Unknown" for role in standard_roles}
-    assigned_heroes = set()
-
-    if fixed_assignments:
-        for role, hero_raw in fixed_assignments.items():
-            if not hero_raw: continue
-            role_upper = role.upper()
-            hero = hero_raw.strip()
-            if role_upper in standard_roles:
-                final_roles[role_upper] = hero
-                assigned_heroes.add(hero)
-    
-    remaining_heroes = []
-    for h in clean_team:
-        is_assigned = False
-        for assigned in assigned_heroes:
-            if h.lower() == assigned.lower():
-                is_assigned = True
-                break
-        if not is_assigned:
-            remaining_heroes.append(h)
-    
-    for hero in remaining_heroes:
-        # 安全调用：如果 db 没有 get_champion_info 方法则返回 None
-        hero_info = getattr(db, 'get_champion_info', lambda x: None)(hero)
-        # 适配新版数据：role 已经是大写 TOP/MID 等
-        pref_role = hero_info.get('role', 'MID').upper() if hero_info else "MID"
-        
-        target = pref_role
-        if target not in standard_roles: target = "MID"
-
-        if final_roles[target] == "Unknown":
-            final_roles[target] = hero
-        else:
-            for r in standard_roles:
-                if final_roles[r] == "Unknown":
-                    final_roles[r] = hero
-                    break
-    
-    return {k: v for k, v in final_roles.items() if v != "Unknown"}
+def infer_team_roles(team_list: List[str], fixed_assignments: Optional[Dict[str, str]] = None, resolve=None):
+    """
+    阵容分路推断：指定分路作为约束，其余英雄按 positions 的 pick_rate 求联合概率最大的分配
+    (见 core/role_inference.py，英雄向量来自英雄快照，按阵容记忆)
+    resolve: 快照未收录英雄的解析函数 (/analyze 传入 DraftContext.get，避免逐个查库)
+    """
+    return db.role_inference.infer(team_list, fixed_assignments, resolve=resolve or getattr(db, 'get_champion_info', None))
 
 # ==========================================
 # 🧠 V6.0 混合驱动核心算法 (Hybrid Engine)
 # ==========================================
 
-def analyze_composition_tags(team_list, db_instance):
-    """
-    [V6.0] 快速扫描阵容成分 (基于数据库 Tags)
-    """
-    stats = {
-        "ap_count": 0,
-        "ad_count": 0,
-        "tank_count": 0,
-        "engagers": 0  # 开团点
-    }
-    
-    for hero_name in team_list:
-        if not hero_name or hero_name == "None": continue
-        
-        # 模糊查找英雄数据
-        hero_data = db_instance.champions_col.find_one({"name": hero_name})
-        if not hero_data: continue
-        
-        tags = [t.lower() for t in hero_data.get('tags', [])]
-        
-        # 1. 伤害类型估算
-        if 'mage' in tags or 'support' in tags or 'ap' in tags: 
-            stats['ap_count'] += 1
-        else:
-            stats['ad_count'] += 1
-            
-        # 2. 前排估算
-        if 'tank' in tags or 'fighter' in tags:
-            stats['tank_count'] += 1
-            
-    return stats
-
 def recommend_heroes_hybrid(db_instance, user_role, rank_tier, my_team, enemy_team, enemy_laner):
     """
     [V6.0] 混合推荐逻辑
     Python 负责海选 (WinRate + Basic Synergy) -> Top 10 Candidates
     LLM 负责精选 (Three-Dimensional Logic) -> Final 3
+    候选池 / 阵容成分全部来自英雄快照 (db.champion_snapshot)，推荐阶段不访问数据库
+    打分见 core/scoring_engine.py：列式引擎就绪时走向量化打分，否则回退逐条打分 (两者结果逐位一致)
+    列式引擎挂了对位矩阵时，再按对线敌人 (enemy_laner) + 段位档 (rank_tier) 叠加克制分；
+    挂了离线入围表 (core/shortlist_table.py) 时直接查表
     """
-    current_role = user_role.lower() # 数据库通常存小写 role
-    
-    # 1. 分析局势
-    comp_stats = analyze_composition_tags(my_team, db_instance)
-    
-    # 2. 设定海选池 (从数据库拉取该位置所有英雄)
-    # 注意：确保你的数据库 champions_col 里有 role 字段
-    cursor = db_instance.champions_col.find({"role": current_role})
-    
-    candidates = []
-    
-    for hero in cursor:
-        # --- A. 基础分：版本强度 (Win Rate) ---
-        try:
-            # 处理 "50.52%" -> 50.52
-            win_rate_str = hero.get('win_rate', '50%').replace('%', '')
-            win_rate = float(win_rate_str)
-        except:
-            win_rate = 50.0
-            
-        score = win_rate * 2  # 基础分 (约 100 分)
-        tags = [t.lower() for t in hero.get('tags', [])]
-        
-        # --- B. 阵容修补加分 (诱导 AI 关注) ---
-        
-        # 1. 菜刀队修正 (全队缺 AP)
-        # 如果队友 AD >= 3 且 AP < 1，给法伤英雄加分
-        if comp_stats['ad_count'] >= 3 and comp_stats['ap_count'] < 1:
-            if 'mage' in tags or 'ap' in tags:
-                score += 15 
-        
-        # 2. 零前排修正
-        # 如果全队无前排，给坦克/战士加分
-        if comp_stats['tank_count'] == 0:
-            if 'tank' in tags or 'fighter' in tags:
-                score += 10
-        
-        # 3. Tier 加分 (T1 > T2 > T3)
-        tier = hero.get('tier', 'T3')
-        if tier == 'T1': score += 12
-        elif tier == 'T2': score += 6
-        
-        # --- C. 封装数据 ---
-        # 必须把 tags 传给 LLM，让它判断 "是否有位移"、"是否能清线"
-        candidates.append({
-            "name": hero['name'],
-            "alias": hero.get('alias', [hero['name']])[0], # 中文名
-            "win_rate": hero.get('win_rate', '50%'),
-            "tags": tags,
-            "tier": tier,
-            "score": score
-        })
-    
-    # 3. 按分数排序，取 Top 12 个 "入围者"
-    candidates.sort(key=lambda x: x['score'], reverse=True)
-    top_candidates = candidates[:12] 
-    
-    return top_candidates, comp_stats
+    engine = getattr(db_instance, "scoring_engine", None)
+    if engine is not None and engine.ready:
+        return engine.recommend(user_role, my_team, enemy_laner=enemy_laner, rank_bucket=rank_tier)
+    return recommend_heroes_legacy(db_instance, user_role, my_team)
 
 # 🟢 FastAPI 版本的邀请码接口 (已增加 30 天上限逻辑)
 # ================= 辅助函数 (请确保定义在接口上方) =================
@@ -791,6 +713,7 @@ def add_tip_endpoint(data: TipInput, current_user: dict = Depends(get_current_us
     # 3. 存入数据库
     # 注意：这里直接存入，不再需要等待 AI
     res = db.add_tip(data.hero, data.enemy, data.content, current_user['username'], data.is_general)
+    prompt_cache.invalidate(tag=data.hero, reason="new tip")
     
     # 4. 补充用户信息到帖子中
     if hasattr(res, 'inserted_id'):
@@ -1037,19 +960,19 @@ def sync_user_profile(data: UserProfileSync, current_user: dict = Depends(get_cu
     return {"status": "success", "msg": f"同步成功 (库内 {len(merged_matches)} 场)"}
 
 @app.get("/users/me")
-def read_users_me(current_user: dict = Depends(get_current_user)):
-    status_info = db.get_user_usage_status(current_user['username'])
-    user_doc = db.users_col.find_one({"_id": current_user["_id"]}) # 重新查库保鲜
+async def read_users_me(current_user: dict = Depends(get_current_user)):
+    status_info = await adb.get_user_usage_status(current_user['username'])
+    user_doc = await adb.get_user_by_id(current_user["_id"]) # 重新查库保鲜
     
     my_titles = user_doc.get("available_titles", [])
     if "社区成员" not in my_titles: my_titles.append("社区成员")
     
-    unread_count = db.get_unread_count_total(current_user['username'])
+    unread_count = await adb.get_unread_count_total(current_user['username'])
 
     # 获取战友名字
     partner_name = None
     if user_doc.get("invited_by"):
-        partner = db.users_col.find_one({"_id": user_doc["invited_by"]})
+        partner = await adb.get_user_by_id(user_doc["invited_by"])
         if partner: partner_name = partner["username"]
 
     return {
@@ -1151,7 +1074,7 @@ def get_user_public_profile(target_input: str, current_user: dict = Depends(get_
 # 💬 私信 API 接口
 # ==========================
 @app.post("/messages")
-def send_msg(data: MessageSend, current_user: dict = Depends(get_current_user)):
+async def send_msg(data: MessageSend, current_user: dict = Depends(get_current_user)):
     """发送私信 (含安全校验)"""
     # 1. 基础校验
     if data.receiver == current_user['username']:
@@ -1164,7 +1087,7 @@ def send_msg(data: MessageSend, current_user: dict = Depends(get_current_user)):
         raise HTTPException(400, "消息过长 (上限500字)")
 
     # 2. 获取接收者并检查权限
-    receiver_user = db.users_col.find_one({"username": data.receiver})
+    receiver_user = await adb.get_user(data.receiver)
     if not receiver_user:
         raise HTTPException(404, "用户不存在")
         
@@ -1176,7 +1099,7 @@ def send_msg(data: MessageSend, current_user: dict = Depends(get_current_user)):
         raise HTTPException(403, "普通用户无法直接私信管理员，请通过【反馈】功能联系")
 
     # 3. 发送
-    success, msg = db.send_message(current_user['username'], data.receiver, data.content)
+    success, msg = await adb.send_message(current_user['username'], data.receiver, data.content)
     if not success: raise HTTPException(400, msg)
     return {"status": "success"}
 
@@ -1255,26 +1178,25 @@ def parse_user_info(user_doc, default_name):
     return icon_id, display_name
 
 @app.delete("/messages/{contact}")
-def delete_conversation_endpoint(contact: str, current_user: dict = Depends(get_current_user)):
+async def delete_conversation_endpoint(contact: str, current_user: dict = Depends(get_current_user)):
     """删除与某人的会话 (物理删除)"""
-    success = db.delete_conversation(current_user['username'], contact)
+    success = await adb.delete_conversation(current_user['username'], contact)
     if not success:
         raise HTTPException(status_code=500, detail="删除失败")
     return {"status": "success"}
 
 @app.get("/messages/conversations")
-def get_conversations(current_user: dict = Depends(get_current_user)):
+async def get_conversations(current_user: dict = Depends(get_current_user)):
     """获取会话列表 (🚀 性能优化版：批量查询)"""
-    raw = db.get_my_conversations(current_user['username'])
+    raw = await adb.get_my_conversations(current_user['username'])
     res = []
     
     # 1. 提取所有联系人的 username
     contact_ids = [item['_id'] for item in raw if item['_id']]
     
     # 2. 🔥 [优化] 批量查询所有相关用户，而不是在循环里一个个查
-    users_cursor = db.users_col.find({"username": {"$in": contact_ids}})
     # 将结果转为字典方便查找: { "username": user_doc }
-    users_map = {u['username']: u for u in users_cursor}
+    users_map = await adb.get_users_by_names(contact_ids)
     
     for item in raw:
         contact_username = item['_id']
@@ -1300,16 +1222,16 @@ def get_conversations(current_user: dict = Depends(get_current_user)):
     return res
 
 @app.get("/messages/{contact}")
-def get_chat(contact: str, before: str = None, current_user: dict = Depends(get_current_user)):
+async def get_chat(contact: str, before: str = None, current_user: dict = Depends(get_current_user)):
     """
     获取聊天记录
     :param before: 可选，分页游标 (上一页第一条消息的 iso_time)
     """
     # 传递 before 参数给数据库
-    messages = db.get_chat_history(current_user['username'], contact, limit=50, before_time=before)
+    messages = await adb.get_chat_history(current_user['username'], contact, limit=50, before_time=before)
     
     # 查对方资料 (保持原逻辑)
-    contact_user = db.users_col.find_one({"username": contact})
+    contact_user = await adb.get_user(contact)
     icon_id, nickname = parse_user_info(contact_user, contact)
 
     contact_info = {
@@ -1454,6 +1376,9 @@ def verify_afdian_order(order_no, amount_str):
 @app.post("/like")
 def like_tip(data: LikeInput, current_user: dict = Depends(get_current_user)):
     if db.toggle_like(data.tip_id, current_user['username']):
+        # 点赞会改变 Top Tips 排序，清理该英雄的 Prompt 缓存
+        tip = db.get_tip_by_id(data.tip_id)
+        if tip: prompt_cache.invalidate(tag=tip.get('hero'), reason="tip liked")
         return {"status": "success"}
     raise HTTPException(status_code=400, detail="点赞失败")
 
@@ -1466,6 +1391,7 @@ def delete_tip_endpoint(tip_id: str, current_user: dict = Depends(get_current_us
     if tip['author_id'] != current_user['username'] and not is_admin: 
         raise HTTPException(status_code=403)
     if db.delete_tip(tip_id): 
+        prompt_cache.invalidate(tag=tip.get('hero'), reason="tip deleted")
         return {"status": "success"}
     raise HTTPException(status_code=500)
 
@@ -1746,64 +1672,296 @@ def add_post_comment(data: CommentCreate, current_user: dict = Depends(get_curre
         data.content
     )
     return new_comment
-# --- 4. AI 分析 (集成推荐算法) ---
+# =========================================================================
+# 🧱 System Prompt 组装 (/analyze 按 模式/分路/英雄/对位/段位档 缓存结果)
+# =========================================================================
 
-@app.post("/analyze")
-async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_current_user)): 
-    # 🟢 [防刷] 3秒冷却机制
-    username = current_user['username']
-    now = time.time()
-    last_request_time = ANALYZE_LIMIT_STORE.get(username, 0)
-    
-    # 如果距离上次请求不足 3 秒，直接拒绝
-    if now - last_request_time < 3:
-        # 这里用 JSONResponse 返回 429 也行，或者保持原样返回流式错误
-        # 为了统一体验，这里也建议改用 JSONResponse
-        return JSONResponse(
-            status_code=429,
-            content={
-                "concise": {
-                    "title": "操作太快了", 
-                    "content": "请等待 AI 思考完毕后再试 (冷却中...)"
-                }
-            }
+# 🔥 [Global Prefix] 全局元规则 (所有模式共享，确保 100% 缓存命中头部)
+META_SYSTEM_PROMPT = """
+【元规则 (系统底层指令)】
+1. **身份定义**：你是 HexCoach 战术副官，服务于英雄联盟玩家。
+2. **输出协议**：
+   - 必须输出纯 JSON 格式。
+   - **严格遵守 System Prompt 中定义的 JSON 结构**（不要自作主张）。
+   - 语言仅限中文。
+3. **排版视觉规范 (强制执行)**：
+   - **JSON 字符串处理**：JSON 值中的换行必须使用 `\\n` 转义符，**严禁**使用真实的物理换行/回车，这会导致 JSON 解析失败。
+   - **视觉降噪**：严禁使用 `**` 加粗（星号），重点内容如，**英雄名**、**关键装备**、**时间点**，仅允许使用【】包裹。
+   - **拒绝堆砌**：不要把所有信息塞进一段，必须换行。
+"""
+
+# 🔥 [Mode Specific] 野核专属校验 (仅野核模式追加)
+JUNGLE_FARM_RECAP = """
+=== 🛑 最终校验 (FINAL CHECK) ===
+请确保你的 `dashboard.strategies.early` 中包含：
+1. **黄金路线**：(0:55) F6/三狼开局的具体路径。
+2. **5:30 决策点**：包含【三狼(2)+蛤蟆(2)】的刷新处理。
+3. **巢虫落地**：必须解释【先布阵】的具体操作。
+请基于上述规则生成最终 JSON。
+"""
+
+# System Prompt 缓存 (条目数 + 内存双上限，热更新 / 社区 Tips 变动时失效)
+# TTL 兜底：多 worker 部署时其他进程的 Tips 变动无法通知到本进程
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "512"))
+PROMPT_CACHE_MAX_MB = float(os.getenv("PROMPT_CACHE_MAX_MB", "32"))
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", "600"))
+prompt_cache = BoundedLRUCache(
+    "PromptCache",
+    max_entries=PROMPT_CACHE_MAX_ENTRIES,
+    max_bytes=int(PROMPT_CACHE_MAX_MB * 1024 * 1024),
+    ttl=PROMPT_CACHE_TTL or None
+)
+
+# ♻️ 完整结果缓存 (默认关闭：ANALYZE_CACHE_ENABLED=1 开启，TTL/容量/重放节奏见 core/response_cache.py)
+analyze_cache = AnalyzeResponseCache()
+
+# ⏱️ 上下文收集阶段的单步超时 (超时则降级：缺 Tips/修正/推荐也照常生成)
+ANALYZE_STEP_TIMEOUT = float(os.getenv("ANALYZE_STEP_TIMEOUT_MS", "2000")) / 1000
+ANALYZE_RECOMMEND_TIMEOUT = float(os.getenv("ANALYZE_RECOMMEND_TIMEOUT_MS", "3000")) / 1000
+# 单次分析的输出上限 (同时用于估算客户端断开后节省的 token)
+ANALYZE_MAX_TOKENS = 4000
+
+# 🛫 相同最终 Prompt 的并发请求共用一条上游流 (上游并发/计费随唯一 Prompt 数增长，而非用户数)
+analyze_flights = SingleFlight("AnalyzeFlight")
+
+# 📈 /analyze 流式延迟直方图 (进程内，重启清零)
+stream_metrics = StreamMetrics()
+
+# 🚦 上游并发治理：chat / reasoner 分通道限流排队，会员优先 (上限/队列/阈值见 core/llm_governor.py)
+llm_governor = LLMGovernor()
+
+# 🪂 首 token 超时对冲 (LLM_HEDGE_ENABLED=1)：reasoner 迟迟不出 token 时并行请求 chat，先出者胜
+llm_hedge = HedgePolicy(governor=llm_governor)
+
+# ✂️ System Prompt token 预算 (按模板模式，见 core/prompt_budget.py)
+prompt_budget = PromptBudget()
+
+# 📦 /analyze 输出分帧：30ms / 512B 先到先刷 (STREAM_FRAME_MS / STREAM_FRAME_BYTES)，减少逐 token 的小包写入
+stream_framer = StreamFramer()
+
+# 🔮 选人阶段预计算：/ws/bridge 推送的阵容在后台提前构建上下文，/analyze 命中后直接请求上游
+speculative_contexts = SpeculativeContexts()
+
+# 🔁 断线续传：每个 /analyze 流在环形缓冲里保留输出，凭 request_id + 已收字节数续读 (不重复扣额度)
+resumable_streams = ResumableStreams()
+
+# ⚡ 即时模式 (model_type="instant")：修正 / 机制库 / 推荐 / Tips 直接拼 JSON，上游排队已满或失败时自动降级到这里
+instant_analyzer = InstantAnalyzer()
+
+def analyze_stream_response(session, headers, output="text", offset=0):
+    """把续传会话包装成 StreamingResponse (text 原样输出 / events 转为 SSE 事件)"""
+    headers = {**headers, "X-Analyze-Request-Id": session.id}
+    body = resumable_streams.follow(session, offset)
+    if output == "events":
+        return StreamingResponse(analyze_events(body), media_type="text/event-stream; charset=utf-8", headers=headers)
+    return StreamingResponse(body, media_type="text/plain; charset=utf-8", headers=headers)
+
+async def _single_chunk(text):
+    yield text
+
+def instant_stream_response(username, ctx, headers, output="text", reason=None):
+    """即时分析同样经续传会话输出 (request_id / events 模式与 AI 结果一致)"""
+    session = resumable_streams.open(username, _single_chunk(instant_analyzer.build(ctx, reason)))
+    headers = {**headers, "X-Analyze-Mode": "instant"}
+    if reason: headers["X-Analyze-Degraded"] = reason
+    return analyze_stream_response(session, headers, output)
+
+def get_rank_bucket(rank):
+    """段位分档：high (大师+) / mid (翡翠、钻石) / low (铂金及以下)"""
+    rank_str = str(rank).lower()
+    if any(r in rank_str for r in ["master", "grandmaster", "challenger"]):
+        return "high"
+    if any(r in rank_str for r in ["emerald", "diamond", "翡翠", "钻"]):
+        return "mid"
+    return "low"
+
+def build_strategy_instruction(rank):
+    """🧠 BP 推荐策略：三层分级 Prompt (High / Mid / Low)"""
+    bucket = get_rank_bucket(rank)
+
+    # 1. 【顶尖分段】大师、宗师、王者 (Master+)
+    if bucket == "high":
+        return (
+            f"**当前为高分段 ({rank})**：\n"
+            "- 你的推荐逻辑必须优先考虑 **全局阵容适配性 (Team Synergy)**。\n"
+            "- 如果某个英雄对线微劣但团战能产生巨大化学反应，可以推荐。\n"
+            "- 你可以在分析中明确指出这是基于高分段环境的建议。"
         )
-    
-    # 更新最后请求时间
-    ANALYZE_LIMIT_STORE[username] = now
 
-    # 1. API Key 检查
-    if not DEEPSEEK_API_KEY:
-         async def err(): yield json.dumps({"concise": {"title":"维护中", "content":"服务暂时不可用 (Configuration Error)"}})
-         return StreamingResponse(err(), media_type="application/json")
-    
-    # 模式别名处理
-    MODE_ALIASES = {
-        "jungle_farming": "role_jungle_farming",
-        # 未来你还可以加更多别名
+    # 2. 【进阶分段】翡翠、钻石 (Emerald & Diamond) —— 承上启下的分水岭
+    if bucket == "mid":
+        return (
+            f"**当前为进阶分段 ({rank})**：\n"
+            "- 你的推荐逻辑需要在 **个人强势度** 与 **团队适配性** 之间寻找平衡。\n"
+            "- **权重分配**：请保持 **60% 侧重对线克制**（保证自己不崩），**40% 侧重团队互补**（稍微照顾阵容）。\n"
+            "- **推荐原则**：\n"
+            "  1. 避免推荐纯粹为了凑阵容而导致的“坐牢”对线。\n"
+            "  2. 优先推荐那些“线上有声音，打团也能配合”的万金油英雄（如带控C位、重装战士）。\n"
+            "- 理由包装：强调“既能保证发育，又能补足团队短板”。"
+        )
+
+    # 3. 【普通分段】铂金及以下 (Platinum & Below)
+    # 核心是“对线克制”，但严禁 AI 说用户菜
+    return (
+        f"**当前对局环境策略**：\n"
+        "- 你的推荐逻辑必须优先保证 **对线克制 (Lane Counter)**。\n"
+        "- **严禁**推荐对线会被打爆的英雄，哪怕它跟阵容很搭。\n"
+        "- 核心思路是：只有对线活下来，才有资格谈打团。\n"
+        "⛔ **输出禁忌（严格执行）**：\n"
+        "- **绝对不要**在输出内容中提及“因为是低分段”、“鉴于段位较低”、“新手”等字眼。\n"
+        "- 请将推荐理由包装为“为了最大化对线压制力”或“最稳健的克制选择”。"
+    )
+
+async def _no_result(value=None):
+    return value
+
+async def assemble_system_prompt(target_mode, style_mode, user_role_key, my_hero, rag_enemy, rank, with_recap, mechanics: MechanicsSnapshot, timer: StageTimer = None):
+    """
+    拼装 /analyze 的 System Prompt (查询全部走异步数据层 adb)
+    入参相同则产出逐字节相同，既能进 prompt_cache，也能稳定命中 DeepSeek 前缀缓存
+    Tips / 修正 / 模板 (含 personal_lane 兜底模板) 并发查询，单步超时则降级
+    :return: dict(system_content, tips_text, tips_in_system, user_template, corrections, tips, size, degraded)
+             corrections / tips 为未经预算裁剪的原文，供即时模式使用
+    """
+    timer = timer or StageTimer()
+    top_tips = []
+    has_hero = bool(my_hero and my_hero != "None")
+
+    knowledge, corrections, tpl, fallback_tpl = await asyncio.gather(
+        timer.run("knowledge", adb.get_top_knowledge_for_ai(my_hero, rag_enemy), ANALYZE_STEP_TIMEOUT, {}) if has_hero else _no_result({}),
+        # 🔥 B. 获取修正数据 (传入 style_mode 流派模式)
+        timer.run("corrections", adb.get_corrections(my_hero, rag_enemy, user_role_key, style_mode), ANALYZE_STEP_TIMEOUT, []) if has_hero else _no_result([]),
+        timer.run("template", adb.get_prompt_template(target_mode), ANALYZE_STEP_TIMEOUT),
+        timer.run("template_fallback", adb.get_prompt_template("personal_lane"), ANALYZE_STEP_TIMEOUT) if target_mode != "personal_lane" else _no_result()
+    )
+
+    if has_hero:
+        if rag_enemy == "general":
+            top_tips = knowledge.get("general", [])
+        else:
+            top_tips = knowledge.get("matchup", []) + knowledge.get("general", [])
+
+    # 🔥 C. 处理修正数据格式 (Dict -> String)
+    correction_texts = []
+    if corrections:
+        for c in corrections:
+            # 兼容：如果是对象取 content，如果是字符串直接用
+            if isinstance(c, dict):
+                content = c.get("content")
+                if content: correction_texts.append(content)
+            elif isinstance(c, str):
+                correction_texts.append(c)
+
+    correction_lines = [f"- {t}" for t in correction_texts]
+
+    # 🛡️ 安全修改：使用 XML 标签隔离不可信内容
+    safe_tips = []
+    for t in top_tips:
+        # 简单过滤：移除可能导致注入的关键词
+        clean_t = t.replace("System:", "").replace("User:", "").replace("Instruction:", "")
+        safe_tips.append(f"<tip>{clean_t}</tip>")
+
+    # 🧠 BP 推荐策略：目前只有普通分段的指令会追加到 tips_text 中 (System Context 会自动包含它)
+    strategy_section = ""
+    if get_rank_bucket(rank) == "low":
+        strategy_section = f"\n\n=== 👑 决策核心指令 (Strategy Core) ===\n{build_strategy_instruction(rank)}"
+
+    # 1. 准备基础 Context 变量
+    full_s16_context = mechanics.context_for(user_role_key)
+
+    # 2. 确定 Recap 内容 (动态追加在末尾)
+    recap_section = JUNGLE_FARM_RECAP if with_recap else ""
+
+    # 3. 数据库中的模板 (Body)，缺失时回退 personal_lane
+    tpl = tpl or fallback_tpl
+    if not tpl:
+        raise HTTPException(status_code=503, detail="Prompt 模板加载失败，请稍后重试")
+    sys_tpl_body = tpl['system_template']
+
+    # ✂️ Token 预算：固定部分之外，先装修正 (按 priority)，再装社区 Tips (对位优先)
+    kept, _ = prompt_budget.fill(
+        target_mode,
+        (META_SYSTEM_PROMPT, sys_tpl_body, full_s16_context, strategy_section, recap_section),
+        [("corrections", correction_lines), ("tips", safe_tips)]
+    )
+    correction_prompt = "修正:\n" + "\n".join(kept["corrections"]) if kept["corrections"] else ""
+    if kept["tips"]:
+        tips_text = "<community_knowledge>\n" + "\n".join(kept["tips"]) + "\n</community_knowledge>"
+    else:
+        tips_text = "(暂无社区数据)"
+    tips_text += strategy_section
+
+    # 判断 User 端是否需要填充 Tips (如果 System 里没写 {tips_text}，则传给 User)
+    tips_in_system = "{tips_text}" in sys_tpl_body
+
+    # 4. 智能组装 System Content
+    # 结构：[Global Meta] + [DB Template (含 S16/Tips/Corrections)] + [Recap]
+    try:
+        # A. 格式化数据库模板部分
+        # 检查模板是否包含占位符，如果有则填充
+        if "{s16_context}" in sys_tpl_body:
+            formatted_body = sys_tpl_body.format(
+                s16_context=full_s16_context,
+                tips_text=tips_text if tips_in_system else "",
+                correction_prompt=correction_prompt
+            )
+        else:
+            # 兜底：如果模板里没写占位符，手动拼接
+            formatted_body = (
+                f"{sys_tpl_body}\n\n"
+                f"=== 🌍 S16 Context ===\n{full_s16_context}\n\n"
+                f"=== 📚 Community Tips ===\n{tips_text}\n\n"
+                f"{correction_prompt}"
+            )
+            tips_in_system = True
+
+        # B. 最终拼接 (三明治结构)
+        system_content = f"{META_SYSTEM_PROMPT}\n\n{formatted_body}\n\n{recap_section}"
+
+    except Exception as e:
+        print(f"⚠️ Prompt Formatting Warning: {e}")
+        # 降级方案
+        system_content = f"{META_SYSTEM_PROMPT}\n\n{sys_tpl_body}\n\nContext: {full_s16_context}\n\n{recap_section}"
+
+    # 5. JSON 强制约束兜底
+    if "Output JSON only" not in system_content:
+        system_content += "\n⚠️ IMPORTANT: You must return PURE JSON only."
+
+    return {
+        "system_content": system_content,
+        "tips_text": tips_text,
+        "tips_in_system": tips_in_system,
+        "user_template": tpl['user_template'],
+        "corrections": correction_texts,
+        "tips": top_tips,
+        "size": len(system_content.encode("utf-8")) + len(tips_text.encode("utf-8"))
+                + sum(len(t.encode("utf-8")) for t in correction_texts + top_tips),
+        "degraded": bool(timer.degraded)
     }
 
-    def normalize_mode(mode: str) -> str:
-        return MODE_ALIASES.get(mode, mode)
 
-    # 在 check_and_update_usage 之前
-    data.mode = normalize_mode(data.mode)
-    
-    # 2. 频控检查 (传入 model_type 进行分级计费)
-    allowed, msg, remaining = db.check_and_update_usage(current_user['username'], data.mode, data.model_type)
-    
-    # 🔥🔥🔥 [修复核心] Test 2 零余额保护：明确返回 403 状态码
-    if not allowed:
-        return JSONResponse(
-            status_code=403,
-            content={
-                "concise": {
-                    "title": "请求被拒绝", 
-                    "content": msg + ("\n💡 升级 Pro 可解锁无限次使用！" if remaining == -1 else "")
-                }
-            }
-        )
+# 模式别名处理
+MODE_ALIASES = {
+    "jungle_farming": "role_jungle_farming",
+    # 未来你还可以加更多别名
+}
+
+def normalize_mode(mode: str) -> str:
+    return MODE_ALIASES.get(mode, mode)
+
+# 影响上下文的请求字段 (model_type / output / 分帧参数只影响调用方式，不参与指纹)
+ANALYZE_CONTEXT_FIELDS = ("mode", "myHero", "enemyHero", "myTeam", "enemyTeam", "userRole", "rank", "mapSide",
+                          "myLaneAssignments", "enemyLaneAssignments", "extraMechanics")
 
+def analyze_context_key(data: AnalyzeRequest):
+    return AnalyzeResponseCache.fingerprint(**{f: getattr(data, f) for f in ANALYZE_CONTEXT_FIELDS})
+
+async def build_analyze_context(data: AnalyzeRequest, timer: StageTimer):
+    """
+    /analyze 上下文构建 (不含鉴权/扣费/上游调用)：名称修正 -> 阵容解析 -> 分路推断 -> 推荐 + RAG/修正/模板 -> User Prompt
+    会就地修正 data 里的英雄名；英雄无法识别时返回 {"error": 提示}
+    选人阶段的预计算 (/ws/bridge) 与 /analyze 现场构建共用这一份逻辑
+    """
     # 🟢 5. 输入自动纠错 (JarvanIV -> Jarvan IV)
     def fix_name(n):
         if not n: return ""
@@ -1823,22 +1981,22 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
     if data.enemyLaneAssignments:
         data.enemyLaneAssignments = {k: fix_name(v) for k, v in data.enemyLaneAssignments.items()}
 
+    # 🧩 整局英雄一次性批量解析 (后续所有环节只读这个上下文)
+    with timer.span("draft"):
+        draft = await DraftContext.from_request_async(adb, db, data)
+
     # 3. Input Sanitization (输入清洗 - 验证清洗后的名称)
     # 🔥 关键修改：如果是 "None"，跳过数据库校验
     if data.myHero and data.myHero != "None":
-        hero_info = db.get_champion_info(data.myHero)
+        hero_info = draft.get(data.myHero)
         if not hero_info:
-            async def attack_err(): yield json.dumps({"concise": {"title": "输入错误", "content": f"系统未识别英雄 '{data.myHero}'。"}})
-            return StreamingResponse(attack_err(), media_type="application/json")
+            return {"error": f"系统未识别英雄 '{data.myHero}'。"}
 
     if data.enemyHero and data.enemyHero != "None":
-        hero_info = db.get_champion_info(data.enemyHero)
+        hero_info = draft.get(data.enemyHero)
         if not hero_info:
-            async def attack_err(): yield json.dumps({"concise": {"title": "输入错误", "content": f"系统未识别英雄 '{data.enemyHero}'。"}})
-            return StreamingResponse(attack_err(), media_type="application/json")
+            return {"error": f"系统未识别英雄 '{data.enemyHero}'。"}
 
-    # 4. 数据准备 (修复版：正确读取 JSON 结构)
-    game_constants = await run_in_threadpool(db.get_game_constants)
     
     # =========================================================
     # 🛠️ 【关键位置调整】辅助函数定义提前到这里！ (解决 NameError)
@@ -1847,7 +2005,7 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
         """优先提取中文名 (Alias > Name)"""
         if not hero_id or hero_id == "Unknown" or hero_id == "None": return hero_id
         
-        info = CHAMPION_CACHE.get(hero_id) or db.get_champion_info(hero_id)
+        info = draft.get(hero_id)
         if not info: return hero_id
         
         # 1. 尝试从 alias 列表取第一个 (通常是中文名，如 "赏金猎人")
@@ -1863,9 +2021,7 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
 
     def get_champ_meta(name):
         """获取英雄战术标签 (应用中文名)"""
-        info = CHAMPION_CACHE.get(name) or db.get_champion_info(name)
-        if info: CHAMPION_CACHE[name] = info
-            
+        info = draft.get(name)
         if not info:
             return name, "常规英雄", "全期"
         
@@ -1884,8 +2040,8 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
         return c_name, c_type, c_power
 
     # 5. 分路计算
-    my_roles_map = infer_team_roles(data.myTeam, data.myLaneAssignments)
-    enemy_roles_map = infer_team_roles(data.enemyTeam, data.enemyLaneAssignments)
+    my_roles_map = infer_team_roles(data.myTeam, data.myLaneAssignments, resolve=draft.get)
+    enemy_roles_map = infer_team_roles(data.enemyTeam, data.enemyLaneAssignments, resolve=draft.get)
 
     # ---------------------------------------------------------
     # ⚡ 核心逻辑：智能身份推断 (User Role Logic)
@@ -1905,42 +2061,14 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
     # ⚡ 修正：如果用户没手动指定，且推断出的位置很奇怪（比如盲僧上单）
     # 我们查库看看这个英雄的"本命位置"是不是打野
     if not manual_role_set and data.myHero and data.myHero != "None":
-        hero_info_doc = db.get_champion_info(data.myHero)
+        hero_info_doc = draft.get(data.myHero)
         if hero_info_doc and hero_info_doc.get('role') == 'jungle':
             # 检查队友里有没有更像打野的人
-            teammate_roles = [db.get_champion_info(h).get('role') for h in data.myTeam if db.get_champion_info(h)]
+            teammate_roles = [draft.get(h).get('role') for h in data.myTeam if draft.get(h)]
             
             # 如果我是单人路，且队友里没人是主玩打野的，那大概率系统判错了，我才是打野
             if user_role_key in ["TOP", "MID"] and 'jungle' not in teammate_roles:
                 user_role_key = "JUNGLE"
-    # =========================================================
-    # 🔥 [新增/搬运] 机制库动态过滤 (必须放在 user_role_key 确定之后)
-    # =========================================================
-    modules = game_constants.get('data_modules', {})
-    mechanics_list = []
-
-    for cat_key, cat_val in modules.items():
-        if isinstance(cat_val, dict) and 'items' in cat_val:
-            
-            # 1. 屏蔽打野专属数据 (如果是线上玩家)
-            if cat_key == 'jungle_data' and user_role_key != 'JUNGLE':
-                continue
-            
-            # 2. 屏蔽打野高阶博弈
-            if cat_key == 'jungle_pro_logic' and user_role_key != 'JUNGLE':
-                continue
-
-            for item in cat_val['items']:
-                # 🔥🔥🔥 [新增核心逻辑] 分路任务精确过滤 🔥🔥🔥
-                # 如果 item 中定义了 role_key (例如 "TOP"), 且与当前 user_role_key 不一致，则跳过
-                target_role = item.get('role_key')
-                if target_role and target_role != user_role_key:
-                    continue
-
-                mechanics_list.append(f"{item.get('name')}: {item.get('rule')} ({item.get('note')})")
-
-    s16_details = "; ".join(mechanics_list)
-    s16_context = f"【S16/分路与机制库】: {s16_details if s16_details else '暂无特殊机制数据'}"
     # ---------------------------------------------------------
     # ⚡ 核心逻辑：智能生态构建 (Smart Context Logic)
     # ---------------------------------------------------------
@@ -2054,41 +2182,10 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
     if primary_enemy == "Unknown" and data.enemyHero and data.enemyHero != "None": 
         primary_enemy = data.enemyHero
 
-    # 6. ⚡⚡⚡ 触发推荐算法 (纯净版) ⚡⚡⚡
-    rank_type = "Diamond+" if data.rank in ["Diamond", "Master", "Challenger"] else "Platinum-"
-    
-    # 🔥 [修复] 调用正确的函数名 recommend_heroes_hybrid，并正确传参
-    # 注意：该函数返回两个值 (推荐列表, 阵容统计)，需要解包
-    try:
-        algo_recommendations, comp_stats = recommend_heroes_hybrid(
-            db_instance=db, 
-            user_role=user_role_key, 
-            rank_tier=rank_type, 
-            my_team=data.myTeam,       # 对应定义的 my_team
-            enemy_team=data.enemyTeam, # 对应定义的 enemy_team
-            enemy_laner=primary_enemy  # 对应定义的 enemy_laner
-        )
-    except Exception as e:
-        print(f"❌ 推荐算法错误: {e}")
-        algo_recommendations = []
-        comp_stats = {}
-    
-    rec_str = ""
-    for idx, rec in enumerate(algo_recommendations):
-        # ✅ 使用定义好的 get_hero_cn_name 翻译
-        rec_name_cn = get_hero_cn_name(rec['name'])
-        # 🔥 [修复] 新算法返回的是 'score' 而不是 'reason'，这里做适配
-        score_val = rec.get('score', 0)
-        rec_str += f"{idx+1}. {rec_name_cn} ({rec.get('tier', 'T?')}级) - 适配分: {score_val:.1f}\n"
-        
-    if not rec_str: rec_str = "(暂无数据)"
-
     # =========================================================================
     # 7. RAG 检索 & 模式修正 (核心修复区)
     # =========================================================================
-    top_tips = []
-    corrections = []
-    
+
     # 🔥 A. 定义模式 (Template vs Style)
     target_mode = data.mode
     style_mode = "default"
@@ -2113,6 +2210,7 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
         target_mode = "team"
         style_mode = "mode_team"
 
+    rag_enemy = None
     if data.myHero and data.myHero != "None":
         rag_enemy = primary_enemy
         if user_role_key == "JUNGLE":
@@ -2120,162 +2218,63 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
             if primary_enemy != real_enemy_jg:
                 rag_enemy = "general"
 
-        knowledge = await run_in_threadpool(db.get_top_knowledge_for_ai, data.myHero, rag_enemy)
-        if rag_enemy == "general":
-            top_tips = knowledge.get("general", [])
-        else:
-            top_tips = knowledge.get("matchup", []) + knowledge.get("general", [])
-        
-        # 🔥 B. 获取修正数据 (传入 style_mode)
-        # 注意：这里不再会被覆盖了！
-        corrections = await run_in_threadpool(
-            db.get_corrections, 
-            data.myHero, 
-            rag_enemy, 
-            user_role_key,
-            style_mode  # <--- 传入流派模式
-        )
-
-    # 🔥 C. 处理修正数据格式 (Dict -> String)
-    correction_texts = []
-    if corrections:
-        for c in corrections:
-            # 兼容：如果是对象取 content，如果是字符串直接用
-            if isinstance(c, dict):
-                content = c.get("content")
-                if content: correction_texts.append(content)
-            elif isinstance(c, str):
-                correction_texts.append(c)
-                
-    correction_prompt = "修正:\n" + "\n".join([f"- {t}" for t in correction_texts]) if correction_texts else ""
-
-    # 🛡️ 安全修改：使用 XML 标签隔离不可信内容
-    if top_tips:
-        safe_tips = []
-        for t in top_tips:
-            # 简单过滤：移除可能导致注入的关键词
-            clean_t = t.replace("System:", "").replace("User:", "").replace("Instruction:", "")
-            safe_tips.append(f"<tip>{clean_t}</tip>")
-        tips_text = "<community_knowledge>\n" + "\n".join(safe_tips) + "\n</community_knowledge>"
-    else:
-        tips_text = "(暂无社区数据)"
-   # =================================================
-    # 🧠 BP 推荐策略：三层分级 Prompt (High / Mid / Low)
-    # =================================================
-    rank_str = str(data.rank).lower()
-
-    # 1. 【顶尖分段】大师、宗师、王者 (Master+)
-    if any(r in rank_str for r in ["master", "grandmaster", "challenger"]):
-        strategy_instruction = (
-            f"**当前为高分段 ({data.rank})**：\n"
-            "- 你的推荐逻辑必须优先考虑 **全局阵容适配性 (Team Synergy)**。\n"
-            "- 如果某个英雄对线微劣但团战能产生巨大化学反应，可以推荐。\n"
-            "- 你可以在分析中明确指出这是基于高分段环境的建议。"
-        )
-
-    # 2. 【进阶分段】翡翠、钻石 (Emerald & Diamond) —— 承上启下的分水岭
-    elif any(r in rank_str for r in ["emerald", "diamond", "翡翠", "钻"]):
-        strategy_instruction = (
-            f"**当前为进阶分段 ({data.rank})**：\n"
-            "- 你的推荐逻辑需要在 **个人强势度** 与 **团队适配性** 之间寻找平衡。\n"
-            "- **权重分配**：请保持 **60% 侧重对线克制**（保证自己不崩），**40% 侧重团队互补**（稍微照顾阵容）。\n"
-            "- **推荐原则**：\n"
-            "  1. 避免推荐纯粹为了凑阵容而导致的“坐牢”对线。\n"
-            "  2. 优先推荐那些“线上有声音，打团也能配合”的万金油英雄（如带控C位、重装战士）。\n"
-            "- 理由包装：强调“既能保证发育，又能补足团队短板”。"
-        )
-
-    # 3. 【普通分段】铂金及以下 (Platinum & Below)
-    else:
-        # 核心是“对线克制”，但严禁 AI 说用户菜
-        strategy_instruction = (
-            f"**当前对局环境策略**：\n"
-            "- 你的推荐逻辑必须优先保证 **对线克制 (Lane Counter)**。\n"
-            "- **严禁**推荐对线会被打爆的英雄，哪怕它跟阵容很搭。\n"
-            "- 核心思路是：只有对线活下来，才有资格谈打团。\n"
-            "⛔ **输出禁忌（严格执行）**：\n"
-            "- **绝对不要**在输出内容中提及“因为是低分段”、“鉴于段位较低”、“新手”等字眼。\n"
-            "- 请将推荐理由包装为“为了最大化对线压制力”或“最稳健的克制选择”。"
-        )
-
-        # 将此指令追加到 tips_text 中 (System Context 会自动包含它)
-        tips_text = f"{tips_text}\n\n=== 👑 决策核心指令 (Strategy Core) ===\n{strategy_instruction}"
     # =========================================================================
     # 8. Prompt 构建 (🔥 终极缓存优化版：Global Prefix + Sandwich Structure)
     # =========================================================================
-    
-    # 1. 准备基础 Context 变量
-    full_s16_context = f"{s16_context}"
-
-    # 🔥 [Global Prefix] 全局元规则 (所有模式共享，确保 100% 缓存命中头部)
-    META_SYSTEM_PROMPT = """
-【元规则 (系统底层指令)】
-1. **身份定义**：你是 HexCoach 战术副官，服务于英雄联盟玩家。
-2. **输出协议**：
-   - 必须输出纯 JSON 格式。
-   - **严格遵守 System Prompt 中定义的 JSON 结构**（不要自作主张）。
-   - 语言仅限中文。
-3. **排版视觉规范 (强制执行)**：
-   - **JSON 字符串处理**：JSON 值中的换行必须使用 `\\n` 转义符，**严禁**使用真实的物理换行/回车，这会导致 JSON 解析失败。
-   - **视觉降噪**：严禁使用 `**` 加粗（星号），重点内容如，**英雄名**、**关键装备**、**时间点**，仅允许使用【】包裹。
-   - **拒绝堆砌**：不要把所有信息塞进一段，必须换行。
-"""
-
-    # 🔥 [Mode Specific] 野核专属校验 (仅野核模式追加)
-    JUNGLE_FARM_RECAP = """
-=== 🛑 最终校验 (FINAL CHECK) ===
-请确保你的 `dashboard.strategies.early` 中包含：
-1. **黄金路线**：(0:55) F6/三狼开局的具体路径。
-2. **5:30 决策点**：包含【三狼(2)+蛤蟆(2)】的刷新处理。
-3. **巢虫落地**：必须解释【先布阵】的具体操作。
-请基于上述规则生成最终 JSON。
-"""
-
-    # 2. 确定 Recap 内容 (动态追加在末尾)
-    recap_section = ""
-    # 兼容 new mode names
-    if data.mode in ["role_jungle_farming", "jungle_farming"]:
-        recap_section = JUNGLE_FARM_RECAP
+    # 同一 (模式/流派/分路/英雄/对位/段位档/野核校验) 的 System Prompt 逐字节一致，命中则跳过 RAG + 模板拼装
+    with_recap = data.mode in ["role_jungle_farming", "jungle_farming"]
+    mechanics = db.mechanics_snapshot  # 只取一次引用，本次请求全程使用同一版本
+    prompt_key = (mechanics.version, target_mode, style_mode, user_role_key, data.myHero, rag_enemy, get_rank_bucket(data.rank), with_recap)
 
-    # 3. 获取数据库中的模板 (Body)
-    tpl = db.get_prompt_template(target_mode) or db.get_prompt_template("personal_lane")
-    sys_tpl_body = tpl['system_template']
-    
-    # 判断 User 端是否需要填充 Tips (如果 System 里没写 {tips_text}，则传给 User)
-    tips_in_system = "{tips_text}" in sys_tpl_body
+    # 6. ⚡⚡⚡ 触发推荐算法 (纯净版) ⚡⚡⚡
+    # 推荐算法内部仍是同步游标，放进线程池；与 Prompt 组装 (RAG/修正/模板) 互不依赖，并发执行
+    # 该函数返回两个值 (推荐列表, 阵容统计)，超时/异常时降级为空推荐
+    recommend_step = timer.run(
+        "recommend",
+        run_in_threadpool(
+            recommend_heroes_hybrid,
+            db_instance=db, 
+            user_role=user_role_key, 
+            rank_tier=get_rank_bucket(data.rank), # 段位档 (low / mid / high)，决定对位克制分权重
+            my_team=data.myTeam,       # 对应定义的 my_team
+            enemy_team=data.enemyTeam, # 对应定义的 enemy_team
+            enemy_laner=primary_enemy  # 对应定义的 enemy_laner
+        ),
+        ANALYZE_RECOMMEND_TIMEOUT,
+        ([], {})
+    )
 
-    # 4. 智能组装 System Content
-    # 结构：[Global Meta] + [DB Template (含 S16/Tips/Corrections)] + [Recap]
-    try:
-        # A. 格式化数据库模板部分
-        # 检查模板是否包含占位符，如果有则填充
-        if "{s16_context}" in sys_tpl_body:
-            formatted_body = sys_tpl_body.format(
-                s16_context=full_s16_context, 
-                tips_text=tips_text if tips_in_system else "", 
-                correction_prompt=correction_prompt
-            )
-        else:
-            # 兜底：如果模板里没写占位符，手动拼接
-            formatted_body = (
-                f"{sys_tpl_body}\n\n"
-                f"=== 🌍 S16 Context ===\n{full_s16_context}\n\n"
-                f"=== 📚 Community Tips ===\n{tips_text}\n\n"
-                f"{correction_prompt}"
+    prompt_bundle = prompt_cache.get(prompt_key)
+    if prompt_bundle is None:
+        cache_generation = prompt_cache.generation
+        (algo_recommendations, comp_stats), prompt_bundle = await asyncio.gather(
+            recommend_step,
+            assemble_system_prompt(
+                target_mode, style_mode, user_role_key, data.myHero, rag_enemy, data.rank, with_recap, mechanics, timer
             )
-            tips_in_system = True 
+        )
+        # 降级产物 (缺 Tips/修正) 不进缓存，下一次请求重新查询
+        if not prompt_bundle["degraded"]:
+            prompt_cache.put(prompt_key, prompt_bundle, prompt_bundle["size"], tag=data.myHero, generation=cache_generation)
+    else:
+        algo_recommendations, comp_stats = await recommend_step
 
-        # B. 最终拼接 (三明治结构)
-        system_content = f"{META_SYSTEM_PROMPT}\n\n{formatted_body}\n\n{recap_section}"
+    rec_str = ""
+    for idx, rec in enumerate(algo_recommendations):
+        # ✅ 使用定义好的 get_hero_cn_name 翻译
+        rec_name_cn = get_hero_cn_name(rec['name'])
+        # 🔥 [修复] 新算法返回的是 'score' 而不是 'reason'，这里做适配
+        score_val = rec.get('score', 0)
+        counter_str = f" (对位 {rec['counter']:+.1f})" if 'counter' in rec else ""
+        rec_str += f"{idx+1}. {rec_name_cn} ({rec.get('tier', 'T?')}级) - 适配分: {score_val:.1f}{counter_str}\n"
+        
+    if not rec_str: rec_str = "(暂无数据)"
 
-    except Exception as e:
-        print(f"⚠️ Prompt Formatting Warning: {e}")
-        # 降级方案
-        system_content = f"{META_SYSTEM_PROMPT}\n\n{sys_tpl_body}\n\nContext: {full_s16_context}\n\n{recap_section}"
+    print(f"⏱️ [{timer.name}] {timer.summary()}")
 
-    # 5. JSON 强制约束兜底
-    if "Output JSON only" not in system_content:
-        system_content += "\n⚠️ IMPORTANT: You must return PURE JSON only."
+    system_content = prompt_bundle["system_content"]
+    tips_text = prompt_bundle["tips_text"]
+    tips_in_system = prompt_bundle["tips_in_system"]
     # ---------------------------------------------------------
     # ⚡ 关键步骤：中文翻译 (确保 AI 输出中文)
     # ---------------------------------------------------------
@@ -2319,7 +2318,7 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
     # 如果 System 没包含 (例如 personal_jungle 模板)，User 端必须传真实内容
     user_tips_content = "(已加载至 System Context)" if tips_in_system else tips_text
 
-    user_content = tpl['user_template'].format(
+    user_content = prompt_bundle["user_template"].format(
         mode=data.mode,
         user_rank=data.rank,        
         db_suggestions=rec_str,     
@@ -2341,6 +2340,137 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
         correction_prompt=""         # 修正内容通常在 System 中处理
     )
 
+    return {
+        "error": None,
+        "my_hero": data.myHero,
+        "draft": draft,
+        "mechanics": mechanics,
+        "target_mode": target_mode,
+        "style_mode": style_mode,
+        "user_role_key": user_role_key,
+        "primary_enemy": primary_enemy,
+        "my_roles_map": my_roles_map,
+        "enemy_roles_map": enemy_roles_map,
+        "system_content": system_content,
+        "user_content": user_content,
+        # ⚡ 即时模式所需的结构化数据
+        "my_hero_cn": my_hero_cn,
+        "enemy_hero_cn": enemy_hero_cn,
+        "recommendations": [dict(rec, name_cn=get_hero_cn_name(rec['name'])) for rec in algo_recommendations],
+        "corrections": prompt_bundle["corrections"],
+        "tips": prompt_bundle["tips"]
+    }
+
+
+# --- 4. AI 分析 (集成推荐算法) ---
+
+@app.post("/analyze")
+async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_current_user)): 
+    # 🟢 [防刷] 3秒冷却机制
+    username = current_user['username']
+    now = time.time()
+    last_request_time = ANALYZE_LIMIT_STORE.get(username, 0)
+    
+    # 如果距离上次请求不足 3 秒，直接拒绝
+    if now - last_request_time < 3:
+        # 这里用 JSONResponse 返回 429 也行，或者保持原样返回流式错误
+        # 为了统一体验，这里也建议改用 JSONResponse
+        return JSONResponse(
+            status_code=429,
+            content={
+                "concise": {
+                    "title": "操作太快了", 
+                    "content": "请等待 AI 思考完毕后再试 (冷却中...)"
+                }
+            }
+        )
+    
+    # 更新最后请求时间
+    ANALYZE_LIMIT_STORE[username] = now
+
+    instant = data.model_type == "instant"
+
+    # 1. API Key 检查 (即时模式不调用上游)
+    if not DEEPSEEK_API_KEY and not instant:
+         async def err(): yield json.dumps({"concise": {"title":"维护中", "content":"服务暂时不可用 (Configuration Error)"}})
+         return StreamingResponse(err(), media_type="application/json")
+    
+    # 在 check_and_update_usage 之前
+    data.mode = normalize_mode(data.mode)
+    
+    timer = StageTimer("Context")
+
+    # 🚦 上游排队预判 (在扣次数之前)：队列已满或预计等待过长时降级为即时分析，降级关闭时直接 429 让客户端稍后重试
+    upstream_model = "deepseek-reasoner" if data.model_type == "reasoner" else "deepseek-chat"
+    degraded = None
+    with timer.span("membership"):
+        priority = priority_for_role(await adb.check_membership_status(current_user['username']))
+    try:
+        if not instant: llm_governor.check(upstream_model, priority)
+    except GovernorRejected as e:
+        print(f"🚦 [Governor] {e} (预计 {e.estimate:.0f}s) - User: {current_user['username']}")
+        if instant_analyzer.fallback:
+            degraded = "saturated"
+        else:
+            return JSONResponse(
+                status_code=429,
+                headers={"Retry-After": str(e.retry_after)},
+                content={
+                    "concise": {
+                        "title": "排队人数过多",
+                        "content": f"当前 AI 排队人数较多，请 {e.retry_after} 秒后重试。" + ("\n💡 Pro 会员享有优先通道。" if priority else "")
+                    }
+                }
+            )
+
+    # 2. 频控检查 (传入 model_type 进行分级计费；降级为即时分析时只扣即时额度)
+    with timer.span("usage"):
+        allowed, msg, remaining = await adb.check_and_update_usage(current_user['username'], data.mode, "instant" if degraded else data.model_type)
+    
+    # 🔥🔥🔥 [修复核心] Test 2 零余额保护：明确返回 403 状态码
+    if not allowed:
+        return JSONResponse(
+            status_code=403,
+            content={
+                "concise": {
+                    "title": "请求被拒绝", 
+                    "content": msg + ("\n💡 升级 Pro 可解锁无限次使用！" if remaining == -1 else "")
+                }
+            }
+        )
+
+    # 🔮 选人阶段已经预计算过同一阵容 (/ws/bridge)：直接复用，跳过整段上下文构建
+    context_key = analyze_context_key(data)
+    ctx = await speculative_contexts.take(username, context_key)
+    if ctx is not None and not ctx["error"] and ctx["mechanics"] is not db.mechanics_snapshot:
+        ctx = None  # 预计算之后机制库已更新
+    if ctx is None:
+        ctx = await build_analyze_context(data, timer)
+    else:
+        print(f"🔮 [Speculative] 命中预计算上下文 {context_key[:12]} - User: {username}")
+    if ctx["error"]:
+        async def attack_err(): yield json.dumps({"concise": {"title": "输入错误", "content": ctx["error"]}})
+        return StreamingResponse(attack_err(), media_type="application/json")
+
+    data.myHero = ctx["my_hero"]
+
+    # ✅ 关键修改：添加防缓冲 Headers
+    stream_headers = {
+        "Cache-Control": "no-cache, no-transform",
+        "X-Accel-Buffering": "no", # 关键：告诉 Nginx 不要缓存 chunks
+        "Connection": "keep-alive"
+    }
+
+    # ⚡ 即时模式 / 排队已满降级：不请求上游，直接返回规则生成的结果
+    if instant or degraded:
+        print(f"⚡ [Instant] {'降级 (' + degraded + ')' if degraded else '即时分析'} - User: {username} ({timer.elapsed_ms():.0f}ms)")
+        return instant_stream_response(username, ctx, stream_headers, data.output, degraded)
+
+    draft, mechanics = ctx["draft"], ctx["mechanics"]
+    target_mode, style_mode, user_role_key = ctx["target_mode"], ctx["style_mode"], ctx["user_role_key"]
+    primary_enemy, my_roles_map, enemy_roles_map = ctx["primary_enemy"], ctx["my_roles_map"], ctx["enemy_roles_map"]
+    system_content, user_content = ctx["system_content"], ctx["user_content"]
+
     # 9. AI 调用
     if data.model_type == "reasoner":
         MODEL_NAME = "deepseek-reasoner"
@@ -2348,47 +2478,70 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
     else:
         MODEL_NAME = "deepseek-chat"
         print(f"🚀 [AI] 基础算力 Request (V3) - User: {current_user['username']}")
+    print(f"🧩 [Draft] {draft.summary()} | 机制库 v{mechanics.version}")
+
+    # ♻️ 结果缓存：归一化后的阵容指纹 (System Prompt 摘要兜住 Tips/修正/机制库的变化)
+    response_key = analyze_cache.fingerprint(
+        model=MODEL_NAME,
+        mode=data.mode,
+        target_mode=target_mode,
+        style_mode=style_mode,
+        role=user_role_key,
+        my_hero=data.myHero,
+        enemy=primary_enemy,
+        rank_bucket=get_rank_bucket(data.rank),
+        map_side=data.mapSide,
+        my_roles=my_roles_map,
+        enemy_roles=enemy_roles_map,
+        prompt=hashlib.sha256(system_content.encode("utf-8")).hexdigest()
+    )
+    cached_chunks = analyze_cache.get(response_key)
+    if cached_chunks is not None:
+        print(f"♻️ [AnalyzeCache] 命中 {response_key[:12]} - 重放 {len(cached_chunks)} 个分片")
+        session = resumable_streams.open(username, analyze_cache.replay(cached_chunks))
+        return analyze_stream_response(session, stream_headers, data.output)
+
+    stream_state = {"ok": True}
+    # 📈 延迟探针：上下文耗时 -> 排队 -> 建连 -> 首 token -> 结束 (汇总见 /admin/metrics/analyze)
+    probe = stream_metrics.start(MODEL_NAME, context_ms=timer.elapsed_ms(), max_tokens=ANALYZE_MAX_TOKENS)
+
+    upstream_params = dict(
+        model=MODEL_NAME,
+        messages=[
+            {"role": "system", "content": system_content}, 
+            {"role": "user", "content": user_content}
+        ],
+        temperature=0.6, 
+        max_tokens=ANALYZE_MAX_TOKENS,
+        stream_options={"include_usage": True} # 最后一个分片带 usage (含 prompt_cache_hit_tokens)
+    )
+
+    def hedge_fallback():
+        fallback_probe = stream_metrics.start(llm_hedge.fallback_model, context_ms=timer.elapsed_ms(), max_tokens=ANALYZE_MAX_TOKENS)
+        return stream_chat(client, fallback_probe, **dict(upstream_params, model=llm_hedge.fallback_model)), fallback_probe
 
     async def event_stream():
+        completed = False
+        produced = False
+        upstream = stream_chat(client, probe, **upstream_params)
+        if llm_hedge.applies(MODEL_NAME):
+            # 对冲胜负写入 stream_state (winner / hedged)
+            upstream = llm_hedge.stream(upstream, probe, hedge_fallback, outcome=stream_state)
         try:
-            stream = await client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": system_content}, 
-                    {"role": "user", "content": user_content}
-                ],
-                stream=True, 
-                temperature=0.6, 
-                max_tokens=4000
-            )
-            
-            is_thinking = False
-            
-            async for chunk in stream:
-                if chunk.choices:
-                    delta = chunk.choices[0].delta
-                    
-                    # 1. 处理思考过程 (DeepSeek R1 特有)
-                    reasoning = getattr(delta, 'reasoning_content', None)
-                    if reasoning:
-                        if not is_thinking:
-                            yield "<think>" # 💡 思考开始标记
-                            is_thinking = True
-                        yield reasoning
-                    
-                    # 2. 处理正式回复 (content)
-                    elif delta.content:
-                        if is_thinking:
-                            yield "</think>" # 💡 思考结束标记
-                            is_thinking = False
-                        yield delta.content
-                        
-            # 🛡️ 兜底：防止流结束时思考标签没闭合
-            if is_thinking:
-                yield "</think>"
+            async for piece in upstream:
+                produced = True
+                yield piece
+            completed = True
                 
         except Exception as e:
             print(f"❌ AI Stream Error: {e}")
+            stream_state["ok"] = False
+            probe.fail()
+            completed = True
+            if not produced and instant_analyzer.fallback:
+                # ⚡ 上游还没输出任何内容就失败：降级为即时分析 (不写入结果缓存)
+                yield instant_analyzer.build(ctx, "upstream_error")
+                return
             # 返回 JSON 格式错误以便前端解析
             yield json.dumps({
                 "concise": {
@@ -2396,24 +2549,99 @@ async def analyze_match(data: AnalyzeRequest, current_user: dict = Depends(get_c
                     "content": "AI 服务响应中断，请重试。"
                 }
             })
-
-    # ✅ 关键修改：添加防缓冲 Headers
-    return StreamingResponse(
-        event_stream(),
-        media_type="text/plain; charset=utf-8",
-        headers={
-            "Cache-Control": "no-cache, no-transform",
-            "X-Accel-Buffering": "no", # 关键：告诉 Nginx 不要缓存 chunks
-            "Connection": "keep-alive"
-        }
+        finally:
+            # 客户端断开时 (GeneratorExit) 也要立即关闭上游响应，而不是等垃圾回收
+            await upstream.aclose()
+            probe.finish(cancelled=not completed)
+
+    flight_key = analyze_flights.make_key(MODEL_NAME, system_content, user_content)
+    framed = stream_framer.frame(
+        analyze_flights.subscribe(
+            flight_key,
+            lambda: llm_governor.guard(
+                MODEL_NAME, priority,
+                analyze_cache.record(
+                    response_key, event_stream(),
+                    # 对冲由备用模型胜出的结果不写入缓存 (不是用户所选模型的输出)
+                    succeeded=lambda: stream_state["ok"] and stream_state.get("winner") != "fallback"
+                )
+            )
+        ),
+        data.frame_ms, data.frame_bytes
     )
+    # 输出由续传会话录制，客户端断开后生成继续；events 模式的解析放在分帧之后 (每帧解析一次)
+    session = resumable_streams.open(username, framed)
+    return analyze_stream_response(session, stream_headers, data.output)
+
+# 🔁 断线续传：offset = 已收到的 UTF-8 字节数 (events 模式只能从 0 整体重放，解析器无法从中途接上)
+@app.get("/analyze/resume/{request_id}")
+async def resume_analyze(request_id: str, offset: int = 0, output: str = "text", current_user: dict = Depends(get_current_user)):
+    session = resumable_streams.get(request_id, owner=current_user['username'])
+    if session is None:
+        raise HTTPException(status_code=404, detail="分析记录不存在或已过期，请重新分析")
+    if output == "events" and offset:
+        raise HTTPException(status_code=400, detail="events 模式只支持从 offset=0 重放")
+    if offset < 0 or offset > session.end:
+        raise HTTPException(status_code=400, detail=f"offset 超出范围 (已生成 {session.end} 字节)")
+    try:
+        session.index_of(offset)
+    except ResumeGap as e:
+        raise HTTPException(status_code=410, detail=f"续传位置已过期 (最早可从 {e.base} 字节续传)，请重新分析")
+    print(f"🔁 [Resume] {current_user['username']} 续传 {request_id[:8]} @ {offset}/{session.end}{'' if session.done else ' (生成中)'}")
+    return analyze_stream_response(session, {
+        "Cache-Control": "no-cache, no-transform",
+        "X-Accel-Buffering": "no",
+        "Connection": "keep-alive"
+    }, output, offset)
+
+async def bridge_user(token):
+    """/ws/bridge 鉴权 (与 HTTP 接口同一套 JWT)"""
+    if not token: return None
+    try:
+        return await get_current_user(token)
+    except HTTPException:
+        return None
+
 @app.websocket("/ws/bridge")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
+    # 🔮 客户端 (HexLite) 可选推送选人快照：?token=JWT 或先发 {"type": "auth", "token": ...}
+    #    {"type": "champ_select", "draft": {AnalyzeRequest 字段}} -> 后台预计算 /analyze 上下文
+    #    {"type": "game_start"} / {"type": "champ_select_end"} -> 清除预计算结果
+    user = await bridge_user(websocket.query_params.get("token"))
     try:
         while True:
-            # 保持连接，接收心跳或指令 (目前只需保持连接即可)
-            await websocket.receive_text()
+            # 其余文本 (心跳等) 照旧忽略
+            raw = await websocket.receive_text()
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                continue
+            if not isinstance(msg, dict): continue
+            kind = msg.get("type")
+
+            if kind == "auth":
+                user = await bridge_user(msg.get("token"))
+                await websocket.send_json({"type": "auth_ack", "ok": user is not None})
+            elif kind == "champ_select":
+                if user is None:
+                    await websocket.send_json({"type": "error", "detail": "未登录，无法预计算"})
+                    continue
+                try:
+                    draft_req = AnalyzeRequest(**(msg.get("draft") or {}))
+                except Exception as e:
+                    await websocket.send_json({"type": "error", "detail": f"阵容格式错误: {e}"})
+                    continue
+                draft_req.mode = normalize_mode(draft_req.mode)
+                key = analyze_context_key(draft_req)
+                scheduled = speculative_contexts.submit(
+                    user['username'], key,
+                    lambda req=draft_req: build_analyze_context(req, StageTimer("Speculative"))
+                )
+                await websocket.send_json({"type": "champ_select_ack", "scheduled": scheduled, "key": key[:12]})
+            elif kind in ("game_start", "champ_select_end"):
+                if user is not None:
+                    speculative_contexts.evict(user['username'], reason=kind)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
@@ -2438,6 +2666,43 @@ def get_admin_stats_endpoint(current_user: dict = Depends(get_current_user)):
     
     return stats
 
+# 🗂️ 内存索引/缓存命中统计 (调优用)
+@app.get("/admin/cache/stats")
+def get_cache_stats_endpoint(current_user: dict = Depends(get_current_user)):
+    if current_user.get("role") not in ["admin", "root"]:
+        raise HTTPException(status_code=403, detail="权限不足")
+    return {
+        "champion_index": db.champion_resolver.stats(),
+        "champion_snapshot": db.champion_snapshot.stats(),
+        "scoring_engine": db.scoring_engine.stats(),
+        "role_inference": db.role_inference.stats(),
+        "matchup_matrix": db.matchup_matrix.stats() if db.matchup_matrix is not None else None,
+        "shortlist_table": db.shortlist_table.stats() if db.shortlist_table is not None else None,
+        "draft_context": DraftContext.stats(),
+        "prompt_cache": prompt_cache.stats(),
+        "mechanics": db.mechanics_snapshot.stats(),
+        "analyze_cache": analyze_cache.stats(),
+        "single_flight": analyze_flights.stats()
+    }
+
+# 📈 /analyze 流式延迟分布 (按模型：上下文/排队/建连/首 token/总耗时/吞吐/上游 Prompt 缓存命中) + 准入队列深度/等待
+@app.get("/admin/metrics/analyze")
+def get_analyze_metrics_endpoint(reset: bool = False, current_user: dict = Depends(get_current_user)):
+    if current_user.get("role") not in ["admin", "root"]:
+        raise HTTPException(status_code=403, detail="权限不足")
+    snapshot = stream_metrics.snapshot()
+    snapshot["governor"] = llm_governor.stats()
+    snapshot["hedge"] = llm_hedge.stats()
+    snapshot["transport"] = llm_transport.stats()
+    snapshot["prompt_budget"] = prompt_budget.stats()
+    snapshot["framing"] = stream_framer.stats.snapshot()
+    snapshot["resume"] = resumable_streams.stats()
+    snapshot["speculative"] = speculative_contexts.stats()
+    snapshot["instant"] = instant_analyzer.stats()
+    if reset and current_user.get("role") == "root":
+        stream_metrics.reset()
+    return snapshot
+
 # 2. 🔥 [修改] 销售报表 (仅限 Root)
 @app.get("/admin/sales/summary")
 def get_admin_sales_summary_endpoint(current_user: dict = Depends(get_current_user)):
@@ -2571,6 +2836,22 @@ async def hot_update_config(
         if seed_data:
             seed_data()
             print("🔄 [HotUpdate] 数据库已同步")
+
+        # C. seed 会重写 champions 集合，英雄索引随之整体重建 (原子替换)
+        # 英雄索引 / 矩阵 / 入围表重建放到线程池：期间 /analyze 流和心跳照常，构建完成后原子替换
+        await run_in_threadpool(db.reload_champion_index, current_dir / "secure_data" / "champions.json")
+        await run_in_threadpool(db.reload_matchup_matrix, MATCHUP_MATRIX_PATH)
+        await run_in_threadpool(db.reload_shortlist_table, SHORTLIST_TABLE_PATH, SHORTLIST_WORKERS)
+
+        # D. 机制库快照整体重建 (原子替换)
+        if file_type == "mechanics":
+            db.reload_mechanics_snapshot()
+
+        # E. 模板 / 机制库 / 修正数据都可能变化，System Prompt 缓存整体失效
+        prompt_cache.invalidate(reason=f"hot update: {file_type}")
+        analyze_cache.invalidate(reason=f"hot update: {file_type}")
+        # F. 选人阶段预计算的上下文里带着旧 Prompt / 推荐 / 修正，同样作废
+        speculative_contexts.clear(reason=f"hot update: {file_type}")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"数据同步失败: {str(e)}")
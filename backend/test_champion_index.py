@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.champion_index import ChampionResolver
+
+# ================= 配置区域 =================
+JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "secure_data", "champions.json")
+
+# 模拟 seed_data 写入后的 champions 集合文档 (name 为中文显示名，id 为英文)
+MOCK_DB_DOCS = [
+    {"_id": "Lee Sin", "id": "Lee Sin", "key": "Lee Sin", "name": "盲僧", "title": "盲僧",
+     "alias": ["盲僧", "李青", "Lee Sin"], "role": "jungle", "tags": ["Fighter"]},
+    {"_id": "Jarvan IV", "id": "Jarvan IV", "key": "Jarvan IV", "name": "德玛西亚皇子", "title": "德玛西亚皇子",
+     "alias": ["德玛西亚皇子", "皇子", "Jarvan IV"], "role": "jungle", "tags": ["Tank"]},
+]
+
+
+def build_resolver():
+    with open(JSON_PATH, "r", encoding="utf-8") as f:
+        json_items = json.load(f)
+    resolver = ChampionResolver()
+    resolver.build(MOCK_DB_DOCS, json_items)
+    return resolver
+
+# ================= 测试用例集 =================
+
+def test_resolve_db_record_variants():
+    """英文 id / 驼峰 / 去空格 / 中文别名 都指向同一条 DB 记录"""
+    resolver = build_resolver()
+    for q in ["Lee Sin", "LeeSin", "leesin", "LEE SIN", "盲僧", "李青"]:
+        assert resolver.resolve(q) is MOCK_DB_DOCS[0], q
+    for q in ["JarvanIV", "Jarvan IV", "皇子"]:
+        assert resolver.resolve(q) is MOCK_DB_DOCS[1], q
+
+
+def test_json_only_heroes_get_synthesized_record():
+    """DB 未收录的英雄由 champions.json 合成兜底记录"""
+    resolver = build_resolver()
+    info = resolver.resolve("Malphite")
+    assert info is not None
+    assert info["id"] == "Malphite"
+    assert info["role"] == "top"
+    assert resolver.resolve("石头人") is info
+
+
+def test_miss_and_stats():
+    resolver = build_resolver()
+    assert resolver.resolve("未知英雄") is None
+    assert resolver.resolve("") is None
+    resolver.resolve("Ahri")
+    stats = resolver.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["version"] == 1
+
+
+def test_rebuild_swaps_index():
+    """重建后旧记录不再可见，版本号递增"""
+    resolver = build_resolver()
+    resolver.build([MOCK_DB_DOCS[1]], [])
+    assert resolver.resolve("Lee Sin") is None
+    assert resolver.resolve("皇子") is MOCK_DB_DOCS[1]
+    assert resolver.version == 2
+
+
+if __name__ == "__main__":
+    test_resolve_db_record_variants()
+    test_json_only_heroes_get_synthesized_record()
+    test_miss_and_stats()
+    test_rebuild_swaps_index()
+    print("✅ 英雄索引测试全部通过")
@@ -0,0 +1,70 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.champion_snapshot import ChampionSnapshot
+from core.scoring_engine import ScoringEngine, analyze_composition_tags, recommend_heroes_legacy
+
+# seed_data 的写法：name 为中文名，id 为英文 id
+DOCS = [
+    {"id": "Malphite", "name": "熔岩巨兽", "alias": ["石头人"], "role": "top", "tags": ["Tank", "Engage"], "win_rate": "53.28%", "tier": "T1"},
+    {"id": "LeeSin", "name": "盲僧", "alias": ["瞎子"], "role": "jungle", "tags": ["Fighter"], "win_rate": "49.00%"},
+    {"id": "Ahri", "name": "九尾妖狐", "alias": ["狐狸"], "role": "mid", "tags": ["Mage"], "win_rate": "51.00%", "tier": "T2"},
+    {"id": "Jinx", "name": "暴走萝莉", "alias": ["金克丝"], "role": "bot", "tags": ["Marksman"]},
+    {"id": "Vex", "name": "愁云使者", "alias": ["薇古丝"], "role": ["mid", "support"], "tags": ["Mage"]}
+]
+
+
+class ExplodingCollection:
+    """推荐阶段一旦查库就失败"""
+
+    def find(self, *args, **kwargs):
+        raise AssertionError("推荐阶段不应访问数据库")
+
+    find_one = find
+
+
+class SnapshotDB:
+    def __init__(self, docs):
+        self.champions_col = ExplodingCollection()
+        self.champion_snapshot = ChampionSnapshot(docs)
+        self.scoring_engine = ScoringEngine()
+        self.scoring_engine.build(self.champion_snapshot)
+
+# ================= 测试用例集 =================
+
+def test_lookup_by_id_alias_and_camel_case():
+    snap = ChampionSnapshot(DOCS)
+    assert snap.get("LeeSin")["name"] == snap.get("Lee Sin")["name"] == snap.get("瞎子")["name"] == "盲僧"
+    assert snap.get("Unknown") is None and snap.get("None") is None and snap.get("") is None
+    assert [d["id"] for d in snap.candidates("mid")] == ["Ahri", "Vex"]
+    assert [d["id"] for d in snap.candidates("support")] == ["Vex"]
+
+
+def test_composition_flags_resolve_english_ids():
+    snap = ChampionSnapshot(DOCS)
+    team = ["Malphite", "LeeSin", "Ahri", "Jinx", "Unknown"]
+    assert snap.composition(team) == {"ap_count": 1, "ad_count": 3, "tank_count": 2, "engagers": 1}
+
+
+def test_recommend_stage_does_no_database_io():
+    db = SnapshotDB(DOCS)
+    team = ["Malphite", "LeeSin", "Jinx"]
+    assert analyze_composition_tags(team, db) == db.scoring_engine.composition(team)
+    for role in ["top", "jungle", "mid", "support", "bot"]:
+        assert recommend_heroes_legacy(db, role, team) == db.scoring_engine.recommend(role, team)
+
+
+def test_version_tracks_content_and_rebuild_sequence():
+    a, b = ChampionSnapshot(DOCS, seq=1), ChampionSnapshot(DOCS, seq=2)
+    assert a.digest == b.digest and a.version != b.version
+    assert ChampionSnapshot(DOCS[:-1], seq=2).digest != b.digest
+    assert not ChampionSnapshot().ready and ChampionSnapshot().composition(["Ahri"])["ap_count"] == 0
+
+
+if __name__ == "__main__":
+    test_lookup_by_id_alias_and_camel_case()
+    test_composition_flags_resolve_english_ids()
+    test_recommend_stage_does_no_database_io()
+    test_version_tracks_content_and_rebuild_sequence()
+    print("✅ 英雄快照测试全部通过")
@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.instant_analysis import InstantAnalyzer
+from core.mechanics_snapshot import MechanicsSnapshot
+
+MECHANICS = MechanicsSnapshot({"data_modules": {
+    "lane": {"items": [
+        {"name": "河蟹", "rule": "3:30 刷新", "note": "中野争夺"},
+        {"name": "上路先锋", "rule": "14:00 消失", "role_key": "TOP"}
+    ]},
+    "jungle_data": {"items": [{"name": "F6", "rule": "1:30 刷新"}]}
+}})
+
+
+def make_ctx(**overrides):
+    ctx = {
+        "target_mode": "personal_lane",
+        "user_role_key": "MID",
+        "my_hero_cn": "阿狸",
+        "enemy_hero_cn": "辛德拉",
+        "corrections": ["6 级前不要硬换", "注意 E 技能的交互"],
+        "tips": ["一级学 Q 推线"],
+        "recommendations": [{"name": "Ahri", "name_cn": "阿狸", "tier": "T1", "score": 87.5}],
+        "mechanics": MECHANICS
+    }
+    ctx.update(overrides)
+    return ctx
+
+# ================= 测试用例集 =================
+
+def test_instant_output_matches_ai_json_shape():
+    analyzer = InstantAnalyzer(fallback=True)
+    doc = json.loads(analyzer.build(make_ctx()))
+    assert doc["concise"]["title"] == "⚡ 阿狸 vs 辛德拉 即时要点"
+    assert "【📌 关键修正】6 级前不要硬换" in doc["concise"]["content"]
+    titles = [tab["title"] for tab in doc["detailed_tabs"]]
+    assert titles == ["📌 对位修正", "📚 社区锦囊", "🌍 分路机制 (中单)", "🧮 算法推荐"]
+    mechanics_tab = doc["detailed_tabs"][2]["content"]
+    assert "河蟹" in mechanics_tab and "先锋" not in mechanics_tab and "F6" not in mechanics_tab  # 分路过滤与 Prompt 一致
+    assert doc["detailed_tabs"][3]["content"] == "1. 阿狸 (T1级) - 适配分: 87.5"
+
+
+def test_summary_lines_are_brief():
+    analyzer = InstantAnalyzer(fallback=True)
+    long_rule = "\n【证据强度校准】\n" + "细则" * 100
+    content = json.loads(analyzer.build(make_ctx(corrections=[long_rule])))["concise"]["content"]
+    assert "【📌 关键修正】【证据强度校准】\n" in content
+    assert "细则" not in content.split("【🧮")[0].split("【📚")[0]
+
+
+def test_bp_mode_leads_with_recommendations_and_skips_empty_tabs():
+    analyzer = InstantAnalyzer(fallback=True)
+    doc = json.loads(analyzer.build(make_ctx(target_mode="bp", corrections=[], tips=[], user_role_key="TOP")))
+    assert doc["concise"]["title"] == "⚡ BP 即时推荐 (上单)"
+    assert [tab["title"] for tab in doc["detailed_tabs"]] == ["🧮 算法推荐", "🌍 分路机制 (上单)"]
+
+
+def test_degraded_reason_is_reported_and_counted():
+    analyzer = InstantAnalyzer(fallback=True)
+    doc = json.loads(analyzer.build(make_ctx(enemy_hero_cn="未知"), reason="saturated"))
+    assert doc["concise"]["title"] == "⚡ 阿狸 即时要点"
+    assert "AI 排队人数过多" in doc["concise"]["content"]
+    stats = analyzer.stats()
+    assert stats["requests"] == 1 and stats["degraded"] == {"saturated": 1, "upstream_error": 0}
+
+
+def test_build_is_well_under_latency_budget():
+    analyzer = InstantAnalyzer(fallback=True)
+    ctx = make_ctx(corrections=["修正"] * 50, tips=["锦囊"] * 50)
+    start = time.perf_counter()
+    for _ in range(100):
+        analyzer.build(ctx)
+    assert (time.perf_counter() - start) / 100 * 1000 < 5
+    assert analyzer.stats()["build_ms"]["count"] == 100
+
+
+if __name__ == "__main__":
+    test_instant_output_matches_ai_json_shape()
+    test_summary_lines_are_brief()
+    test_bp_mode_leads_with_recommendations_and_skips_empty_tabs()
+    test_degraded_reason_is_reported_and_counted()
+    test_build_is_well_under_latency_budget()
+    print("✅ 即时分析测试全部通过")
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.json_events import IncrementalJsonParser, analyze_events
+
+
+def parse_in_pieces(text, size):
+    parser = IncrementalJsonParser()
+    events = []
+    for i in range(0, len(text), size):
+        events += parser.feed(text[i:i + size])
+    events += parser.finish()
+    return parser, events
+
+
+async def source(items):
+    for item in items:
+        yield item
+
+
+def collect_sse(items):
+    async def run():
+        return "".join([frame async for frame in analyze_events(source(items))])
+    events = []
+    for block in asyncio.run(run()).strip().split("\n\n"):
+        name, data = block.split("\n", 1)
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+# ================= 测试用例集 =================
+
+def test_streams_deltas_and_sections_for_valid_json():
+    doc = {"concise": {"title": "对线", "content": "压制\n换血"}, "dashboard": {"strategies": {"early": "控线"}}, "tips": ["a", "b"], "score": 7}
+    text = json.dumps(doc, ensure_ascii=False)
+    for size in (1, 3, len(text)):
+        parser, events = parse_in_pieces(text, size)
+        assert parser.value == doc and parser.repairs == []
+        deltas = "".join(e[1]["text"] for e in events if e[0] == "field.delta" and e[1]["path"] == "concise.content")
+        assert deltas == "压制\n换血"
+    paths = [e[1]["path"] for e in events if e[0] == "section.done"]
+    assert paths == ["concise", "dashboard.strategies", "dashboard", "tips", ""]
+    assert ("field.value", {"path": "score", "value": 7}) in events
+    assert any(e[1]["path"] == "tips[1]" for e in events if e[0] == "field.delta")
+
+
+def test_repairs_common_model_mistakes():
+    text = '好的，以下是分析：\n```json\n{"a": "第一行\n第二行", "b": [1, 2,], "c": True "d": "x\\q"}\n```'
+    parser, _ = parse_in_pieces(text, 4)
+    assert parser.value == {"a": "第一行\n第二行", "b": [1, 2], "c": True, "d": "xq"}
+    for repair in ("leading_text", "raw_control_char", "trailing_comma", "python_literal", "missing_comma", "bad_escape"):
+        assert repair in parser.repairs
+    assert "trailing_text" not in parser.repairs  # 结尾的 ``` 围栏不算多余内容
+
+
+def test_truncated_output_is_closed():
+    parser, events = parse_in_pieces('{"concise": {"title": "对线", "content": "先手压', 5)
+    assert parser.value == {"concise": {"title": "对线", "content": "先手压"}}
+    assert "truncated" in parser.repairs
+    assert [e[1]["path"] for e in events if e[0] == "section.done"] == ["concise", ""]
+
+
+def test_sse_splits_think_and_queue_markers_inside_chunks():
+    items = ['<queue>{"position": 2, "eta": 3}</queue><thi', 'nk>推理', '中</think>{"a"', ': "b"}']
+    events = collect_sse(items)
+    assert events[0] == ("queue", {"position": 2, "eta": 3})
+    assert "".join(d["text"] for name, d in events if name == "think.delta") == "推理中"
+    assert events[-1] == ("done", {"value": {"a": "b"}, "repairs": [], "raw": None})
+
+
+def test_sse_done_carries_raw_text_when_no_json():
+    events = collect_sse(["抱歉，无法分析"])
+    assert events[-1][0] == "done"
+    assert events[-1][1]["value"] is None and events[-1][1]["raw"] == "抱歉，无法分析"
+
+
+def test_surrogate_pair_escapes_split_across_chunks():
+    for size in (1, 4, 9):
+        parser, _ = parse_in_pieces('{"a": "\\ud83d\\ude00好"}', size)
+        assert parser.value == {"a": "\U0001F600好"} and parser.repairs == []
+        # 落单的代理项 -> U+FFFD
+        parser, _ = parse_in_pieces('{"b": "x\\ud83dy\\ude00"}', size)
+        assert parser.value == {"b": "x\ufffdy\ufffd"} and "bad_escape" in parser.repairs
+
+    async def run():
+        return "".join([frame async for frame in analyze_events(source(['{"a": "\\ud8', '3d\\', 'ude00"}']))])
+    raw = asyncio.run(run())
+    raw.encode("utf-8")
+    assert json.loads(raw.strip().split("\n\n")[-1].split("data: ", 1)[1])["value"] == {"a": "\U0001F600"}
+
+
+if __name__ == "__main__":
+    test_streams_deltas_and_sections_for_valid_json()
+    test_repairs_common_model_mistakes()
+    test_truncated_output_is_closed()
+    test_sse_splits_think_and_queue_markers_inside_chunks()
+    test_sse_done_carries_raw_text_when_no_json()
+    test_surrogate_pair_escapes_split_across_chunks()
+    print("✅ JSON 事件流测试全部通过")
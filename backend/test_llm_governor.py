@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.llm_governor import LLMGovernor, GovernorRejected, PRIORITY_PRO, PRIORITY_DEFAULT, priority_for_role
+
+
+async def upstream(tag, log, gate=None):
+    log.append(f"start:{tag}")
+    if gate: await gate.wait()
+    yield tag
+
+
+async def consume(stream):
+    markers, chunks = [], []
+    async for chunk in stream:
+        if chunk.startswith("<queue>"):
+            markers.append(json.loads(chunk[len("<queue>"):-len("</queue>")]))
+        else:
+            chunks.append(chunk)
+    return markers, chunks
+
+# ================= 测试用例集 =================
+
+def test_pro_requests_jump_the_queue():
+    async def scenario():
+        gov = LLMGovernor(limits={"deepseek-chat": 1}, max_queue=10, max_wait=600, heartbeat=5)
+        log, gate = [], asyncio.Event()
+        first = asyncio.create_task(consume(gov.guard("deepseek-chat", PRIORITY_DEFAULT, upstream("first", log, gate))))
+        await asyncio.sleep(0.01)
+        free = asyncio.create_task(consume(gov.guard("deepseek-chat", PRIORITY_DEFAULT, upstream("free", log))))
+        await asyncio.sleep(0.01)
+        pro = asyncio.create_task(consume(gov.guard("deepseek-chat", PRIORITY_PRO, upstream("pro", log))))
+        await asyncio.sleep(0.01)
+        stats = gov.stats()["lanes"]["deepseek-chat"]
+        gate.set()
+        results = await asyncio.gather(first, free, pro)
+        return log, results, stats, gov.stats()["lanes"]["deepseek-chat"]
+
+    log, (first, free, pro), busy, idle = asyncio.run(scenario())
+    assert log == ["start:first", "start:pro", "start:free"]
+    assert first == ([], ["first"])
+    assert free[0][0]["position"] == 1 and free[1] == ["free"]
+    assert pro[0][0]["position"] == 1   # 会员排到了免费用户前面
+    assert busy["active"] == 1 and busy["queued"] == 2 and busy["queued_pro"] == 1
+    assert idle["active"] == 0 and idle["queued"] == 0 and idle["admitted"] == 3
+
+
+def test_check_rejects_when_queue_is_long():
+    async def scenario():
+        gov = LLMGovernor(limits={"deepseek-reasoner": 1}, max_queue=1, max_wait=600, heartbeat=5)
+        gate = asyncio.Event()
+        tasks = [asyncio.create_task(consume(gov.guard("deepseek-reasoner", PRIORITY_DEFAULT, upstream(str(i), [], gate)))) for i in range(2)]
+        await asyncio.sleep(0.01)
+        try:
+            gov.check("deepseek-reasoner", PRIORITY_DEFAULT)
+            rejected = None
+        except GovernorRejected as e:
+            rejected = e
+        # 另一条通道不受影响
+        assert gov.check("deepseek-chat", PRIORITY_DEFAULT) == 0
+        gate.set()
+        await asyncio.gather(*tasks)
+        return rejected, gov.stats()["lanes"]["deepseek-reasoner"]
+
+    rejected, stats = asyncio.run(scenario())
+    assert rejected is not None and rejected.retry_after >= 1
+    assert stats["rejected"] == 1
+
+
+def test_abandoned_waiter_frees_its_place():
+    async def scenario():
+        gov = LLMGovernor(limits={"deepseek-chat": 1}, max_queue=10, max_wait=600, heartbeat=5)
+        log, gate = [], asyncio.Event()
+        first = asyncio.create_task(consume(gov.guard("deepseek-chat", PRIORITY_DEFAULT, upstream("first", log, gate))))
+        await asyncio.sleep(0.01)
+        leaver = asyncio.create_task(consume(gov.guard("deepseek-chat", PRIORITY_DEFAULT, upstream("leaver", log))))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        await asyncio.sleep(0.01)
+        gate.set()
+        await first
+        return log, gov.stats()["lanes"]["deepseek-chat"]
+
+    log, stats = asyncio.run(scenario())
+    assert log == ["start:first"]
+    assert stats["active"] == 0 and stats["abandoned"] == 1
+
+
+def test_priority_for_role():
+    assert priority_for_role("svip") == PRIORITY_PRO
+    assert priority_for_role("user") == PRIORITY_DEFAULT
+
+
+if __name__ == "__main__":
+    test_pro_requests_jump_the_queue()
+    test_check_rejects_when_queue_is_long()
+    test_abandoned_waiter_frees_its_place()
+    test_priority_for_role()
+    print("✅ 上游并发治理测试全部通过")
@@ -0,0 +1,90 @@
+import os
+import sys
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.llm_hedge import HedgePolicy
+from core.llm_governor import LLMGovernor
+from core.stream_metrics import StreamMetrics
+
+
+def upstream(name, delay, pieces, closed, fail=False):
+    async def gen():
+        try:
+            await asyncio.sleep(delay)
+            if fail: raise ConnectionError(f"{name} down")
+            for piece in pieces:
+                yield piece
+                await asyncio.sleep(0.005)
+        finally:
+            closed.append(name)
+    return gen()
+
+
+def run_hedge(primary_delay, fallback_delay, deadline=0.05, governor=None, primary_fail=False):
+    async def scenario():
+        metrics = StreamMetrics()
+        hedge = HedgePolicy(enabled=True, deadline_s=deadline, governor=governor)
+        closed, outcome = [], {}
+        probe = metrics.start("deepseek-reasoner")
+
+        def fallback():
+            return upstream("chat", fallback_delay, ["{", "}"], closed), metrics.start("deepseek-chat")
+
+        primary = upstream("reasoner", primary_delay, ["<think>", "想", "</think>", "{}"], closed, fail=primary_fail)
+        out = [piece async for piece in hedge.stream(primary, probe, fallback, outcome=outcome)]
+        probe.finish()
+        return out, closed, outcome, hedge.stats(), metrics.snapshot()["models"]
+
+    return asyncio.run(scenario())
+
+# ================= 测试用例集 =================
+
+def test_fast_primary_never_hedges():
+    out, closed, outcome, stats, _ = run_hedge(primary_delay=0, fallback_delay=0)
+    assert "".join(out) == "<think>想</think>{}"
+    assert outcome == {"winner": "primary", "hedged": False}
+    assert stats["fired"] == 0 and stats["requests"] == 1
+
+
+def test_slow_primary_loses_to_fallback_and_is_closed():
+    governor = LLMGovernor(limits={"deepseek-chat": 2})
+    out, closed, outcome, stats, models = run_hedge(primary_delay=1.0, fallback_delay=0.01, governor=governor)
+    assert "".join(out) == "{}"
+    assert outcome == {"winner": "fallback", "hedged": True}
+    assert "reasoner" in closed  # 落败的一路被关闭，不会等到生成结束
+    assert stats["fired"] == 1 and stats["wins"] == {"primary": 0, "fallback": 1} and stats["fallback_win_rate"] == 1.0
+    assert models["deepseek-reasoner"]["status"]["cancelled"] == 1
+    assert models["deepseek-chat"]["status"]["ok"] == 1
+    assert governor.stats()["lanes"]["deepseek-chat"]["active"] == 0  # 备用槽位已归还
+
+
+def test_primary_can_still_win_after_hedge_fires():
+    out, closed, outcome, stats, models = run_hedge(primary_delay=0.08, fallback_delay=1.0)
+    assert "".join(out) == "<think>想</think>{}"
+    assert outcome == {"winner": "primary", "hedged": True}
+    assert "chat" in closed and stats["wins"]["primary"] == 1
+    assert models["deepseek-chat"]["status"]["cancelled"] == 1
+
+
+def test_failed_primary_hands_over_to_running_fallback():
+    out, _, outcome, _, models = run_hedge(primary_delay=0.1, fallback_delay=0.1, primary_fail=True)
+    assert "".join(out) == "{}" and outcome["winner"] == "fallback"
+    assert models["deepseek-reasoner"]["status"]["error"] == 1
+
+
+def test_no_fallback_capacity_keeps_waiting():
+    governor = LLMGovernor(limits={"deepseek-chat": 1})
+    assert governor.try_acquire("deepseek-chat")
+    out, _, outcome, stats, _ = run_hedge(primary_delay=0.1, fallback_delay=0, governor=governor)
+    assert "".join(out) == "<think>想</think>{}"
+    assert outcome == {"winner": "primary", "hedged": False} and stats["skipped_no_capacity"] == 1
+
+
+if __name__ == "__main__":
+    test_fast_primary_never_hedges()
+    test_slow_primary_loses_to_fallback_and_is_closed()
+    test_primary_can_still_win_after_hedge_fires()
+    test_failed_primary_hands_over_to_running_fallback()
+    test_no_fallback_capacity_keeps_waiting()
+    print("✅ 首 token 对冲测试全部通过")
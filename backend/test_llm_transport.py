@@ -0,0 +1,112 @@
+import os
+import sys
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from core.llm_transport import LLMTransport, stream_chat
+from core.stream_metrics import StreamMetrics
+from fake_llm_server import FakeLLMServer
+
+
+async def first_token(client):
+    stream = await client.chat.completions.create(
+        model="deepseek-chat", messages=[{"role": "user", "content": "hi"}], stream=True,
+        stream_options={"include_usage": True}
+    )
+    text, usage = "", None
+    async for chunk in stream:
+        if chunk.usage: usage = chunk.usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            text += chunk.choices[0].delta.content
+    return text, usage
+
+# ================= 测试用例集 =================
+
+def test_warm_up_opens_reusable_connections():
+    async def scenario():
+        server = await FakeLLMServer(port=0, handshake_ms=20, ttft_ms=1, tokens=3, token_ms=0).start()
+        transport = LLMTransport("test", {"base_url": server.base_url, "warmup_connections": 4, "ping_interval": 0})
+        await transport.start()
+        warmed = server.connections
+        results = await asyncio.gather(*(first_token(transport.client) for _ in range(4)))
+        after = server.connections
+        await transport.stop()
+        await server.stop()
+        return warmed, after, results
+
+    warmed, after, results = asyncio.run(scenario())
+    assert warmed == 4
+    assert after == 4   # 分析请求全部复用预热好的连接
+    text, usage = results[0]
+    assert text == "字字字"
+    assert usage.completion_tokens == 3
+
+
+def test_ping_keeps_connections_alive_past_expiry():
+    async def scenario():
+        server = await FakeLLMServer(port=0, handshake_ms=5, ttft_ms=1, tokens=1, token_ms=0).start()
+        transport = LLMTransport("test", {"base_url": server.base_url, "warmup_connections": 2,
+                                          "keepalive_expiry": 0.3, "ping_interval": 0.15})
+        await transport.start()
+        await asyncio.sleep(0.5)
+        await asyncio.gather(*(first_token(transport.client) for _ in range(2)))
+        stats = transport.stats()
+        await transport.stop()
+        await server.stop()
+        return server.connections, stats
+
+    connections, stats = asyncio.run(scenario())
+    assert stats["pings"] >= 3 and stats["ping_failures"] == 0
+    assert connections <= 3   # 心跳与请求偶尔重叠时最多多建一条
+
+
+def test_unreachable_upstream_does_not_block_startup():
+    async def scenario():
+        transport = LLMTransport("test", {"base_url": "http://127.0.0.1:9", "warmup_connections": 2,
+                                          "warmup_timeout": 1, "ping_interval": 0})
+        ok = await transport.warm_up()
+        await transport.stop()
+        return ok
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_closing_stream_chat_closes_upstream_socket():
+    async def scenario():
+        server = await FakeLLMServer(port=0, handshake_ms=0, ttft_ms=1, tokens=400, token_ms=5, reasoning_tokens=5).start()
+        transport = LLMTransport("test", {"base_url": server.base_url, "warmup_connections": 0, "ping_interval": 0})
+        metrics = StreamMetrics()
+        probe = metrics.start("deepseek-reasoner", max_tokens=400)
+        upstream = stream_chat(transport.client, probe, model="deepseek-reasoner",
+                               messages=[{"role": "user", "content": "hi"}], max_tokens=400)
+        pieces = []
+        async for piece in upstream:
+            pieces.append(piece)
+            if len(pieces) >= 10: break
+        # 模拟客户端断开：下游 aclose -> 显式关闭上游响应
+        await upstream.aclose()
+        probe.finish(cancelled=True)
+        for _ in range(50):
+            if server.aborted: break
+            await asyncio.sleep(0.01)
+        snapshot = metrics.snapshot()["models"]["deepseek-reasoner"]
+        await transport.stop()
+        await server.stop()
+        return pieces, server, snapshot
+
+    pieces, server, snapshot = asyncio.run(scenario())
+    assert pieces[0] == "<think>" and "</think>" in pieces
+    assert server.aborted == 1 and server.closed == server.connections == 1
+    assert server.tokens_sent < 50 and server.tokens_unsent > 300
+    assert snapshot["status"]["cancelled"] == 1
+    assert snapshot["cancelled_tokens"]["generated"] == 8   # 5 个思考 + 3 个正文
+    assert snapshot["cancelled_tokens"]["saved_estimate"] == 392  # 无正常结束的样本时按 max_tokens 估算
+
+
+if __name__ == "__main__":
+    test_warm_up_opens_reusable_connections()
+    test_ping_keeps_connections_alive_past_expiry()
+    test_unreachable_upstream_does_not_block_startup()
+    test_closing_stream_chat_closes_upstream_socket()
+    print("✅ 上游传输层测试全部通过")
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.lru_cache import BoundedLRUCache
+
+# ================= 测试用例集 =================
+
+def test_evicts_least_recently_used():
+    cache = BoundedLRUCache("test", max_entries=2)
+    cache.put("a", 1, 10)
+    cache.put("b", 2, 10)
+    assert cache.get("a") == 1      # a 变为最近使用
+    cache.put("c", 3, 10)           # 挤掉 b
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget():
+    cache = BoundedLRUCache("test", max_entries=100, max_bytes=25)
+    for i in range(5):
+        cache.put(i, i, 10)
+    assert len(cache) == 2
+    assert cache.bytes == 20
+    assert cache.put("huge", "x", 26) is False
+
+
+def test_invalidate_by_tag_and_stale_generation():
+    cache = BoundedLRUCache("test")
+    cache.put(("mid", "Ahri"), "p1", 5, tag="Ahri")
+    cache.put(("mid", "Zed"), "p2", 5, tag="Zed")
+
+    generation = cache.generation
+    assert cache.invalidate(tag="Ahri", reason="new tip") == 1
+    assert cache.get(("mid", "Ahri")) is None
+    assert cache.get(("mid", "Zed")) == "p2"
+
+    # 失效前开始构建的结果不允许回填
+    assert cache.put(("mid", "Ahri"), "old", 5, tag="Ahri", generation=generation) is False
+    assert cache.get(("mid", "Ahri")) is None
+
+
+def test_ttl_expiry():
+    cache = BoundedLRUCache("test", ttl=0.01)
+    cache.put("k", "v", 1)
+    assert cache.get("k") == "v"
+    time.sleep(0.02)
+    assert cache.get("k") is None
+    assert cache.bytes == 0
+
+
+if __name__ == "__main__":
+    test_evicts_least_recently_used()
+    test_byte_budget()
+    test_invalidate_by_tag_and_stale_generation()
+    test_ttl_expiry()
+    print("✅ LRU 缓存测试全部通过")
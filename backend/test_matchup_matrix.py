@@ -0,0 +1,101 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.matchup_matrix import MatchupMatrix, build_matchup_matrix
+from core.scoring_engine import ScoringEngine
+
+
+def champ(hero, name, **positions):
+    """seed_data 的写法：name 为中文名，positions[ROLE] = {win_rate 小数, tier 数字}"""
+    roles = [r.lower() for r in positions]
+    return {
+        "id": hero, "name": name, "alias": [name], "role": roles[0], "roles": roles, "tags": ["fighter"], "win_rate": 0.5, "tier": 3,
+        "positions": {r: {"role": r.lower(), "win_rate": wr, "tier": tier} for r, (wr, tier) in positions.items()}
+    }
+
+
+CHAMPIONS = [
+    champ("Gnar", "迷失之牙", TOP=(0.50, 2)),
+    champ("Gangplank", "海洋之灾", TOP=(0.51, 2), MID=(0.49, 3)),
+    champ("Vladimir", "猩红收割者", TOP=(0.50, 3), MID=(0.52, 1)),
+    champ("Jax", "武器大师", TOP=(0.52, 1), JUNGLE=(0.50, 2)),
+    champ("Ahri", "九尾妖狐", MID=(0.51, 2))
+]
+CORRECTIONS = [
+    {"hero": "Gnar", "enemy": "Gangplank", "type": "GUIDE"},
+    {"hero": "Vladimir", "enemy": "Gangplank", "type": "BAD"},
+    {"hero": "Gangplank", "enemy": "Vladimir", "type": "BAD", "_is_auto_mirror": True},  # 镜像条目不计方向
+    {"hero": "Jax", "enemy": "general", "type": "WARN"},
+    {"hero": "Jax", "enemy": "Gnar", "type": "RULE"}
+]
+TIPS = [
+    {"hero": "Jax", "enemy": "Gangplank", "liked_by": ["u"] * 40},
+    {"hero": "Ahri", "enemy": "Gangplank", "liked_by": ["u"] * 5, "is_fake": True}
+]
+
+# ================= 测试用例集 =================
+
+def test_lane_stats_and_directional_signals():
+    m = build_matchup_matrix(CHAMPIONS, CORRECTIONS, TIPS)
+    # 胜率 1pp = 2 分 + tier 同档 + GUIDE +8
+    assert m.score("Gnar", "Gangplank", "TOP") == 6.0
+    # BAD -8，胜率 -1pp，tier 差一档 -2
+    assert m.score("Vladimir", "Gangplank", "TOP") == -12.0
+    # 反方向只有强度差 (镜像 BAD 不计)
+    assert m.score("Gangplank", "Vladimir", "TOP") == 4.0
+    # Tips 点赞封顶 20 -> +3；假 Tips 不计
+    assert m.score("Jax", "Gangplank", "TOP") == 2 + 2 + 3
+    assert m.score("Ahri", "Gangplank", "MID") == 4 + 2
+    # 只有一方打这个位置时没有强度差
+    assert m.score("Ahri", "Gnar", "MID") == 0.0
+    assert m.meta["signals"] == {"corrections": 2, "tips": 1}
+
+
+def test_rank_buckets_and_name_lookup():
+    m = build_matchup_matrix(CHAMPIONS, CORRECTIONS, TIPS)
+    assert m.score("Gnar", "Gangplank", "TOP", "high") < m.score("Gnar", "Gangplank", "TOP", "mid") < m.score("Gnar", "Gangplank", "TOP", "low")
+    assert m.score("Gnar", "Gangplank", "TOP", "unknown") == m.score("Gnar", "Gangplank", "TOP", "low")
+    assert m.score("迷失之牙", "gang plank", "top") == 6.0
+    assert m.vector("Unknown", "TOP") is None and m.vector("Gnar", "ADC") is None
+
+
+def test_save_and_mmap_load_roundtrip():
+    m = build_matchup_matrix(CHAMPIONS, CORRECTIONS, TIPS)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sub", "matrix.npy")
+        m.save(path)
+        loaded = MatchupMatrix.load(path)
+        assert isinstance(loaded.scores, np.memmap) and loaded.stats()["mmap"]
+        assert loaded.version == m.version and loaded.scores.dtype == np.float16
+        assert np.array_equal(np.asarray(loaded.scores), m.scores)
+        assert loaded.score("Vladimir", "Gangplank", "TOP", "mid") == m.score("Vladimir", "Gangplank", "TOP", "mid")
+        del loaded
+
+
+def test_engine_folds_counter_scores_into_ranking():
+    engine = ScoringEngine()
+    engine.build(CHAMPIONS)
+    plain, _ = engine.recommend("top", [])
+    engine.attach_matchups(build_matchup_matrix(CHAMPIONS, CORRECTIONS, TIPS))
+    # 不传对线敌人 / 敌人不认识：与未挂矩阵时完全一致
+    assert engine.recommend("top", []) == (plain, engine.composition([]))
+    assert engine.recommend("top", [], enemy_laner="Unknown")[0] == plain
+    ranked, _ = engine.recommend("top", [], enemy_laner="Gangplank", rank_bucket="low")
+    assert [(c["name"], c["counter"]) for c in ranked] == [("武器大师", 7.0), ("迷失之牙", 6.0), ("海洋之灾", 0.0), ("猩红收割者", -12.0)]
+    assert ranked[0]["score"] == plain[0]["score"] + 7.0
+    # 英雄池重建后自动按新行顺序对齐
+    engine.build(CHAMPIONS[::-1])
+    assert [c["name"] for c in engine.recommend("top", [], enemy_laner="Gangplank")[0]] == ["武器大师", "迷失之牙", "海洋之灾", "猩红收割者"]
+    assert engine.stats()["matchups"] is not None
+
+
+if __name__ == "__main__":
+    test_lane_stats_and_directional_signals()
+    test_rank_buckets_and_name_lookup()
+    test_save_and_mmap_load_roundtrip()
+    test_engine_folds_counter_scores_into_ranking()
+    print("✅ 对位矩阵测试全部通过")
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.mechanics_snapshot import MechanicsSnapshot, ROLE_KEYS
+
+# ================= 配置区域 =================
+JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "secure_data", "s16_mechanics.json")
+
+
+def load_rules():
+    with open(JSON_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# ================= 测试用例集 =================
+
+def test_role_partitions():
+    """打野模块只出现在 JUNGLE；带 role_key 的条目只出现在对应分路"""
+    rules = load_rules()
+    snap = MechanicsSnapshot(rules)
+    jungle_names = [i["name"] for i in rules["data_modules"]["jungle_data"]["items"]]
+
+    for role in ROLE_KEYS:
+        ctx = snap.context_for(role)
+        assert ctx.startswith("【S16/分路与机制库】")
+        assert any(name in ctx for name in jungle_names) == (role == "JUNGLE"), role
+
+    for module in rules["data_modules"].values():
+        if not isinstance(module, dict): continue
+        for item in module.get("items", []):
+            if not item.get("role_key"): continue
+            owners = [r for r in ROLE_KEYS if f"{item['name']}: {item['rule']}" in snap.context_for(r)]
+            assert owners == [item["role_key"]], item["name"]
+
+
+def test_version_and_immutability():
+    rules = load_rules()
+    snap = MechanicsSnapshot(rules)
+    assert snap.version.startswith(f"{rules['_meta']['version']}#")
+    assert MechanicsSnapshot(load_rules()).version == snap.version
+
+    rules["data_modules"]["jungle_data"]["items"][0]["rule"] = "changed"
+    assert MechanicsSnapshot(rules).version != snap.version
+
+    try:
+        snap.version = "hacked"
+        assert False, "快照应当只读"
+    except AttributeError:
+        pass
+
+
+def test_empty_snapshot():
+    snap = MechanicsSnapshot()
+    assert snap.context_for("MID") == "【S16/分路与机制库】: 暂无特殊机制数据"
+
+
+if __name__ == "__main__":
+    test_role_partitions()
+    test_version_and_immutability()
+    test_empty_snapshot()
+    print("✅ 机制库快照测试全部通过")
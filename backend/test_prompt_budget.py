@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.prompt_budget import PromptBudget, count_tokens
+
+# ================= 测试用例集 =================
+
+def test_count_tokens_estimate():
+    assert count_tokens("") == 0
+    assert count_tokens("abcdefghij") == 3          # 10 * 0.3
+    assert count_tokens("野怪刷新") == 3              # 4 * 0.6 -> 2.4 向上取整
+    before = count_tokens.cache_info().hits
+    count_tokens("野怪刷新")
+    assert count_tokens.cache_info().hits == before + 1
+
+
+def test_fill_keeps_everything_under_budget():
+    budget = PromptBudget(budgets={"bp": 1000})
+    kept, report = budget.fill("bp", ["固定" * 10], [("corrections", ["- a", "- b"]), ("tips", ["<tip>x</tip>"])])
+    assert kept == {"corrections": ["- a", "- b"], "tips": ["<tip>x</tip>"]}
+    assert report["dropped_tokens"] == 0 and budget.trimmed_fills == 0
+
+
+def test_fill_greedy_by_priority():
+    budget = PromptBudget(budgets={"team": 110})
+    long_rule = "- " + "长" * 100        # 61 tokens (+1 换行)
+    short_rule = "- " + "短" * 10        # 7 tokens (+1 换行)
+    tips = ["<tip>" + "t" * 40 + "</tip>", "<tip>ok</tip>"]
+    kept, report = budget.fill("team", ["x" * 100], [("corrections", [long_rule, long_rule, short_rule]), ("tips", tips)])
+    # 固定 30 tokens，剩 80：第一条长修正 (62) 装入，第二条跳过；短修正 (8) 与短 Tip (5) 仍可装入
+    assert kept["corrections"] == [long_rule, short_rule]
+    assert kept["tips"] == ["<tip>ok</tip>"]
+    assert report["dropped"] == {"corrections": 1, "tips": 1}
+    assert budget.stats()["trimmed_snippets"] == 2
+
+
+def test_unknown_mode_uses_default_budget():
+    budget = PromptBudget(default_budget=1234)
+    assert budget.budget_for("custom_mode") == 1234
+    assert budget.budget_for("bp") == 3500
+
+
+if __name__ == "__main__":
+    test_count_tokens_estimate()
+    test_fill_keeps_everything_under_budget()
+    test_fill_greedy_by_priority()
+    test_unknown_mode_uses_default_budget()
+    print("✅ Prompt 预算测试全部通过")
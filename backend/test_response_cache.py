@@ -0,0 +1,98 @@
+import os
+import sys
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.response_cache import AnalyzeResponseCache
+
+
+def make_cache(**kw):
+    return AnalyzeResponseCache(enabled=True, ttl=60, max_entries=10, max_mb=1, replay_chars=8, replay_delay_ms=0, **kw)
+
+
+async def fake_upstream(chunks):
+    for c in chunks:
+        await asyncio.sleep(0)
+        yield c
+
+
+async def drain(agen):
+    return [c async for c in agen]
+
+# ================= 测试用例集 =================
+
+def test_fingerprint_is_canonical():
+    a = AnalyzeResponseCache.fingerprint(my_hero="Ahri", my_roles={"TOP": "Aatrox", "MID": "Ahri"})
+    b = AnalyzeResponseCache.fingerprint(my_roles={"MID": "Ahri", "TOP": "Aatrox"}, my_hero="Ahri")
+    c = AnalyzeResponseCache.fingerprint(my_hero="Zed", my_roles={"TOP": "Aatrox", "MID": "Ahri"})
+    assert a == b
+    assert a != c
+
+
+def test_record_then_replay_keeps_think_markers():
+    cache = make_cache()
+    upstream = ["<think>", "分析", "</think>", '{"concise": ', '{"title": "t"}}']
+    out = asyncio.run(drain(cache.record("k", fake_upstream(upstream))))
+    assert out == upstream
+
+    cached = cache.get("k")
+    assert cached == tuple(upstream)
+    replayed = asyncio.run(drain(cache.replay(cached)))
+    assert "".join(replayed) == "".join(upstream)
+    # 批次只在原分片边界切分
+    assert all(r.count("<think>") + r.count("</think>") <= 2 for r in replayed)
+    assert len(replayed) < len(upstream)
+
+
+def test_failed_stream_not_cached():
+    cache = make_cache()
+    state = {"ok": True}
+
+    async def broken():
+        yield "<think>"
+        state["ok"] = False
+        yield '{"concise": {"title": "连接中断"}}'
+
+    asyncio.run(drain(cache.record("k", broken(), succeeded=lambda: state["ok"])))
+    assert cache.get("k") is None
+
+
+def test_disabled_passthrough_and_invalidate():
+    cache = AnalyzeResponseCache(enabled=False)
+    assert asyncio.run(drain(cache.record("k", fake_upstream(["a", "b"])))) == ["a", "b"]
+    assert cache.get("k") is None
+
+    cache = make_cache()
+    asyncio.run(drain(cache.record("k", fake_upstream(["a"]))))
+    assert cache.invalidate(reason="hot update") == 1
+    assert cache.get("k") is None
+
+
+def test_closing_record_closes_upstream():
+    async def scenario(enabled):
+        closed = []
+
+        async def upstream():
+            try:
+                for c in ["a", "b", "c"]:
+                    yield c
+            finally:
+                closed.append(True)
+
+        cache = make_cache() if enabled else AnalyzeResponseCache(enabled=False)
+        agen = cache.record("k", upstream())
+        assert await agen.__anext__() == "a"
+        await agen.aclose()  # 客户端中途断开
+        return list(closed), cache.get("k")  # asyncio.run 退出时会回收残留生成器，须在此之前取值
+
+    for enabled in (True, False):
+        assert asyncio.run(scenario(enabled)) == ([True], None)
+
+
+if __name__ == "__main__":
+    test_fingerprint_is_canonical()
+    test_record_then_replay_keeps_think_markers()
+    test_failed_stream_not_cached()
+    test_disabled_passthrough_and_invalidate()
+    test_closing_record_closes_upstream()
+    print("✅ 结果缓存测试全部通过")
@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.champion_snapshot import ChampionSnapshot
+from core.role_inference import RoleInference
+
+
+def champ(hero, role, **picks):
+    """seed_data 的写法：positions[ROLE] = {pick_rate 小数}，role 为主位置 (小写)"""
+    return {"id": hero, "name": hero, "role": role, "positions": {r: {"pick_rate": p} for r, p in picks.items()}}
+
+
+DOCS = [
+    # 主位置都写成打野：旧版贪心会让先出场的抢走打野
+    champ("Aatrox", "jungle", TOP=0.09, JUNGLE=0.02),
+    champ("JarvanIV", "jungle", JUNGLE=0.10, TOP=0.01),
+    champ("Syndra", "mid", MID=0.08),
+    champ("KaiSa", "bot", BOT=0.20),
+    champ("Nautilus", "support", SUPPORT=0.12, TOP=0.001),
+    champ("Pantheon", "support", SUPPORT=0.05, MID=0.04, TOP=0.03),
+    {"id": "Legacy", "name": "Legacy", "role": "top"}  # 无 positions：退回主位置
+]
+
+# ================= 测试用例集 =================
+
+def test_joint_assignment_beats_greedy_first_come():
+    engine = RoleInference(ChampionSnapshot(DOCS))
+    roles = engine.infer(["Aatrox", "JarvanIV", "Syndra", "KaiSa", "Nautilus"])
+    assert roles == {"TOP": "Aatrox", "JUNGLE": "JarvanIV", "MID": "Syndra", "ADC": "KaiSa", "SUPPORT": "Nautilus"}
+
+
+def test_fixed_assignments_are_constraints():
+    engine = RoleInference(ChampionSnapshot(DOCS))
+    roles = engine.infer(["Aatrox", "JarvanIV", "Pantheon", "KaiSa", "Nautilus"], {"support": "Pantheon", "bot": "KaiSa"})
+    # 辅助被占：泰坦单看自己更想去上单，但联合概率下剑魔上单 + 泰坦补中单更优
+    assert roles == {"TOP": "Aatrox", "JUNGLE": "JarvanIV", "MID": "Nautilus", "ADC": "KaiSa", "SUPPORT": "Pantheon"}
+    assert engine.infer(["Syndra"], {"TOP": "Unknown"}) == {"MID": "Syndra"}
+
+
+def test_memoized_by_team_set_and_invalidated_on_rebuild():
+    engine = RoleInference(ChampionSnapshot(DOCS))
+    first = engine.infer(["Aatrox", "JarvanIV", "Syndra"])
+    assert engine.infer(["Syndra", "JarvanIV", "Aatrox", "None"]) == first
+    assert engine.solves == 1
+    engine.build(ChampionSnapshot(DOCS, seq=2))
+    engine.infer(["Aatrox", "JarvanIV", "Syndra"])
+    assert engine.solves == 2
+
+
+def test_unknown_heroes_use_resolver_or_fill_leftover_slots():
+    engine = RoleInference(ChampionSnapshot(DOCS))
+    assert engine.infer(["Legacy", "KaiSa"]) == {"TOP": "Legacy", "ADC": "KaiSa"}
+    resolved = engine.infer(["NewChamp", "KaiSa"], resolve=lambda name: {"role": "jungle"})
+    assert resolved == {"JUNGLE": "NewChamp", "ADC": "KaiSa"}
+    roles = engine.infer(["Mystery", "Aatrox", "JarvanIV", "Syndra", "KaiSa"])
+    assert roles["SUPPORT"] == "Mystery" and roles["TOP"] == "Aatrox"
+    # 英雄多于空位时，概率最低的不分配
+    assert "Pantheon" not in engine.infer(["Aatrox", "JarvanIV", "Syndra", "KaiSa", "Nautilus", "Pantheon"]).values()
+
+
+if __name__ == "__main__":
+    test_joint_assignment_beats_greedy_first_come()
+    test_fixed_assignments_are_constraints()
+    test_memoized_by_team_set_and_invalidated_on_rebuild()
+    test_unknown_heroes_use_resolver_or_fill_leftover_slots()
+    print("✅ 分路推断测试全部通过")
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import random
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core import scoring_engine
+from core.scoring_engine import ScoringEngine, recommend_heroes_legacy
+
+JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "secure_data", "champions.json")
+
+
+class FakeCollection:
+    """只实现推荐用到的 find / find_one (按插入顺序，等值匹配，数组字段匹配元素)"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    @staticmethod
+    def _match(doc, query):
+        for k, v in query.items():
+            field = doc.get(k)
+            if not (field == v or (isinstance(field, list) and v in field)):
+                return False
+        return True
+
+    def find(self, query):
+        return [d for d in self.docs if self._match(d, query)]
+
+    def find_one(self, query):
+        return next(iter(self.find(query)), None)
+
+
+class FakeDB:
+    def __init__(self, docs):
+        self.champions_col = FakeCollection(docs)
+        self.scoring_engine = ScoringEngine()
+        self.scoring_engine.build_from_collection(self.champions_col)
+
+
+def mixed_docs(seed=7):
+    """champions.json 为底，混入真实库里出现过的各种字段形态 (字符串 / 小数胜率、数字 tier、缺字段、同分)"""
+    with open(JSON_PATH, encoding="utf-8") as f:
+        items = json.load(f)
+    rng = random.Random(seed)
+    docs = []
+    for i, item in enumerate(items):
+        doc = {"_id": i, "name": item["name"], "role": item.get("role"), "tags": [t.capitalize() for t in item.get("tags", [])]}
+        shape = i % 5
+        if shape == 0: doc.update(win_rate=item.get("win_rate"), tier=item.get("tier"), alias=item.get("alias") or [item["name"]])
+        elif shape == 1: doc.update(win_rate=rng.choice([0.5123, 0.49]), tier=rng.choice([1, 2, 3]))  # seed_data 的写法
+        elif shape == 2: doc.update(win_rate="51.00%", tier="T2")  # 故意制造同分
+        elif shape == 3: doc.update(tier="T1")
+        docs.append(doc)
+    docs.append({"_id": "multi", "name": "Flex", "role": ["mid", "top"], "tags": ["Mage"], "win_rate": "60%"})
+    return docs
+
+
+def teams(docs, n, seed=11):
+    rng = random.Random(seed)
+    names = [d["name"] for d in docs] + ["Unknown", "None", ""]
+    return [rng.sample(names, 5) for _ in range(n)]
+
+# ================= 测试用例集 =================
+
+def test_engine_matches_legacy_ranking_exactly():
+    docs = mixed_docs()
+    db = FakeDB(docs)
+    # 额外覆盖两条加分规则全部触发的阵容 (三个 AD、无 AP、无前排)
+    ad_only = [d["name"] for d in docs if d["tags"] and not {"mage", "support", "ap", "tank", "fighter"} & {t.lower() for t in d["tags"]}][:4]
+    for role in ["top", "jungle", "mid", "support", "bot", "ADC", "MID"]:
+        for team in teams(docs, 40) + [ad_only, []]:
+            assert db.scoring_engine.recommend(role, team) == recommend_heroes_legacy(db, role, team), (role, team)
+
+
+def test_top_k_boundary_ties_keep_natural_order():
+    docs = [{"name": f"H{i}", "role": "mid", "tags": [], "win_rate": "50%" if i % 5 else "52%"} for i in range(40)]
+    db = FakeDB(docs)
+    got, _ = db.scoring_engine.recommend("mid", [])
+    want, _ = recommend_heroes_legacy(db, "mid", [])
+    assert [c["name"] for c in got] == [c["name"] for c in want]
+    assert len(got) == 12 and got[-1]["name"] == "H4"  # 8 个 104 分之后，100 分同分按原顺序截断
+
+
+def test_rules_are_declarative():
+    rules = dict(scoring_engine.SCORING_RULES, tier={"default": "T3", "bonus": {"T1": 100}}, top_k=2)
+    engine = ScoringEngine(rules)
+    engine.build([{"name": "A", "role": "mid", "tier": "T1"}, {"name": "B", "role": "mid", "win_rate": "99%"}, {"name": "C", "role": "mid"}])
+    assert [c["name"] for c in engine.recommend("MID", [])[0]] == ["A", "B"]
+    assert engine.stats()["roles"] == {"mid": 3}
+
+
+def test_without_numpy_engine_is_not_ready():
+    original = scoring_engine.np
+    scoring_engine.np = None
+    try:
+        engine = ScoringEngine()
+        assert engine.build([{"name": "A", "role": "mid"}]) == 0 and not engine.ready
+    finally:
+        scoring_engine.np = original
+
+
+if __name__ == "__main__":
+    test_engine_matches_legacy_ranking_exactly()
+    test_top_k_boundary_ties_keep_natural_order()
+    test_rules_are_declarative()
+    test_without_numpy_engine_is_not_ready()
+    print("✅ 推荐打分引擎测试全部通过")
@@ -0,0 +1,108 @@
+import os
+import sys
+import random
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.matchup_matrix import MatchupMatrix, build_matchup_matrix
+from core.scoring_engine import ScoringEngine
+from core.shortlist_table import ShortlistTable, build_shortlist_table, composition_signatures
+
+ROLES = ["top", "jungle", "mid", "bot", "support"]
+TAGS = [["Mage"], ["Tank"], ["Fighter"], ["Marksman"], ["Assassin"], ["Support", "Engage"], ["Tank", "Engage"]]
+
+
+def seeded_docs(n=60, seed=3):
+    """seed_data 的写法 (中文 name、英文 id、positions)；候选数不足 top_k 的分路用 support 覆盖"""
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        role = ROLES[i % 4] if i < n - 5 else "support"
+        docs.append({
+            "id": f"Hero{i}", "name": f"英雄{i}", "alias": [f"英雄{i}"], "role": role, "tags": TAGS[i % len(TAGS)],
+            "win_rate": rng.choice(["49.50%", "51.00%", "52.25%"]), "tier": rng.choice(["T1", "T2", "T3"]),
+            "positions": {role.upper(): {"win_rate": rng.uniform(0.47, 0.54), "tier": rng.randint(1, 4), "pick_rate": 0.05}}
+        })
+    return docs
+
+
+def make_engine(docs, tmp):
+    engine = ScoringEngine()
+    engine.build(docs)
+    path = os.path.join(tmp, "matrix.npy")
+    build_matchup_matrix(docs, [{"hero": "Hero1", "enemy": "Hero5", "type": "GUIDE"}]).save(path)
+    engine.attach_matchups(MatchupMatrix.load(path))
+    return engine
+
+
+# ================= 测试用例集 =================
+
+def test_signatures_cover_every_bonus_state():
+    engine = ScoringEngine()
+    engine.build(seeded_docs())
+    signatures = list(composition_signatures())
+    assert len(signatures) == sum((n + 1) ** 3 for n in range(6))
+    assert sorted({engine.bonus_state(sig) for sig in signatures}) == [0, 1, 2, 3]
+
+
+def test_table_lookup_matches_live_scoring():
+    docs = seeded_docs()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, plain = make_engine(docs, tmp), make_engine(docs, tmp)  # plain 不挂表，实时打分
+        table = build_shortlist_table(engine, workers=1)
+        assert engine.attach_shortlists(table)
+
+        rng = random.Random(5)
+        names = [d["id"] for d in docs] + ["Unknown", "None", "NotAHero"]
+        for _ in range(300):
+            role, team = rng.choice(ROLES), rng.sample(names, rng.randint(0, 5))
+            enemy, bucket = rng.choice(names + [None]), rng.choice(["low", "mid", "high", None])
+            assert engine.recommend(role, team, enemy_laner=enemy, rank_bucket=bucket) == plain.recommend(role, team, enemy_laner=enemy, rank_bucket=bucket)
+        assert engine.stats()["table_hits"] == 300
+        # 非默认 top_k / 不存在的分路：照常实时打分
+        assert len(engine.recommend("top", [], top_k=3)[0]) == 3
+        assert engine.recommend("adc", [])[0] == []
+        assert engine.stats()["table_hits"] == 300
+
+
+def test_process_pool_build_and_mmap_roundtrip():
+    docs = seeded_docs()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(docs, tmp)
+        inline = build_shortlist_table(engine, workers=1)
+        pooled = build_shortlist_table(engine, workers=2)
+        assert pooled.meta["workers"] == 2
+        for field in ("row", "score", "counter"):
+            assert np.array_equal(inline.entries[field], pooled.entries[field], equal_nan=field == "counter")
+
+        path = os.path.join(tmp, "shortlists.npy")
+        pooled.save(path)
+        loaded = ShortlistTable.load(path)
+        assert isinstance(loaded.entries, np.memmap) and loaded.fingerprint == engine.fingerprint()
+        assert loaded.lookup("mid", 0) == inline.lookup("mid", 0)
+        del loaded
+
+
+def test_stale_table_is_never_attached():
+    docs = seeded_docs()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(docs, tmp)
+        table = build_shortlist_table(engine, workers=1)
+        assert engine.attach_shortlists(table)
+        # 内容相同的重建 (热更新但数据没变)：继续用表
+        engine.build(list(docs))
+        assert engine.stats()["shortlists"]
+        # 英雄数据变了：自动退回实时打分，旧表也挂不上
+        docs[0] = dict(docs[0], win_rate="60%")
+        engine.build(docs)
+        assert not engine.stats()["shortlists"] and not engine.attach_shortlists(table)
+
+
+if __name__ == "__main__":
+    test_signatures_cover_every_bonus_state()
+    test_table_lookup_matches_live_scoring()
+    test_process_pool_build_and_mmap_roundtrip()
+    test_stale_table_is_never_attached()
+    print("✅ 离线入围表测试全部通过")
@@ -0,0 +1,94 @@
+import os
+import sys
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.single_flight import SingleFlight
+
+
+class FakeUpstream:
+    """模拟 LLM 流：每个分片之间 sleep，记录被创建/关闭的次数"""
+
+    def __init__(self, chunks, delay=0.01):
+        self.chunks = chunks
+        self.delay = delay
+        self.opened = 0
+        self.finished = 0
+        self.closed = 0
+
+    async def stream(self):
+        self.opened += 1
+        try:
+            for c in self.chunks:
+                await asyncio.sleep(self.delay)
+                yield c
+            self.finished += 1
+        finally:
+            self.closed += 1
+
+
+async def drain(agen, limit=None):
+    out = []
+    async for c in agen:
+        out.append(c)
+        if limit and len(out) >= limit: break
+    await agen.aclose()
+    return out
+
+# ================= 测试用例集 =================
+
+def test_late_subscriber_gets_backlog_and_live_chunks():
+    async def scenario():
+        sf = SingleFlight("test")
+        up = FakeUpstream(["<think>", "a", "</think>", "b", "c"])
+        key = sf.make_key("model", "sys", "user")
+
+        first = asyncio.create_task(drain(sf.subscribe(key, up.stream)))
+        await asyncio.sleep(0.025)   # 上游已产出部分分片
+        second = asyncio.create_task(drain(sf.subscribe(key, up.stream)))
+        results = await asyncio.gather(first, second)
+        return sf, up, results
+
+    sf, up, (r1, r2) = asyncio.run(scenario())
+    assert r1 == r2 == ["<think>", "a", "</think>", "b", "c"]
+    assert up.opened == 1
+    assert sf.stats() == {"active": 0, "subscribers": 0, "started": 1, "coalesced": 1, "cancelled": 0}
+
+
+def test_leader_disconnect_keeps_followers_streaming():
+    async def scenario():
+        sf = SingleFlight("test")
+        up = FakeUpstream(["1", "2", "3", "4"])
+        key = sf.make_key("k")
+        leader = asyncio.create_task(drain(sf.subscribe(key, up.stream), limit=1))
+        follower = asyncio.create_task(drain(sf.subscribe(key, up.stream)))
+        return up, await leader, await follower
+
+    up, r_leader, r_follower = asyncio.run(scenario())
+    assert r_leader == ["1"]
+    assert r_follower == ["1", "2", "3", "4"]
+    assert up.opened == 1 and up.finished == 1
+
+
+def test_upstream_cancelled_when_everyone_leaves():
+    async def scenario():
+        sf = SingleFlight("test")
+        up = FakeUpstream(["1", "2", "3", "4", "5"], delay=0.02)
+        key = sf.make_key("k")
+        await drain(sf.subscribe(key, up.stream), limit=1)
+        await asyncio.sleep(0.05)
+        # 取消后相同 key 会重新发起
+        again = await drain(sf.subscribe(key, up.stream))
+        return sf, up, again
+
+    sf, up, again = asyncio.run(scenario())
+    assert up.finished == 1 and up.opened == 2 and up.closed == 2
+    assert again == ["1", "2", "3", "4", "5"]
+    assert sf.stats()["cancelled"] == 1
+
+
+if __name__ == "__main__":
+    test_late_subscriber_gets_backlog_and_live_chunks()
+    test_leader_disconnect_keeps_followers_streaming()
+    test_upstream_cancelled_when_everyone_leaves()
+    print("✅ 并发合流测试全部通过")
@@ -0,0 +1,101 @@
+import os
+import sys
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.speculative_context import SpeculativeContexts
+
+
+def builder(calls, value, delay=0.0, fail=False):
+    async def build():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        if fail: raise RuntimeError("db down")
+        return {"value": value}
+    return build
+
+# ================= 测试用例集 =================
+
+def test_take_returns_precomputed_context_for_same_draft():
+    async def scenario():
+        spec = SpeculativeContexts(debounce_ms=0)
+        calls = []
+        assert spec.submit("alice", "k1", builder(calls, "v1"))
+        assert not spec.submit("alice", "k1", builder(calls, "dup"))  # 同一阵容重复推送不重算
+        await asyncio.sleep(0.01)
+        assert await spec.take("alice", "k1") == {"value": "v1"}
+        assert await spec.take("alice", "k2") is None
+        assert await spec.take("bob", "k1") is None
+        return calls, spec.stats()
+
+    calls, stats = asyncio.run(scenario())
+    assert calls == ["v1"]
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["unchanged"] == 1
+
+
+def test_draft_change_cancels_stale_work_and_debounces():
+    async def scenario():
+        spec = SpeculativeContexts(debounce_ms=20)
+        calls = []
+        spec.submit("alice", "k1", builder(calls, "v1"))
+        spec.submit("alice", "k2", builder(calls, "v2"))  # 防抖期内换英雄：旧阵容根本不会开始计算
+        result = await spec.take("alice", "k2")           # 计算仍在进行：直接等待它
+        assert await spec.take("alice", "k1") is None
+        return calls, result, spec.stats()
+
+    calls, result, stats = asyncio.run(scenario())
+    assert calls == ["v2"] and result == {"value": "v2"}
+    assert stats["superseded"] == 1 and stats["joined_inflight"] == 1
+
+
+def test_game_start_evicts_and_failures_fall_back():
+    async def scenario():
+        spec = SpeculativeContexts(debounce_ms=0)
+        calls = []
+        spec.submit("alice", "k1", builder(calls, "v1"))
+        spec.evict("alice", reason="game_start")
+        assert await spec.take("alice", "k1") is None
+
+        spec.submit("bob", "k1", builder(calls, "boom", fail=True))
+        assert await spec.take("bob", "k1") is None  # 预计算失败：调用方现场构建
+        return spec.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["evicted"] == 1 and stats["errors"] == 1 and stats["hits"] == 0
+
+
+def test_expired_entries_are_ignored():
+    async def scenario():
+        spec = SpeculativeContexts(debounce_ms=0, ttl=0.01)
+        spec.submit("alice", "k1", builder([], "v1"))
+        await asyncio.sleep(0.03)
+        return await spec.take("alice", "k1")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_hot_update_clears_done_and_inflight_contexts():
+    async def scenario():
+        spec = SpeculativeContexts(debounce_ms=0)
+        calls = []
+        spec.submit("alice", "k1", builder(calls, "v1"))
+        assert await spec.take("alice", "k1") == {"value": "v1"}
+        spec.submit("bob", "k1", builder(calls, "v2", delay=1))
+        await asyncio.sleep(0)
+        assert spec.clear(reason="hot update") == 2
+        assert await spec.take("alice", "k1") is None and await spec.take("bob", "k1") is None
+        # 清除后重新推送同一阵容：重新计算 (不会被当成 "未变化")
+        assert spec.submit("alice", "k1", builder(calls, "v3"))
+        return await spec.take("alice", "k1"), spec.stats()
+
+    value, stats = asyncio.run(scenario())
+    assert value == {"value": "v3"} and stats["users"] == 1 and stats["evicted"] == 2
+
+
+if __name__ == "__main__":
+    test_take_returns_precomputed_context_for_same_draft()
+    test_draft_change_cancels_stale_work_and_debounces()
+    test_game_start_evicts_and_failures_fall_back()
+    test_expired_entries_are_ignored()
+    test_hot_update_clears_done_and_inflight_contexts()
+    print("✅ 选人预计算测试全部通过")
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.stage_timer import StageTimer
+
+
+async def slow(value, delay):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def boom():
+    raise RuntimeError("db down")
+
+# ================= 测试用例集 =================
+
+def test_concurrent_steps_overlap():
+    async def scenario():
+        timer = StageTimer("test")
+        results = await asyncio.gather(
+            timer.run("a", slow("A", 0.05), timeout=1),
+            timer.run("b", slow("B", 0.05), timeout=1),
+            timer.run("c", slow("C", 0.05), timeout=1),
+        )
+        return timer, results
+
+    start = time.perf_counter()
+    timer, results = asyncio.run(scenario())
+    assert results == ["A", "B", "C"]
+    assert time.perf_counter() - start < 0.12   # 并发执行，总耗时约等于单步耗时
+    assert timer.degraded == []
+
+
+def test_timeout_and_error_degrade_to_fallback():
+    async def scenario():
+        timer = StageTimer("test")
+        tips = await timer.run("knowledge", slow({"general": ["x"]}, 0.2), timeout=0.02, fallback={})
+        corrections = await timer.run("corrections", boom(), timeout=1, fallback=[])
+        return timer, tips, corrections
+
+    timer, tips, corrections = asyncio.run(scenario())
+    assert tips == {} and corrections == []
+    assert timer.degraded == ["knowledge", "corrections"]
+    summary = timer.summary()
+    assert "knowledge" in summary and "(timeout)" in summary and "(error)" in summary
+
+
+def test_span_records_serial_steps():
+    timer = StageTimer("test")
+    with timer.span("usage"):
+        time.sleep(0.01)
+    assert timer.steps[0][0] == "usage"
+    assert "slowest: usage" in timer.summary()
+
+
+if __name__ == "__main__":
+    test_concurrent_steps_overlap()
+    test_timeout_and_error_degrade_to_fallback()
+    test_span_records_serial_steps()
+    print("✅ 分段计时测试全部通过")
@@ -0,0 +1,77 @@
+import os
+import sys
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.stream_framing import StreamFramer
+
+
+async def source(items, pause_after=None, pause=0.0):
+    for i, item in enumerate(items):
+        yield item
+        if pause_after is not None and i == pause_after:
+            await asyncio.sleep(pause)
+
+
+async def collect(gen):
+    return [frame async for frame in gen]
+
+# ================= 测试用例集 =================
+
+def test_coalesces_by_size_and_keeps_content():
+    framer = StreamFramer(max_ms=1000, max_bytes=8)
+    items = ["ab", "cd", "ef", "gh", "ij"]
+    frames = asyncio.run(collect(framer.frame(source(items))))
+    assert frames == ["abcdefgh", "ij"]
+    stats = framer.stats.snapshot()
+    assert stats["upstream_chunks"] == 5 and stats["frames"] == 2 and stats["writes_saved"] == 3
+
+
+def test_flushes_on_time_when_upstream_stalls():
+    framer = StreamFramer(max_ms=20, max_bytes=4096)
+    frames = asyncio.run(collect(framer.frame(source(["a", "b", "c"], pause_after=1, pause=0.1))))
+    assert frames == ["ab", "c"]
+
+
+def test_think_markers_start_new_frames():
+    framer = StreamFramer(max_ms=1000, max_bytes=4096)
+    items = ["<queue>{}</queue>", "<think>", "想", "法", "</think>", "{", "}"]
+    frames = asyncio.run(collect(framer.frame(source(items))))
+    assert frames == ["<queue>{}</queue>", "<think>想法", "</think>{}"]
+
+
+def test_zero_ms_passes_through_and_options_are_clamped():
+    framer = StreamFramer(max_ms=30, max_bytes=512)
+    items = ["a", "b", "c"]
+    assert asyncio.run(collect(framer.frame(source(items), max_ms=0))) == items
+    assert framer.options(max_ms=99999, max_bytes=0) == (500, 1)
+    assert framer.options() == (30, 512)
+
+
+def test_consumer_disconnect_closes_source():
+    closed = []
+
+    async def endless():
+        try:
+            while True:
+                yield "x"
+                await asyncio.sleep(0.001)
+        finally:
+            closed.append(True)
+
+    async def scenario():
+        gen = StreamFramer(max_ms=5, max_bytes=4096).frame(endless())
+        await gen.__anext__()
+        await gen.aclose()
+
+    asyncio.run(scenario())
+    assert closed == [True]
+
+
+if __name__ == "__main__":
+    test_coalesces_by_size_and_keeps_content()
+    test_flushes_on_time_when_upstream_stalls()
+    test_think_markers_start_new_frames()
+    test_zero_ms_passes_through_and_options_are_clamped()
+    test_consumer_disconnect_closes_source()
+    print("✅ 流分帧测试全部通过")
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.stream_metrics import Histogram, StreamMetrics
+
+
+class FakeUsage:
+    def __init__(self, completion, hit, miss):
+        self.completion_tokens = completion
+        self.model_extra = {"prompt_cache_hit_tokens": hit, "prompt_cache_miss_tokens": miss}
+
+# ================= 测试用例集 =================
+
+def test_histogram_percentiles_are_close():
+    h = Histogram()
+    for v in range(1, 1001):
+        h.observe(v)
+    assert h.count == 1000 and h.min == 1 and h.max == 1000
+    # 指数分桶误差不超过一个桶宽 (x1.5)
+    assert 330 <= h.percentile(50) <= 750
+    assert 600 <= h.percentile(90) <= 1000
+    assert h.percentile(99) <= 1000
+    assert Histogram().snapshot() == {"count": 0}
+
+
+def test_probe_records_stream_timeline():
+    metrics = StreamMetrics()
+    probe = metrics.start("deepseek-reasoner", context_ms=42)
+    probe.mark_request()
+    probe.mark_connected()
+    probe.on_reasoning()
+    time.sleep(0.01)
+    probe.on_content()
+    probe.on_usage(FakeUsage(completion=120, hit=900, miss=100))
+    probe.finish()
+    probe.finish()  # 重复 finish 只记一次
+
+    model = metrics.snapshot()["models"]["deepseek-reasoner"]
+    assert model["requests"] == 1 and model["status"]["ok"] == 1
+    assert model["prompt_cache_hit_ratio"] == 0.9
+    m = model["metrics"]
+    assert m["context_ms"]["max"] == 42
+    assert m["completion_tokens"]["max"] == 120
+    assert m["ttft_reasoning_ms"]["max"] <= m["ttft_content_ms"]["max"]
+    assert m["tokens_per_sec"]["count"] == 1
+
+
+def test_cancelled_and_error_status():
+    metrics = StreamMetrics()
+    cancelled = metrics.start("deepseek-chat")
+    cancelled.mark_request()
+    cancelled.on_content()
+    cancelled.finish(cancelled=True)
+    failed = metrics.start("deepseek-chat")
+    failed.fail()
+    failed.finish(cancelled=True)
+
+    model = metrics.snapshot()["models"]["deepseek-chat"]
+    assert model["status"] == {"ok": 0, "error": 1, "cancelled": 1}
+    # 没有 usage 时按分片数估算 token
+    assert model["metrics"]["completion_tokens"]["max"] == 1
+    assert model["prompt_cache_hit_ratio"] is None
+    metrics.reset()
+    assert metrics.snapshot()["models"] == {}
+
+
+if __name__ == "__main__":
+    test_histogram_percentiles_are_close()
+    test_probe_records_stream_timeline()
+    test_cancelled_and_error_status()
+    print("✅ 流式延迟统计测试全部通过")
@@ -0,0 +1,153 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.stream_resume import ResumableStreams, ResumeGap
+
+
+async def source(items, gate=None):
+    for i, item in enumerate(items):
+        if gate is not None and i == 2:
+            await gate.wait()
+        yield item
+
+
+async def read(gen, limit=None):
+    out = []
+    async for chunk in gen:
+        out.append(chunk)
+        if limit is not None and len(out) >= limit:
+            await gen.aclose()
+            break
+    return out
+
+
+def joined(chunks):
+    return b"".join(c if isinstance(c, bytes) else c.encode("utf-8") for c in chunks).decode("utf-8")
+
+# ================= 测试用例集 =================
+
+def test_resume_while_generating_after_reader_disconnects():
+    async def scenario():
+        streams = ResumableStreams()
+        gate = asyncio.Event()
+        session = streams.open("alice", source(["<think>", "思考", "{\"a\":", " 1}"], gate))
+        first = await read(streams.follow(session), limit=2)
+        assert joined(first) == "<think>思考"
+
+        # 客户端已断开，生成仍在继续
+        offset = len(joined(first).encode("utf-8"))
+        gate.set()
+        rest = await read(streams.follow(session, offset))
+        assert joined(first) + joined(rest) == "<think>思考{\"a\": 1}"
+        assert session.done and streams.stats()["resumed"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_resume_after_finish_from_mid_character_offset():
+    async def scenario():
+        streams = ResumableStreams()
+        session = streams.open("alice", source(["对线", "压制"]))
+        await session.task
+        # 断在 "线" 的 UTF-8 字节中间：续传从字节处接上，由客户端解码器拼回
+        head = "对线".encode("utf-8")[:4]
+        rest = await read(streams.follow(session, 4))
+        assert (head + b"".join(c if isinstance(c, bytes) else c.encode("utf-8") for c in rest)).decode("utf-8") == "对线压制"
+        assert streams.get(session.id, owner="bob") is None
+        assert streams.get(session.id, owner="alice") is session
+
+    asyncio.run(scenario())
+
+
+def test_ring_buffer_evicts_and_reports_gap():
+    async def scenario():
+        streams = ResumableStreams(buffer_kb=0.01)  # ≈ 10 字节
+        session = streams.open("alice", source(["aaaa", "bbbb", "cccc", "dddd"]))
+        await session.task
+        assert session.base == 8 and session.end == 16
+        with pytest.raises(ResumeGap):
+            session.index_of(4)
+        assert joined(await read(streams.follow(session, 10))) == "ccdddd"
+
+    asyncio.run(scenario())
+
+
+def test_finished_sessions_expire():
+    async def scenario():
+        streams = ResumableStreams(ttl=0)
+        session = streams.open("alice", source(["x"]))
+        await session.task
+        await asyncio.sleep(0.01)
+        assert streams.get(session.id) is None
+        assert streams.stats()["expired"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_stream_is_cancelled_after_grace():
+    async def scenario():
+        closed = []
+
+        async def endless():
+            try:
+                while True:
+                    yield "x"
+                    await asyncio.sleep(0.005)
+            finally:
+                closed.append(True)
+
+        streams = ResumableStreams(grace=0.05)
+        session = streams.open("alice", endless())
+        await read(streams.follow(session), limit=2)
+        # 宽限期内续传：生成继续
+        await asyncio.sleep(0.02)
+        await read(streams.follow(session, 2), limit=1)
+        assert not closed and streams.stats()["abandoned"] == 0
+        # 再次断开且无人续传：取消录制，上游被关闭
+        await asyncio.sleep(0.1)
+        assert closed == [True] and session.done
+        assert streams.get(session.id) is None and streams.stats()["abandoned"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_session_never_followed_is_abandoned():
+    async def scenario():
+        closed = []
+
+        async def endless():
+            try:
+                while True:
+                    yield "x"
+                    await asyncio.sleep(0.005)
+            finally:
+                closed.append(True)
+
+        streams = ResumableStreams(grace=0.05)
+        # 客户端在响应体开始迭代前就断开：follow() 从未被调用
+        session = streams.open("alice", endless())
+        await asyncio.sleep(0.1)
+        assert closed == [True] and session.done
+        assert streams.get(session.id) is None and streams.stats()["abandoned"] == 1
+        # 宽限期内开始读取的流不受影响
+        session = streams.open("bob", source(["a", "b"]))
+        await asyncio.sleep(0.02)
+        assert joined(await read(streams.follow(session))) == "ab"
+        await asyncio.sleep(0.1)
+        assert streams.stats()["abandoned"] == 1
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_resume_while_generating_after_reader_disconnects()
+    test_resume_after_finish_from_mid_character_offset()
+    test_ring_buffer_evicts_and_reports_gap()
+    test_finished_sessions_expire()
+    test_abandoned_stream_is_cancelled_after_grace()
+    test_session_never_followed_is_abandoned()
+    print("✅ 断线续传测试全部通过")
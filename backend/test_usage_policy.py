@@ -0,0 +1,79 @@
+import os
+import sys
+import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.usage_policy import resolve_membership, evaluate_usage, summarize_usage
+
+NOW = datetime.datetime(2026, 1, 10, 12, 0, tzinfo=datetime.timezone.utc)
+
+# ================= 测试用例集 =================
+
+def test_membership_expiry():
+    expired = {"username": "a", "role": "pro", "membership_expire": NOW - datetime.timedelta(days=1)}
+    active = {"username": "b", "role": "vip", "membership_expire": (NOW + datetime.timedelta(days=1)).replace(tzinfo=None)}
+    assert resolve_membership(expired, NOW) == ("user", True)
+    assert resolve_membership(active, NOW) == ("vip", False)
+    assert resolve_membership({"role": "admin"}, NOW) == ("admin", False)
+    assert resolve_membership(None, NOW) == ("user", False)
+
+
+def test_first_call_of_day_resets_and_counts():
+    user = {"username": "a", "usage_stats": {"last_reset_date": "2026-01-09", "bonus_r1": 2, "counts_reasoner": {"x": 9}}}
+    allowed, msg, remaining, update = evaluate_usage(user, "user", "personal", "reasoner", NOW)
+    assert allowed and msg == "OK" and remaining == 0
+    stats = update["$set"]["usage_stats"]
+    assert stats["counts_reasoner"] == {"personal": 1}
+    assert stats["bonus_r1"] == 2
+    assert update["$inc"] == {"total_usage": 1}
+    # 纯函数：不改动传入的用户文档
+    assert user["usage_stats"]["counts_reasoner"] == {"x": 9}
+
+
+def test_cooldown_and_r1_limit():
+    base = {"last_reset_date": "2026-01-10", "hourly_start": NOW.isoformat(), "hourly_count": 1,
+            "counts_chat": {}, "counts_reasoner": {"bp": 3}, "last_access": {"personal": (NOW - datetime.timedelta(seconds=3)).isoformat()}}
+    user = {"username": "a", "usage_stats": base}
+
+    allowed, msg, remaining, update = evaluate_usage(user, "user", "personal", "chat", NOW)
+    assert (allowed, msg, remaining, update) == (False, "AI思考中", 12, None)
+
+    allowed, msg, remaining, _ = evaluate_usage(user, "user", "team", "reasoner", NOW)
+    assert not allowed and remaining == -1
+
+    # Pro 不受 R1 日限额限制
+    assert evaluate_usage(user, "pro", "team", "reasoner", NOW)[0]
+
+
+def test_instant_bucket_is_separate_from_chat():
+    base = {"last_reset_date": "2026-01-10", "hourly_start": NOW.isoformat(), "hourly_count": 10,
+            "counts_chat": {}, "counts_reasoner": {}, "last_access": {"personal": NOW.isoformat()}}
+    user = {"username": "a", "usage_stats": base}
+    # Chat 小时额度已满且在冷却中，即时模式照常可用
+    assert not evaluate_usage(user, "user", "personal", "chat", NOW)[0]
+    allowed, _, _, update = evaluate_usage(user, "user", "personal", "instant", NOW)
+    stats = update["$set"]["usage_stats"]
+    assert allowed and stats["instant_count"] == 1 and stats["hourly_count"] == 10 and stats["counts_chat"] == {}
+
+    user["usage_stats"] = dict(base, instant_start=NOW.isoformat(), instant_count=60)
+    allowed, msg, _, _ = evaluate_usage(user, "user", "personal", "instant", NOW)
+    assert not allowed and msg.startswith("即时分析过于频繁")
+    assert evaluate_usage(user, "pro", "personal", "instant", NOW)[0]
+    assert summarize_usage(user, "user", NOW)["instant_used"] == 60
+
+
+def test_summary_matches_limits():
+    user = {"usage_stats": {"last_reset_date": "2026-01-10", "counts_reasoner": {"bp": 2}, "bonus_chat": 5,
+                            "hourly_start": NOW.isoformat(), "hourly_count": 4}}
+    summary = summarize_usage(user, "user", NOW)
+    assert summary["r1_used"] == 2 and summary["r1_remaining"] == 1
+    assert summary["chat_hourly_limit"] == 15 and summary["chat_used"] == 4
+
+
+if __name__ == "__main__":
+    test_membership_expiry()
+    test_first_call_of_day_resets_and_counts()
+    test_cooldown_and_r1_limit()
+    test_instant_bucket_is_separate_from_chat()
+    test_summary_matches_limits()
+    print("✅ 用量规则测试全部通过")
@@ -640,10 +640,16 @@ export function useGameCore() {
                 },
                 // ✅ 回调 3: onError (错误)
                 (err) => {
+                    toast.dismiss(`queue-${mode}`);
                     if (err.message === 'AbortError') return;
                     const errorJson = JSON.stringify({ concise: { title: "分析中断", content: "连接不稳定，请重试。\n" + err.message } });
                     setAiResults(prev => ({ ...prev, [mode]: errorJson }));
                     setAnalyzingStatus(prev => ({ ...prev, [mode]: false }));
+                },
+                // ✅ 回调 4: onQueue (上游排队中)
+                (queue) => {
+                    if (!queue) { toast.dismiss(`queue-${mode}`); return; }
+                    toast.loading(`AI 排队中：第 ${queue.position} 位，预计 ${queue.eta} 秒`, { id: `queue-${mode}` });
                 }
             );
 
@@ -3,6 +3,10 @@
 // 根据您的环境配置 API 地址
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000";
 
+// 🔁 断线续传：连接中途断开时，凭 X-Analyze-Request-Id + 已收字节数续读 (不重复扣额度)
+const MAX_RESUMES = 3;
+const sleep = (ms) => new Promise((r) => setTimeout(r, ms));
+
 /**
  * 流式请求 AI 分析接口
  * @param {Object} payload - 请求参数 (myHero, enemyHero, etc.)
@@ -10,8 +14,9 @@ const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000
  * @param {Function} onDelta - 接收每个字符的回调 (用于打字机效果)
  * @param {Function} onDone - 完成时的回调 (返回解析后的 JSON 对象)
  * @param {Function} onError - 错误回调
+ * @param {Function} onQueue - 排队回调 ({ position, eta })，出队后以 null 调用一次
  */
-export async function analyzeStream(payload, token, onDelta, onDone, onError) {
+export async function analyzeStream(payload, token, onDelta, onDone, onError, onQueue) {
   try {
     const res = await fetch(`${API_BASE_URL}/analyze`, {
       method: "POST",
@@ -26,32 +31,85 @@ export async function analyzeStream(payload, token, onDelta, onDone, onError) {
       // 尝试读取错误信息
       const errText = await res.text();
       let errMsg = `HTTP ${res.status}`;
+      const retryAfter = res.headers.get("Retry-After");
       try {
         const errJson = JSON.parse(errText);
         // 如果后端返回了特定的错误结构 (如 concise.content)
         if (errJson?.concise?.content) errMsg = errJson.concise.content;
         else if (errJson?.detail) errMsg = errJson.detail;
       } catch (e) {}
+      // 🚦 429：上游排队已满，带上建议的重试间隔
+      if (res.status === 429 && retryAfter && !errMsg.includes(retryAfter)) errMsg += ` (${retryAfter}s)`;
       throw new Error(errMsg);
     }
 
     if (!res.body) throw new Error("ReadableStream not supported");
 
-    const reader = res.body.getReader();
+    let reader = res.body.getReader();
     const decoder = new TextDecoder("utf-8");
+    const requestId = res.headers.get("X-Analyze-Request-Id");
+    let received = 0; // 已收到的字节数 = 续传 offset
+    let resumes = 0;
 
     let raw = "";
+    // 🚦 排队标记 <queue>{...}</queue> 只出现在正文之前：剥离后交给 onQueue，不进入 raw
+    let pending = "";
+    let queueing = true;
     
     while (true) {
-      const { value, done } = await reader.read();
+      let step;
+      try {
+        step = await reader.read();
+      } catch (readErr) {
+        if (!requestId || resumes >= MAX_RESUMES) throw readErr;
+        resumes += 1;
+        await sleep(500 * resumes);
+        try {
+          const resumed = await fetch(`${API_BASE_URL}/analyze/resume/${requestId}?offset=${received}`, {
+            headers: token ? { Authorization: `Bearer ${token}` } : {}
+          });
+          if (!resumed.ok) {
+            let detail = `HTTP ${resumed.status}`;
+            try { detail = (await resumed.json())?.detail || detail; } catch (e) {}
+            throw new Error(detail);
+          }
+          reader = resumed.body.getReader();
+        } catch (resumeErr) {
+          // 网络仍未恢复：下一轮 read 会再次失败并重试；服务端明确拒绝则直接报错
+          if (resumeErr instanceof TypeError) continue;
+          throw resumeErr;
+        }
+        continue;
+      }
+      const { value, done } = step;
       if (done) break;
+      received += value.byteLength;
       
-      const chunk = decoder.decode(value, { stream: true });
+      let chunk = decoder.decode(value, { stream: true });
+      if (queueing) {
+        pending += chunk;
+        let m;
+        while ((m = pending.match(/^\s*<queue>([\s\S]*?)<\/queue>/))) {
+          try { onQueue?.(JSON.parse(m[1])); } catch (e) {}
+          pending = pending.slice(m[0].length);
+        }
+        // 标记可能被拆在两个分片里：等下一片再判断
+        if ("<queue>".startsWith(pending) || pending.startsWith("<queue>")) continue;
+        queueing = false;
+        onQueue?.(null);
+        chunk = pending;
+        pending = "";
+      }
       raw += chunk;
       
       // ✅ 实时将字符推给 UI
       onDelta?.(chunk); 
     }
+    if (queueing) {
+      onQueue?.(null);
+      raw += pending;
+      if (pending) onDelta?.(pending);
+    }
 
     // --- 数据清洗与解析 ---
     